@@ -0,0 +1,58 @@
+"""Add near-duplicate MinHash/LSH index
+
+Revision ID: 5d1e7c9b2f40
+Revises: ac82dbe4abe9
+Create Date: 2026-10-19 10:03:17.554912
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d1e7c9b2f40"
+down_revision: Union[str, Sequence[str], None] = "ac82dbe4abe9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("articles") as batch_op:
+        batch_op.add_column(sa.Column("minhash_signature", sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column("duplicate_of_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_articles_duplicate_of_id_articles",
+            "articles",
+            ["duplicate_of_id"],
+            ["id"],
+            ondelete="SET NULL",
+        )
+        batch_op.create_index(
+            batch_op.f("ix_articles_duplicate_of_id"), ["duplicate_of_id"], unique=False
+        )
+    op.create_table(
+        "article_lsh_buckets",
+        sa.Column("band", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.BigInteger(), nullable=False),
+        sa.Column("article_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["article_id"],
+            ["articles.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("band", "bucket", "article_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("article_lsh_buckets")
+    with op.batch_alter_table("articles") as batch_op:
+        batch_op.drop_index(batch_op.f("ix_articles_duplicate_of_id"))
+        batch_op.drop_constraint("fk_articles_duplicate_of_id_articles", type_="foreignkey")
+        batch_op.drop_column("duplicate_of_id")
+        batch_op.drop_column("minhash_signature")
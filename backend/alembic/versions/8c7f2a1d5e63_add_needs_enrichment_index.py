@@ -0,0 +1,36 @@
+"""Add partial index on articles needing enrichment
+
+Revision ID: 8c7f2a1d5e63
+Revises: 3b9a4d2e7f15
+Create Date: 2026-10-19 13:37:12.004518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8c7f2a1d5e63"
+down_revision: Union[str, Sequence[str], None] = "3b9a4d2e7f15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_articles_needs_enrichment",
+        "articles",
+        ["id"],
+        unique=False,
+        sqlite_where=sa.text("summary IS NULL OR interest_score IS NULL"),
+        postgresql_where=sa.text("summary IS NULL OR interest_score IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_articles_needs_enrichment", table_name="articles")
@@ -0,0 +1,33 @@
+"""Add source polling schedule
+
+Revision ID: a8d4e6f2c190
+Revises: f7c3d9e2a518
+Create Date: 2026-10-20 14:36:08.217450
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a8d4e6f2c190"
+down_revision: Union[str, Sequence[str], None] = "f7c3d9e2a518"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("sources", sa.Column("scrape_interval_minutes", sa.Float(), nullable=True))
+    op.add_column("sources", sa.Column("next_scrape_at", sa.DateTime(), nullable=True))
+    op.create_index(op.f("ix_sources_next_scrape_at"), "sources", ["next_scrape_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_sources_next_scrape_at"), table_name="sources")
+    op.drop_column("sources", "next_scrape_at")
+    op.drop_column("sources", "scrape_interval_minutes")
@@ -0,0 +1,63 @@
+"""Add article normalized_url
+
+Revision ID: ac82dbe4abe9
+Revises: a35fac3a6dec
+Create Date: 2026-10-19 09:12:41.203117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.urls import canonicalize_url
+
+
+# revision identifiers, used by Alembic.
+revision: str = "ac82dbe4abe9"
+down_revision: Union[str, Sequence[str], None] = "a35fac3a6dec"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("articles") as batch_op:
+        batch_op.add_column(sa.Column("normalized_url", sa.String(), nullable=True))
+
+    # Backfill existing rows. When several existing articles share the same
+    # normalized URL only the oldest one gets it, so the unique index can be
+    # created; the others keep matching on their raw URL.
+    connection = op.get_bind()
+    articles = sa.table(
+        "articles",
+        sa.column("id", sa.Integer),
+        sa.column("url", sa.String),
+        sa.column("normalized_url", sa.String),
+    )
+    seen_urls = set()
+    rows = connection.execute(
+        sa.select(articles.c.id, articles.c.url).order_by(articles.c.id)
+    )
+    for article_id, url in rows.fetchall():
+        normalized_url = canonicalize_url(url) if url else None
+        if not normalized_url or normalized_url in seen_urls:
+            continue
+        seen_urls.add(normalized_url)
+        connection.execute(
+            articles.update()
+            .where(articles.c.id == article_id)
+            .values(normalized_url=normalized_url)
+        )
+
+    op.create_index(
+        op.f("ix_articles_normalized_url"), "articles", ["normalized_url"], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_articles_normalized_url"), table_name="articles")
+    with op.batch_alter_table("articles") as batch_op:
+        batch_op.drop_column("normalized_url")
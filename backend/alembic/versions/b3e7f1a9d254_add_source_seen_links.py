@@ -0,0 +1,29 @@
+"""Add source seen links filter
+
+Revision ID: b3e7f1a9d254
+Revises: a8d4e6f2c190
+Create Date: 2026-10-20 17:05:52.381946
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b3e7f1a9d254"
+down_revision: Union[str, Sequence[str], None] = "a8d4e6f2c190"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("sources", sa.Column("seen_links", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("sources", "seen_links")
@@ -0,0 +1,32 @@
+"""Add article embedding
+
+Revision ID: b6d2e8f1a437
+Revises: f4a91c3e2b07
+Create Date: 2026-10-19 17:24:11.530862
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b6d2e8f1a437"
+down_revision: Union[str, Sequence[str], None] = "f4a91c3e2b07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A plain ADD COLUMN (not a batch migration) keeps the full-text index
+    # triggers on the articles table. Existing articles are embedded by the
+    # next score recalculation.
+    op.add_column("articles", sa.Column("embedding", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("articles", "embedding")
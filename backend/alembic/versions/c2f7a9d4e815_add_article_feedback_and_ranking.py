@@ -0,0 +1,37 @@
+"""Add article feedback and ranking weights
+
+Revision ID: c2f7a9d4e815
+Revises: b6d2e8f1a437
+Create Date: 2026-10-19 18:41:37.902114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c2f7a9d4e815"
+down_revision: Union[str, Sequence[str], None] = "b6d2e8f1a437"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Plain ADD COLUMN, which keeps the full-text index triggers
+    op.add_column("articles", sa.Column("liked", sa.Boolean(), nullable=True))
+    op.create_table(
+        "ranking_weights",
+        sa.Column("feature", sa.String(), nullable=False),
+        sa.Column("weight", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("feature"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("ranking_weights")
+    op.drop_column("articles", "liked")
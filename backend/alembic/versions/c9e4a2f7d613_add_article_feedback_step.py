@@ -0,0 +1,30 @@
+"""Add article feedback step
+
+Revision ID: c9e4a2f7d613
+Revises: b3e7f1a9d254
+Create Date: 2026-10-21 10:14:36.527081
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c9e4a2f7d613"
+down_revision: Union[str, Sequence[str], None] = "b3e7f1a9d254"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Plain ADD COLUMN, which keeps the full-text index triggers
+    op.add_column("articles", sa.Column("feedback_step", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("articles", "feedback_step")
@@ -0,0 +1,34 @@
+"""Add article link_normalized_url
+
+Revision ID: d4b8e2c6a913
+Revises: c9e4a2f7d613
+Create Date: 2026-10-22 09:41:18.306254
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4b8e2c6a913"
+down_revision: Union[str, Sequence[str], None] = "c9e4a2f7d613"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Plain ADD COLUMN, which keeps the full-text index triggers
+    op.add_column("articles", sa.Column("link_normalized_url", sa.String(), nullable=True))
+    op.create_index(
+        op.f("ix_articles_link_normalized_url"), "articles", ["link_normalized_url"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_articles_link_normalized_url"), table_name="articles")
+    op.drop_column("articles", "link_normalized_url")
@@ -0,0 +1,68 @@
+"""Add related articles
+
+Revision ID: d8a3b5c6f920
+Revises: c2f7a9d4e815
+Create Date: 2026-10-19 19:55:02.417338
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d8a3b5c6f920"
+down_revision: Union[str, Sequence[str], None] = "c2f7a9d4e815"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "article_key_terms",
+        sa.Column("bucket", sa.Integer(), nullable=False),
+        sa.Column("article_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["article_id"],
+            ["articles.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("bucket", "article_id"),
+    )
+    op.create_index(
+        op.f("ix_article_key_terms_article_id"), "article_key_terms", ["article_id"], unique=False
+    )
+    op.create_table(
+        "related_articles",
+        sa.Column("article_id", sa.Integer(), nullable=False),
+        sa.Column("related_id", sa.Integer(), nullable=False),
+        sa.Column("similarity", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["article_id"],
+            ["articles.id"],
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["related_id"],
+            ["articles.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("article_id", "related_id"),
+    )
+    op.create_index(
+        "ix_related_articles_article_id_similarity",
+        "related_articles",
+        ["article_id", "similarity"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_related_articles_article_id_similarity", table_name="related_articles")
+    op.drop_table("related_articles")
+    op.drop_index(op.f("ix_article_key_terms_article_id"), table_name="article_key_terms")
+    op.drop_table("article_key_terms")
@@ -0,0 +1,66 @@
+"""Add stories
+
+Revision ID: e5b9c1d7a342
+Revises: d8a3b5c6f920
+Create Date: 2026-10-19 21:12:48.660415
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import search
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b9c1d7a342"
+down_revision: Union[str, Sequence[str], None] = "d8a3b5c6f920"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _restore_search_triggers():
+    # SQLite adds the foreign key by rebuilding the articles table, which
+    # drops the triggers keeping the full-text index in sync. The rows keep
+    # their ids, so the index itself is still valid.
+    connection = op.get_bind()
+    if connection.dialect.name == "sqlite":
+        search.create_search_index(connection)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "stories",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.Column("article_count", sa.Integer(), nullable=False),
+        sa.Column("summarized_article_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_stories_id"), "stories", ["id"], unique=False)
+    op.create_index(op.f("ix_stories_updated_at"), "stories", ["updated_at"], unique=False)
+    # Existing articles can be clustered with stories.assign_existing_articles
+    with op.batch_alter_table("articles") as batch_op:
+        batch_op.add_column(sa.Column("story_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_articles_story_id_stories", "stories", ["story_id"], ["id"]
+        )
+        batch_op.create_index(batch_op.f("ix_articles_story_id"), ["story_id"], unique=False)
+    _restore_search_triggers()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("articles") as batch_op:
+        batch_op.drop_index(batch_op.f("ix_articles_story_id"))
+        batch_op.drop_constraint("fk_articles_story_id_stories", type_="foreignkey")
+        batch_op.drop_column("story_id")
+    _restore_search_triggers()
+    op.drop_index(op.f("ix_stories_updated_at"), table_name="stories")
+    op.drop_index(op.f("ix_stories_id"), table_name="stories")
+    op.drop_table("stories")
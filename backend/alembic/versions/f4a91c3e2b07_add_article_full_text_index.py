@@ -0,0 +1,33 @@
+"""Add article full-text index
+
+Revision ID: f4a91c3e2b07
+Revises: 8c7f2a1d5e63
+Create Date: 2026-10-19 16:02:45.318940
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+from app import search
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f4a91c3e2b07"
+down_revision: Union[str, Sequence[str], None] = "8c7f2a1d5e63"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    connection = op.get_bind()
+    search.create_search_index(connection)
+    # Index the articles stored before the index existed
+    search.rebuild_search_index(connection)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    search.drop_search_index(op.get_bind())
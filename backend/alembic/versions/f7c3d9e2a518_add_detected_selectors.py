@@ -0,0 +1,37 @@
+"""Add detected selectors
+
+Revision ID: f7c3d9e2a518
+Revises: e5b9c1d7a342
+Create Date: 2026-10-20 10:12:41.593204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f7c3d9e2a518"
+down_revision: Union[str, Sequence[str], None] = "e5b9c1d7a342"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "detected_selectors",
+        sa.Column("domain", sa.String(), nullable=False),
+        sa.Column("fingerprint", sa.String(), nullable=False),
+        sa.Column("selector", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("domain", "fingerprint"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("detected_selectors")
@@ -1,22 +1,66 @@
+import datetime
+import uuid
 from typing import List
-from sqlalchemy.orm import Session
+from sqlalchemy import Integer, Text, and_, bindparam, cast, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
-from . import models, schemas
+from . import config, job_events, models, schemas
+from .urls import canonicalize_url, page_domain
 
 
 def get_article_by_url(db: Session, url: str):
-    return db.query(models.Article).filter(models.Article.url == url).first()
+    """
+    Get an article by its URL. Matches either the exact URL or any variant
+    that canonicalizes to the same normalized URL, also when the article was
+    stored under another canonical URL than the link it was found under.
+    """
+    normalized_url = canonicalize_url(url)
+    return (
+        db.query(models.Article)
+        .filter(
+            or_(
+                models.Article.url == url,
+                models.Article.normalized_url == normalized_url,
+                models.Article.link_normalized_url == normalized_url,
+            )
+        )
+        .first()
+    )
 
 
-def get_articles(
-    db: Session,
+def get_existing_article_links(db: Session, links: List[str]) -> set[str]:
+    """
+    The links, among the given ones, of articles already stored (matching
+    like get_article_by_url), in a single query.
+    """
+    if not links:
+        return set()
+    normalized = {link: canonicalize_url(link) for link in links}
+    stored = set()
+    for row in db.query(
+        models.Article.url, models.Article.normalized_url, models.Article.link_normalized_url
+    ).filter(
+        or_(
+            models.Article.url.in_(links),
+            models.Article.normalized_url.in_(set(normalized.values())),
+            models.Article.link_normalized_url.in_(set(normalized.values())),
+        )
+    ):
+        stored.update(row)
+    return {link for link in links if link in stored or normalized[link] in stored}
+
+
+def _articles_query(
     skip: int = 0,
     limit: int = 100,
     category_id: int = None,
     read: bool = None,
     min_score: int = None,
 ):
-    query = db.query(models.Article)
+    query = select(models.Article)
 
     if category_id is not None:
         query = query.join(models.article_categories).filter(
@@ -29,16 +73,70 @@ def get_articles(
     if min_score is not None:
         query = query.filter(models.Article.interest_score >= min_score)
 
-    return query.offset(skip).limit(limit).all()
+    return query.offset(skip).limit(limit)
+
+
+def get_articles(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    category_id: int = None,
+    read: bool = None,
+    min_score: int = None,
+):
+    query = _articles_query(skip, limit, category_id, read, min_score)
+    return db.scalars(query).all()
+
+
+async def get_articles_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    category_id: int = None,
+    read: bool = None,
+    min_score: int = None,
+):
+    """
+    Async version of get_articles. Categories are loaded eagerly (one extra
+    query for the whole page), since lazy loading is not possible in async code.
+    """
+    query = _articles_query(skip, limit, category_id, read, min_score).options(
+        selectinload(models.Article.categories)
+    )
+    result = await db.scalars(query)
+    return result.all()
+
+
+async def get_unsummarized_article_ids_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    category_id: int = None,
+    read: bool = None,
+    min_score: int = None,
+) -> List[int]:
+    """The IDs of the articles without a summary in a page of get_articles_async."""
+    page = _articles_query(skip, limit, category_id, read, min_score).subquery()
+    result = await db.scalars(select(page.c.id).filter(page.c.summary.is_(None)))
+    return result.all()
 
 
 def get_article(db: Session, article_id: int):
     return db.query(models.Article).filter(models.Article.id == article_id).first()
 
 
+def _link_normalized_url(article: schemas.ArticleCreate) -> str | None:
+    if not article.link_url:
+        return None
+    link_normalized_url = canonicalize_url(article.link_url)
+    return link_normalized_url if link_normalized_url != canonicalize_url(article.url) else None
+
+
 def create_article(db: Session, article: schemas.ArticleCreate):
     db_article = models.Article(
         url=article.url,
+        normalized_url=canonicalize_url(article.url),
+        link_normalized_url=_link_normalized_url(article),
         title=article.title,
         original_content=article.original_content,
         summary=article.summary,
@@ -86,6 +184,29 @@ def update_article_interest_score(db: Session, article_id: int, interest_score:
     return db_article
 
 
+def bulk_insert_ignoring_conflicts(db: Session, table, rows: List[dict]):
+    """
+    Inserts many rows in a single executemany, skipping the rows that
+    conflict with an existing unique key. Uses INSERT ... ON CONFLICT DO
+    NOTHING on SQLite and PostgreSQL; other databases insert row by row.
+    Does not commit.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        db.execute(postgresql.insert(table).on_conflict_do_nothing(), rows)
+    elif dialect == "sqlite":
+        db.execute(sqlite.insert(table).on_conflict_do_nothing(), rows)
+    else:
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table), [row])
+            except IntegrityError:
+                pass
+
+
 def link_categories_to_article(db: Session, article_id: int, categories: List[str]):
     db_article = (
         db.query(models.Article).filter(models.Article.id == article_id).first()
@@ -93,26 +214,114 @@ def link_categories_to_article(db: Session, article_id: int, categories: List[st
     if not db_article:
         return None
 
-    for category_name in categories:
-        db_category = (
-            db.query(models.Category)
-            .filter(models.Category.name == category_name)
-            .first()
+    # Missing categories and links are created with one statement each.
+    # Conflicts (e.g. a category created concurrently by another job) are
+    # ignored instead of failing the whole update.
+    category_names = list(dict.fromkeys(categories))
+    if category_names:
+        bulk_insert_ignoring_conflicts(
+            db, models.Category.__table__, [{"name": name} for name in category_names]
+        )
+        category_ids = db.scalars(
+            select(models.Category.id).where(models.Category.name.in_(category_names))
+        ).all()
+        bulk_insert_ignoring_conflicts(
+            db,
+            models.article_categories,
+            [{"article_id": article_id, "category_id": category_id} for category_id in category_ids],
         )
-        if not db_category:
-            db_category = models.Category(name=category_name)
-            db.add(db_category)
-            db.commit()
-            db.refresh(db_category)
-
-        # This check is implicitly handled by the relationship, but for explicit clarity:
-        if db_category not in db_article.categories:
-            db_article.categories.append(db_category)
     db.commit()
     db.refresh(db_article)  # Refresh the article to reflect new categories
     return db_article
 
 
+def get_articles_needing_enrichment(
+    db: Session, after_id: int = 0, limit: int = 100
+) -> List[models.Article]:
+    """
+    Get articles with a missing summary or interest score, in ID order.
+    Articles without content are ignored since the LLM has nothing to work on.
+    The filter matches the partial index ix_articles_needs_enrichment.
+
+    Args:
+        db: Database session
+        after_id: Only return articles with a greater ID (for paging)
+        limit: Maximum number of articles to return
+    """
+    return (
+        _articles_needing_enrichment_query(db)
+        .filter(models.Article.id > after_id)
+        .order_by(models.Article.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def count_articles_needing_enrichment(db: Session) -> int:
+    return _articles_needing_enrichment_query(db).count()
+
+
+def _articles_needing_enrichment_query(db: Session):
+    query = (
+        db.query(models.Article)
+        .filter(
+            or_(
+                models.Article.summary.is_(None),
+                models.Article.interest_score.is_(None),
+            )
+        )
+        .filter(models.Article.original_content.isnot(None))
+        .filter(models.Article.original_content != "")
+    )
+    # Extra conditions are separate so that the partial index still matches
+    if config.SUMMARY_MODE == "lazy":
+        # Summaries are generated on demand
+        query = query.filter(
+            or_(models.Article.summary.isnot(None), models.Article.interest_score.is_(None))
+        )
+    elif config.SUMMARY_MIN_SCORE > 0:
+        # Articles scoring below SUMMARY_MIN_SCORE are complete without a summary
+        query = query.filter(
+            or_(
+                models.Article.summary.isnot(None),
+                models.Article.interest_score.is_(None),
+                models.Article.interest_score >= config.SUMMARY_MIN_SCORE,
+            )
+        )
+    return query
+
+
+def copy_article_enrichment(
+    db: Session, article_id: int, from_article: models.Article, include_summary: bool = True
+):
+    """
+    Copies the LLM enrichment (summary, categories and interest score) of
+    another article, typically a near duplicate of the same story.
+
+    Args:
+        db: Database session
+        article_id: ID of the article to update
+        from_article: Article whose enrichment is reused
+        include_summary: Whether to copy the summary too; only a near
+            duplicate's summary also describes the article's own text
+
+    Returns:
+        The updated article or None if not found
+    """
+    db_article = get_article(db, article_id)
+    if db_article:
+        if include_summary:
+            db_article.summary = from_article.summary
+        db_article.interest_score = from_article.interest_score
+        for category in from_article.categories:
+            if category not in db_article.categories:
+                db_article.categories.append(category)
+        db.add(db_article)
+        db.commit()
+        db.refresh(db_article)
+    return db_article
+
+
 def mark_article_read(db: Session, article_id: int, read: bool):
     """
     Mark an article as read or unread.
@@ -134,6 +343,32 @@ def mark_article_read(db: Session, article_id: int, read: bool):
     return db_article
 
 
+def set_article_feedback(
+    db: Session, article_id: int, liked: bool | None, feedback_step: float | None = None
+):
+    """
+    Record whether the user liked an article.
+
+    Args:
+        db: Database session
+        article_id: ID of the article to update
+        liked: True (liked), False (disliked) or None (no feedback)
+        feedback_step: The ranking model's step for the feedback (see
+            ranking.record_feedback)
+
+    Returns:
+        The updated article or None if not found
+    """
+    db_article = get_article(db, article_id)
+    if db_article:
+        db_article.liked = liked
+        db_article.feedback_step = feedback_step
+        db.add(db_article)
+        db.commit()
+        db.refresh(db_article)
+    return db_article
+
+
 def create_source(db: Session, source: schemas.SourceCreate):
     db_source = models.Source(**source.model_dump())
     db.add(db_source)
@@ -203,6 +438,37 @@ def set_setting(db: Session, key: str, value: str):
     return db_setting
 
 
+def increment_setting(db: Session, key: str, amount: int = 1):
+    """
+    Adds amount to an integer setting (created at 0 if missing) in one
+    UPDATE, so that concurrent increments all count, and commits.
+    """
+    bulk_insert_ignoring_conflicts(db, models.Settings.__table__, [{"key": key, "value": "0"}])
+    db.query(models.Settings).filter(models.Settings.key == key).update(
+        {models.Settings.value: cast(cast(models.Settings.value, Integer) + amount, Text)},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def add_to_ranking_weights(db: Session, deltas: dict[str, float]):
+    """
+    Adds a delta to each ranking weight (created at 0 if missing). Each row
+    is updated with weight = weight + delta, so that concurrent updates all
+    count. Does not commit.
+    """
+    if not deltas:
+        return
+    table = models.RankingWeight.__table__
+    bulk_insert_ignoring_conflicts(db, table, [{"feature": feature, "weight": 0.0} for feature in deltas])
+    db.execute(
+        update(table)
+        .where(table.c.feature == bindparam("feature_name"))
+        .values(weight=table.c.weight + bindparam("delta")),
+        [{"feature_name": feature, "delta": delta} for feature, delta in deltas.items()],
+    )
+
+
 def get_source(db: Session, source_id: int):
     return db.query(models.Source).filter(models.Source.id == source_id).first()
 
@@ -211,6 +477,28 @@ def get_sources(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Source).offset(skip).limit(limit).all()
 
 
+def get_sources_by_domain(db: Session, domain: str) -> List[models.Source]:
+    """All the sources whose URL is on a domain (as returned by urls.page_domain)."""
+    candidates = (
+        db.query(models.Source)
+        .filter(
+            or_(
+                models.Source.url.ilike(f"%://{domain}%"),
+                models.Source.url.ilike(f"%://www.{domain}%"),
+            )
+        )
+        .order_by(models.Source.id)
+        .all()
+    )
+    # The patterns also match longer hosts and paths: compare the exact domain
+    return [source for source in candidates if page_domain(source.url) == domain]
+
+
+async def get_sources_async(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.scalars(select(models.Source).offset(skip).limit(limit))
+    return result.all()
+
+
 def update_source(db: Session, source_id: int, source: schemas.SourceUpdate):
     db_source = get_source(db, source_id)
     if db_source:
@@ -233,3 +521,298 @@ def delete_source(db: Session, source_id: int):
 def get_categories(db: Session) -> List[models.Category]:
     """Get all categories, sorted alphabetically."""
     return db.query(models.Category).order_by(models.Category.name).all()
+
+
+async def get_categories_async(db: AsyncSession) -> List[models.Category]:
+    """Async version of get_categories."""
+    result = await db.scalars(select(models.Category).order_by(models.Category.name))
+    return result.all()
+
+
+def create_job(db: Session, job_type: str, payload: dict | None = None, job_id: str | None = None) -> models.Job:
+    """
+    Enqueue a new background job.
+
+    Args:
+        db: Database session
+        job_type: Kind of job (see jobs.JOB_HANDLERS)
+        payload: Keyword arguments passed to the job handler
+        job_id: ID to use for the job; a random UUID by default
+
+    Returns:
+        The created job
+    """
+    db_job = models.Job(
+        id=job_id or str(uuid.uuid4()),
+        type=job_type,
+        payload=payload or {},
+        status="pending",
+        progress=0,
+        message="Waiting for a worker...",
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def get_job(db: Session, job_id: str) -> models.Job | None:
+    return db.query(models.Job).filter(models.Job.id == job_id).first()
+
+
+def get_job_status(db: Session, job_id: str) -> schemas.JobStatus | None:
+    """Get the progress of a job as a JobStatus, or None if not found."""
+    db_job = get_job(db, job_id)
+    if db_job is None:
+        return None
+    return schemas.JobStatus.model_validate(db_job)
+
+
+class JobLeaseLost(Exception):
+    """The worker's lease on a job expired and another worker claimed it."""
+
+
+def update_job(db: Session, job_id: str, **fields) -> models.Job | None:
+    """
+    Update the status/progress fields of a job. If the session claimed the
+    job (see claim_job), the update only applies while the job is still
+    owned by the session's worker, and renews its lease at the same time.
+
+    Args:
+        db: Database session
+        job_id: ID of the job to update
+        **fields: Job columns to set (status, progress, message...)
+
+    Returns:
+        The updated job or None if not found
+
+    Raises:
+        JobLeaseLost: if another worker claimed the job in the meantime; the
+            caller must stop working on it
+    """
+    now = datetime.datetime.utcnow()
+    values = {getattr(models.Job, key): value for key, value in fields.items()}
+    values[models.Job.updated_at] = now
+    query = db.query(models.Job).filter(models.Job.id == job_id)
+    owner = db.info.get("job_worker_id")
+    if owner is not None:
+        query = query.filter(models.Job.worker_id == owner)
+        values[models.Job.lease_expires_at] = now + datetime.timedelta(seconds=config.JOB_LEASE_SECONDS)
+    updated = query.update(values, synchronize_session=False)
+    db.commit()
+    db_job = get_job(db, job_id)
+    if db_job is None:
+        return None
+    if updated != 1:
+        raise JobLeaseLost(f"Job {job_id} is now owned by worker {db_job.worker_id}")
+    db.refresh(db_job)
+    job_events.publish(schemas.JobStatus.model_validate(db_job))
+    return db_job
+
+
+def renew_job_lease(db: Session, job_id: str, worker_id: str) -> bool:
+    """Extends a worker's lease on a job. Returns False if it no longer owns it."""
+    now = datetime.datetime.utcnow()
+    renewed = (
+        db.query(models.Job)
+        .filter(models.Job.id == job_id, models.Job.worker_id == worker_id)
+        .update(
+            {models.Job.lease_expires_at: now + datetime.timedelta(seconds=config.JOB_LEASE_SECONDS)},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return renewed == 1
+
+
+def count_jobs_by_status(db: Session) -> dict[str, int]:
+    return dict(db.query(models.Job.status, func.count(models.Job.id)).group_by(models.Job.status).all())
+
+
+def request_job_cancel(db: Session, job_id: str) -> bool:
+    """
+    Ask a pending or running job to stop. The worker running it checks the
+    flag between articles.
+
+    Returns:
+        True if the job exists and can still be canceled
+    """
+    db_job = get_job(db, job_id)
+    if db_job is None or db_job.status not in ["pending", "in_progress"]:
+        return False
+    db_job.cancel_requested = True
+    db.add(db_job)
+    db.commit()
+    return True
+
+
+def is_job_cancel_requested(db: Session, job_id: str) -> bool:
+    canceled = (
+        db.query(models.Job.cancel_requested).filter(models.Job.id == job_id).scalar()
+    )
+    return bool(canceled)
+
+
+def claim_job(db: Session, worker_id: str, job_id: str | None = None) -> models.Job | None:
+    """
+    Atomically take ownership of a job for a worker.
+
+    A job can be claimed while it is pending or running without a valid lease
+    (i.e. its previous worker died). The claim is a conditional UPDATE whose
+    row count tells whether this worker won, which is safe on SQLite; on
+    PostgreSQL the candidate row is additionally locked with SKIP LOCKED so
+    concurrent workers pick different jobs.
+
+    Args:
+        db: Database session
+        worker_id: Identifier of the claiming worker
+        job_id: Job to claim; the oldest claimable job by default
+
+    Returns:
+        The claimed job, or None if there was nothing to claim
+    """
+    now = datetime.datetime.utcnow()
+    claimable = and_(
+        models.Job.status.in_(["pending", "in_progress"]),
+        or_(models.Job.lease_expires_at.is_(None), models.Job.lease_expires_at < now),
+    )
+
+    if job_id is None:
+        candidate = (
+            db.query(models.Job.id)
+            .filter(claimable)
+            .order_by(models.Job.created_at)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if candidate is None:
+            db.rollback()
+            return None
+        job_id = candidate.id
+
+    claimed = (
+        db.query(models.Job)
+        .filter(models.Job.id == job_id, claimable)
+        .update(
+            {
+                models.Job.worker_id: worker_id,
+                models.Job.lease_expires_at: now
+                + datetime.timedelta(seconds=config.JOB_LEASE_SECONDS),
+                models.Job.attempts: models.Job.attempts + 1,
+                models.Job.updated_at: now,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if claimed != 1:
+        return None
+    # The session's job updates now require this worker to own the job
+    db.info["job_worker_id"] = worker_id
+    db_job = get_job(db, job_id)
+    db.refresh(db_job)
+    return db_job
+
+
+# States of a job item that need no more work
+FINISHED_JOB_ITEM_STATES = ("scored", "skipped", "failed")
+
+
+def create_job_items(
+    db: Session, job_id: str, links: List[tuple[int, str]], known_urls: set[str] = frozenset()
+) -> List[models.JobItem]:
+    """
+    Persist the planned work of a scraping job.
+
+    Args:
+        db: Database session
+        job_id: ID of the job
+        links: (source_id, article URL) pairs, in processing order
+        known_urls: URLs of articles already stored, planned as "skipped"
+
+    Returns:
+        The created job items
+    """
+    if links:
+        db.execute(
+            insert(models.JobItem),
+            [
+                {
+                    "job_id": job_id,
+                    "source_id": source_id,
+                    "url": url,
+                    "state": "skipped" if url in known_urls else "planned",
+                }
+                for source_id, url in links
+            ],
+        )
+        db.commit()
+    return get_job_items(db, job_id)
+
+
+def get_job_items(db: Session, job_id: str) -> List[models.JobItem]:
+    return (
+        db.query(models.JobItem)
+        .filter(models.JobItem.job_id == job_id)
+        .order_by(models.JobItem.id)
+        .all()
+    )
+
+
+def update_job_item(db: Session, job_item: models.JobItem, state: str, article_id: int | None = None):
+    """Checkpoint the progress of a job item."""
+    job_item.state = state
+    if article_id is not None:
+        job_item.article_id = article_id
+    job_item.updated_at = datetime.datetime.utcnow()
+    db.add(job_item)
+    db.commit()
+    return job_item
+
+
+def create_article_for_job_item(db: Session, article: schemas.ArticleCreate, job_item: models.JobItem):
+    """
+    Create an article and checkpoint its job item as "stored" in the same
+    transaction, so a resumed job never stores the article twice.
+    """
+    db_article = models.Article(
+        url=article.url,
+        normalized_url=canonicalize_url(article.url),
+        link_normalized_url=_link_normalized_url(article),
+        title=article.title,
+        original_content=article.original_content,
+        summary=article.summary,
+        source_id=article.source_id,
+        read=article.read,
+    )
+    db.add(db_article)
+    db.flush()
+    job_item.state = "stored"
+    job_item.article_id = db_article.id
+    job_item.updated_at = datetime.datetime.utcnow()
+    db.add(job_item)
+    db.commit()
+    db.refresh(db_article)
+    return db_article
+
+
+def reset_job_for_resume(db: Session, job_id: str) -> models.Job | None:
+    """
+    Make a failed or canceled job claimable again. Its finished job items are
+    kept, so only the remaining work is redone.
+
+    Returns:
+        The job, or None if it does not exist or cannot be resumed
+    """
+    db_job = get_job(db, job_id)
+    if db_job is None or db_job.status not in ["failed", "canceled"]:
+        return None
+    db_job.status = "pending"
+    db_job.message = "Waiting for a worker..."
+    db_job.cancel_requested = False
+    db_job.worker_id = None
+    db_job.lease_expires_at = None
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
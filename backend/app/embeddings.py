@@ -0,0 +1,321 @@
+import re
+import threading
+import zlib
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Hashed TF-IDF "embeddings" of article texts, used by the embedding scoring
+# engine (see scoring.py) as a cheap alternative to one LLM call per article.
+#
+# Each text becomes a sparse vector: its words are hashed into DIMENSIONS
+# buckets with a log-scaled term frequency, and only the MAX_TERMS heaviest
+# terms are kept. The vectors of all articles form a CSR matrix held in NumPy
+# arrays; IDF weights come from the document frequencies of that matrix, so
+# nothing besides the vectors needs to be stored.
+
+DIMENSIONS = 2**20
+MAX_TERMS = 128
+
+_WORD = re.compile(r"[^\W\d_]{3,}")
+STOP_WORDS = frozenset(
+    """
+    about above after again against all also and any are because been before
+    being below between both but can could did does doing down during each
+    few for from further had has have having her here hers herself him
+    himself his how into its itself just more most much must myself nor not
+    now off once only other our ours ourselves out over own said same she
+    should some such than that the their theirs them themselves then there
+    these they this those through too under until very was were what when
+    where which while who whom why will with would you your yours yourself
+    yourselves interested interest interests especially like really news
+    articles article dont don
+    """.split()
+)
+
+
+def _terms(text: str | None) -> list[str]:
+    return [
+        word
+        for word in _WORD.findall((text or "").lower())
+        if word not in STOP_WORDS
+    ]
+
+
+def embed_text(text: str | None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the sparse vector of a text as (sorted bucket indices as uint32,
+    log-scaled term frequencies as float16). Both are empty for texts
+    without any usable word.
+    """
+    terms = _terms(text)
+    if not terms:
+        return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float16)
+    hashes = np.fromiter(
+        (zlib.crc32(term.encode("utf-8")) for term in terms),
+        dtype=np.uint32,
+        count=len(terms),
+    ) & np.uint32(DIMENSIONS - 1)
+    indices, counts = np.unique(hashes, return_counts=True)
+    if len(indices) > MAX_TERMS:
+        keep = np.sort(np.argsort(counts, kind="stable")[-MAX_TERMS:])
+        indices, counts = indices[keep], counts[keep]
+    return indices, (1 + np.log(counts)).astype(np.float16)
+
+
+def encode(indices: np.ndarray, values: np.ndarray) -> bytes:
+    return indices.astype(np.uint32).tobytes() + values.astype(np.float16).tobytes()
+
+
+def decode(blob: bytes) -> tuple[np.ndarray, np.ndarray]:
+    size = len(blob) // 6
+    return (
+        np.frombuffer(blob, dtype=np.uint32, count=size),
+        np.frombuffer(blob, dtype=np.float16, count=size, offset=size * 4),
+    )
+
+
+def embed_article(article: models.Article):
+    """Sets the article's embedding from its title and content (no commit)."""
+    if article.embedding is not None:
+        # The cached index may hold the previous vector
+        reset_index()
+    article.embedding = encode(
+        *embed_text(f"{article.title or ''}\n{article.original_content or ''}")
+    )
+    return article
+
+
+def dense_vector(indices: np.ndarray, values: np.ndarray, idf) -> np.ndarray:
+    """Dense, IDF-weighted and normalized form of a sparse vector."""
+    weights = values.astype(np.float32) * idf[indices]
+    norm = np.linalg.norm(weights)
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    vector[indices] = weights / norm if norm else weights
+    return vector
+
+
+def _idf(count: int, log_document_frequencies: np.ndarray) -> np.ndarray:
+    # log((1 + count) / (1 + df)) + 1
+    return (np.log1p(count) + 1 - log_document_frequencies).astype(np.float32)
+
+
+class IdfWeights:
+    """
+    IDF weights computed only for the buckets they are indexed with, as
+    idf[indices], instead of for all DIMENSIONS buckets.
+    """
+
+    def __init__(self, count: int, log_document_frequencies: np.ndarray):
+        self.count = count
+        self.log_document_frequencies = log_document_frequencies
+
+    def __getitem__(self, indices) -> np.ndarray:
+        return _idf(self.count, self.log_document_frequencies[indices])
+
+
+class VectorIndex:
+    """
+    The embeddings of all stored articles as a CSR matrix: the vector of
+    ids[i] has indices[offsets[i]:offsets[i + 1]] and the matching values.
+    """
+
+    def __init__(self, ids, indices, values, offsets, document_frequencies=None):
+        self.ids = ids
+        self.indices = indices
+        self.values = values
+        self.offsets = offsets
+        self._document_frequencies = document_frequencies
+        self._idf = None
+
+    @property
+    def document_frequencies(self) -> np.ndarray:
+        """Number of articles having each bucket."""
+        if self._document_frequencies is None:
+            self._document_frequencies = np.bincount(self.indices, minlength=DIMENSIONS).astype(np.int32)
+        return self._document_frequencies
+
+    @classmethod
+    def from_rows(cls, rows) -> "VectorIndex":
+        """Builds the index from (article id, embedding blob) rows."""
+        ids, indices, values, lengths = [], [], [], []
+        for article_id, blob in rows:
+            row_indices, row_values = decode(blob or b"")
+            ids.append(article_id)
+            indices.append(row_indices)
+            values.append(row_values)
+            lengths.append(len(row_indices))
+        offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(
+            np.array(ids, dtype=np.int64),
+            np.concatenate(indices) if indices else np.empty(0, dtype=np.uint32),
+            np.concatenate(values) if values else np.empty(0, dtype=np.float16),
+            offsets,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def idf(self) -> np.ndarray:
+        if self._idf is None:
+            self._idf = _idf(len(self), np.log1p(self.document_frequencies))
+        return self._idf
+
+    def query_vector(self, text: str, idf: np.ndarray | None = None) -> np.ndarray:
+        """Dense, IDF-weighted and normalized vector of a query text."""
+        return dense_vector(*embed_text(text), self.idf() if idf is None else idf)
+
+    def cosine_similarities(self, query_vectors: list[np.ndarray], idf: np.ndarray | None = None) -> list[np.ndarray]:
+        """
+        Cosine similarity between every article and each query vector, in a
+        single vectorized pass over the matrix. Articles without an
+        embedding get 0.
+        """
+        idf = self.idf() if idf is None else idf
+        weighted = self.values * idf[self.indices]
+        non_empty = np.flatnonzero(np.diff(self.offsets))
+        starts = self.offsets[non_empty]
+
+        norms = np.zeros(len(self), dtype=np.float32)
+        if len(non_empty):
+            norms[non_empty] = np.sqrt(np.add.reduceat(weighted * weighted, starts))
+
+        results = []
+        for query in query_vectors:
+            dots = np.zeros(len(self), dtype=np.float32)
+            if len(non_empty):
+                dots[non_empty] = np.add.reduceat(weighted * query[self.indices], starts)
+            results.append(np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0))
+        return results
+
+
+# Process-wide cache of the stored embeddings, extended with the articles
+# stored since it was loaded: the CSR matrix as a list of chunks (merged when
+# the whole index is needed) and the document frequencies, which are all that
+# IDF weights need. It is reset when articles are (re-)embedded in this
+# process, and load_index also rebuilds it if articles it holds were deleted.
+_chunks: list[VectorIndex] = []
+_document_frequencies: np.ndarray | None = None
+_log_document_frequencies: np.ndarray | None = None
+_count = 0
+_max_id = 0
+_signature = None
+_cache_lock = threading.Lock()
+
+
+def _article_count(db: Session, max_id: int):
+    # Only reads the primary key index
+    return db.query(func.count(models.Article.id)).filter(models.Article.id <= max_id).scalar()
+
+
+def _add_chunk(chunk: VectorIndex):
+    global _count
+    _chunks.append(chunk)
+    _count += len(chunk)
+    np.add.at(_document_frequencies, chunk.indices, 1)
+    touched = np.unique(chunk.indices)
+    _log_document_frequencies[touched] = np.log1p(_document_frequencies[touched])
+
+
+def _refresh(db: Session, check_deleted: bool):
+    """Brings the cache up to date with the database (with the lock held)."""
+    global _chunks, _document_frequencies, _log_document_frequencies, _count, _max_id, _signature
+    query = db.query(models.Article.id, models.Article.embedding).filter(
+        models.Article.embedding.isnot(None)
+    )
+    if _document_frequencies is None or (
+        check_deleted and _article_count(db, _max_id) != _signature
+    ):
+        _chunks = []
+        _document_frequencies = np.zeros(DIMENSIONS, dtype=np.int32)
+        _log_document_frequencies = np.zeros(DIMENSIONS, dtype=np.float64)
+        _count = 0
+        rows = query.order_by(models.Article.id).all()
+    else:
+        rows = query.filter(models.Article.id > _max_id).order_by(models.Article.id).all()
+    if rows:
+        _add_chunk(VectorIndex.from_rows(rows))
+        _max_id = rows[-1][0]
+        _signature = None
+    if check_deleted and _signature is None:
+        _signature = _article_count(db, _max_id)
+
+
+def load_index(db: Session) -> VectorIndex:
+    """
+    Returns the vector index of all embedded articles. It is cached, and
+    only the articles added since the last call are read.
+    """
+    global _chunks
+    with _cache_lock:
+        _refresh(db, check_deleted=True)
+        if len(_chunks) != 1:
+            offsets = [np.zeros(1, dtype=np.int64)]
+            for chunk in _chunks:
+                offsets.append(chunk.offsets[1:] + offsets[-1][-1])
+            _chunks = [
+                VectorIndex(
+                    np.concatenate([np.empty(0, dtype=np.int64)] + [chunk.ids for chunk in _chunks]),
+                    np.concatenate([np.empty(0, dtype=np.uint32)] + [chunk.indices for chunk in _chunks]),
+                    np.concatenate([np.empty(0, dtype=np.float16)] + [chunk.values for chunk in _chunks]),
+                    np.concatenate(offsets),
+                    _document_frequencies.copy(),
+                )
+            ]
+        return _chunks[0]
+
+
+def load_idf(db: Session) -> IdfWeights:
+    """
+    IDF weights of all embedded articles, for scoring or comparing a few
+    articles. Much cheaper than load_index(db).idf() after new articles were
+    stored: the matrix is not merged and only the needed weights are
+    computed. Meant to be used right away, as the next refresh updates them.
+    """
+    with _cache_lock:
+        _refresh(db, check_deleted=False)
+        return IdfWeights(_count, _log_document_frequencies)
+
+
+def reset_index():
+    global _chunks, _document_frequencies, _log_document_frequencies, _count, _max_id, _signature
+    with _cache_lock:
+        _chunks = []
+        _document_frequencies = None
+        _log_document_frequencies = None
+        _count = 0
+        _max_id = 0
+        _signature = None
+
+
+def embed_missing_articles(db: Session, batch_size: int = 500, progress_callback=None) -> int:
+    """
+    Computes the embeddings of the articles that don't have one yet (e.g.
+    stored before embeddings existed). Returns the number of articles embedded.
+    """
+    embedded = 0
+    last_id = 0
+    while True:
+        articles = (
+            db.query(models.Article)
+            .filter(models.Article.embedding.is_(None))
+            .filter(models.Article.id > last_id)
+            .order_by(models.Article.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not articles:
+            return embedded
+        for article in articles:
+            embed_article(article)
+            last_id = article.id
+        db.commit()
+        # Older articles are not picked up by the incremental loading
+        reset_index()
+        embedded += len(articles)
+        if progress_callback:
+            progress_callback(embedded)
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable
+
+from . import config, schemas
+
+FINISHED_JOB_STATUSES = ("completed", "failed", "canceled")
+
+# Latest status of the jobs updated by this process, with a version number
+# that changes on every update. Bounded so finished jobs don't accumulate.
+MAX_TRACKED_JOBS = 1000
+_latest: "OrderedDict[str, tuple[int, schemas.JobStatus]]" = OrderedDict()
+_lock = threading.Lock()
+_version = 0
+
+
+def publish(status: schemas.JobStatus):
+    """
+    Records the latest status of a job. Called on every job update, from
+    whichever thread runs the job; subscribers pick it up on their next tick.
+    """
+    global _version
+    with _lock:
+        _version += 1
+        _latest[status.id] = (_version, status)
+        _latest.move_to_end(status.id)
+        while len(_latest) > MAX_TRACKED_JOBS:
+            _latest.popitem(last=False)
+
+
+def get_latest(job_id: str) -> tuple[int, schemas.JobStatus] | None:
+    with _lock:
+        return _latest.get(job_id)
+
+
+def status_delta(previous: dict, status: schemas.JobStatus) -> dict:
+    """Returns the fields of status that differ from the previous values."""
+    return {
+        key: value
+        for key, value in status.model_dump().items()
+        if key not in previous or previous[key] != value
+    }
+
+
+def _format_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_job_status(
+    job_id: str,
+    load_status: Callable[[], Awaitable[schemas.JobStatus | None]],
+    is_disconnected: Callable[[], Awaitable[bool]],
+) -> AsyncIterator[str]:
+    """
+    Server-sent event stream of a job's progress.
+
+    The first "progress" event carries the full JobStatus; later ones only
+    the fields that changed. Updates are coalesced: at most one event is sent
+    per JOB_EVENTS_COALESCE_SECONDS, however often the job reports progress.
+    Jobs updated by this process are read from memory; when there is no
+    in-memory update (e.g. the job runs in a separate worker process), the
+    status is read through load_status, at most every
+    JOB_EVENTS_DB_POLL_SECONDS. The stream ends with an "end" event once the
+    job is finished.
+    """
+    sent: dict = {}
+    seen_version = None
+    last_db_poll = 0.0
+    last_event = time.monotonic()
+
+    while not await is_disconnected():
+        status = None
+        latest = get_latest(job_id)
+        if latest is not None and latest[0] != seen_version:
+            seen_version, status = latest
+            last_db_poll = time.monotonic()
+        elif time.monotonic() - last_db_poll >= config.JOB_EVENTS_DB_POLL_SECONDS:
+            last_db_poll = time.monotonic()
+            status = await load_status()
+
+        if status is not None:
+            delta = status_delta(sent, status)
+            if delta:
+                sent.update(delta)
+                last_event = time.monotonic()
+                yield _format_event("progress", delta)
+            if status.status in FINISHED_JOB_STATUSES:
+                yield _format_event("end", {"status": status.status})
+                return
+
+        if time.monotonic() - last_event >= config.JOB_EVENTS_HEARTBEAT_SECONDS:
+            last_event = time.monotonic()
+            yield ": keep-alive\n\n"
+
+        await asyncio.sleep(config.JOB_EVENTS_COALESCE_SECONDS)
@@ -0,0 +1,532 @@
+import datetime
+import os
+import socket
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from . import config, crud, link_selectors, llm_interface, metrics, scheduler, schemas, scoring, scraping, seen_links, stories, summaries
+from .database import SessionLocal
+from .urls import canonicalize_url
+
+
+def run_scraping_job(job_id: str, db: Session = None, source_id: int | None = None):
+    """
+    The actual scraping logic that runs in the background.
+    """
+    start_time = time.time()
+
+    if db is None:
+        db = SessionLocal()
+
+    print(f"JOB {job_id}: Starting.")
+    if crud.get_job(db, job_id) is None:
+        crud.create_job(db, "scrape", {"source_id": source_id}, job_id=job_id)
+    crud.update_job(db, job_id, status="pending", progress=0, message="Initializing...")
+
+    # Selector re-detection jobs enqueued for sources whose selector broke
+    redetection_job_ids = []
+    try:
+        sources = crud.get_sources(db) if source_id is None else [crud.get_source(db, source_id)]
+        if not sources or sources[0] is None:
+            raise HTTPException(status_code=404, detail="Source not found")
+
+        total_sources = len(sources)
+        print(f"JOB {job_id}: Found {total_sources} sources.")
+
+        # --- Pre-computation Step ---
+        # The planned work is persisted as job items. A job that is resumed
+        # (after a crash, or a failure/cancellation) already has them and
+        # skips the pre-scan.
+        job_items = crud.get_job_items(db, job_id)
+        if job_items:
+            print(f"JOB {job_id}: Resuming with {len(job_items)} planned articles.")
+        else:
+            all_articles_to_scrape = []
+            seen_urls = set()
+            stored_urls = set()
+            for i, source in enumerate(sources):
+                print(f"JOB {job_id}: Pre-scanning source {i+1}/{total_sources}: {source.name}")
+                # Also renews the lease, and stops the job if it was lost
+                crud.update_job(db, job_id, message=f"Pre-scanning source {i+1}/{total_sources}: {source.name}")
+                article_links, redetection_job_id = link_selectors.get_article_links(db, source)
+                if redetection_job_id:
+                    redetection_job_ids.append(redetection_job_id)
+                # Links already stored are planned as skipped, without a lookup each
+                stored_links = seen_links.find_stored_links(db, source, article_links)
+                metrics.scraped_articles.inc(len(stored_links), outcome="skipped")
+                stored_urls |= stored_links
+                for link in article_links:
+                    normalized_url = canonicalize_url(link)
+                    if normalized_url not in seen_urls:
+                        seen_urls.add(normalized_url)
+                        all_articles_to_scrape.append((source.id, link))
+            job_items = crud.create_job_items(db, job_id, all_articles_to_scrape, known_urls=stored_urls)
+
+        total_articles = len(job_items)
+        print(f"JOB {job_id}: Found a total of {total_articles} new articles to scrape across {total_sources} sources.")
+
+        # Items finished by a previous run count as already handled
+        processed_articles_count = sum(item.state == "scored" for item in job_items)
+        skipped_articles_count = sum(item.state == "skipped" for item in job_items)
+        failed_articles_count = sum(item.state == "failed" for item in job_items)
+
+        # --- Progress Update Callback ---
+        def update_progress(processed: int = 0, skipped: int = 0, failed: int = 0):
+            nonlocal processed_articles_count, skipped_articles_count, failed_articles_count
+
+            processed_articles_count += processed
+            skipped_articles_count += skipped
+            failed_articles_count += failed
+
+            handled_articles = processed_articles_count + skipped_articles_count + failed_articles_count
+            progress = int((handled_articles / total_articles) * 100) if total_articles > 0 else 0
+
+            elapsed_time = time.time() - start_time
+            eta_seconds = (elapsed_time / handled_articles) * (total_articles - handled_articles) if handled_articles > 0 else -1.0
+
+            crud.update_job(
+                db,
+                job_id,
+                progress=progress,
+                total_articles=total_articles,
+                processed_articles=processed_articles_count,
+                skipped_articles=skipped_articles_count,
+                failed_articles=failed_articles_count,
+                eta_seconds=eta_seconds,
+                message=f"Scraped {processed_articles_count}/{total_articles} articles...",
+            )
+
+        crud.update_job(db, job_id, status="in_progress", total_sources=total_sources)
+
+        # --- Main Processing Loop ---
+        for i, source in enumerate(sources):
+            crud.update_job(
+                db,
+                job_id,
+                processed_sources=i,
+                message=f"Processing source {i+1}/{total_sources}: {source.name}",
+            )
+
+            if crud.is_job_cancel_requested(db, job_id):
+                print(f"JOB {job_id}: Cancellation detected. Terminating.")
+                crud.update_job(db, job_id, status="canceled", message="Job canceled by user.")
+                return
+
+            items_for_current_source = [
+                item
+                for item in job_items
+                if item.source_id == source.id
+                and item.state not in crud.FINISHED_JOB_ITEM_STATES
+            ]
+
+            polled_at = datetime.datetime.utcnow()
+            canceled = scraping.scrape_source(
+                db=db,
+                source=source,
+                job_id=job_id,
+                update_progress_callback=update_progress,
+                job_items=items_for_current_source,
+            )
+
+            if canceled:
+                print(f"JOB {job_id}: Cancellation confirmed. Terminating.")
+                crud.update_job(db, job_id, status="canceled", message="Job canceled by user.")
+                return
+
+            print(f"JOB {job_id}: Finished scrape for source: {source.name}")
+            seen_links.remember_links(
+                db, source, [item.url for item in job_items if item.source_id == source.id and item.state != "failed"]
+            )
+            scheduler.record_poll(db, source, polled_at)
+
+        if config.SUMMARY_MODE != "lazy":
+            # One LLM summary per story that got new articles
+            crud.update_job(db, job_id, message="Summarizing stories...")
+            summarized = stories.summarize_stories(db)
+            print(f"JOB {job_id}: Summarized {summarized} stories.")
+        else:
+            queued = summaries.prefetch_best_articles(db)
+            print(f"JOB {job_id}: Queued {queued} articles for summarization.")
+
+        print(f"JOB {job_id}: All sources processed. Completing job.")
+        crud.update_job(db, job_id, status="completed", message="Scraping complete!")
+
+    except Exception as e:
+        print(f"JOB {job_id}: An error occurred: {e}")
+        db.rollback()
+        crud.update_job(
+            db, job_id, status="failed", progress=0, message=f"An error occurred: {e}"
+        )
+    finally:
+        print(f"JOB {job_id}: Closing database session.")
+        db.close()
+
+    # Without workers, nothing else would run the re-detection jobs
+    if config.JOB_EXECUTION_MODE == "embedded":
+        for redetection_job_id in redetection_job_ids:
+            execute_job(redetection_job_id)
+
+
+def run_article_scoring_job(job_id: str, db: Session = None):
+    """
+    Background task that recalculates interest scores for all articles.
+    """
+    if db is None:
+        db = SessionLocal()
+
+    if crud.get_job(db, job_id) is None:
+        crud.create_job(db, "score", job_id=job_id)
+    crud.update_job(
+        db, job_id, status="in_progress", progress=0, message="Starting article scoring..."
+    )
+
+    try:
+        interest_prompt = crud.get_interest_prompt(db)
+
+        if config.SCORING_ENGINE == "embedding":
+            # No LLM calls: all articles are scored in one vectorized pass
+            total_articles = scoring.rescore_all_articles(
+                db,
+                interest_prompt,
+                progress_callback=lambda embedded: crud.update_job(
+                    db, job_id, message=f"Computed embeddings of {embedded} articles..."
+                ),
+            )
+            crud.update_job(
+                db,
+                job_id,
+                status="completed",
+                progress=100,
+                total_articles=total_articles,
+                processed_articles=total_articles,
+                message=f"Successfully scored {total_articles} articles!",
+            )
+            return
+
+        # Get all articles
+        articles = crud.get_articles(db)
+        total_articles = len(articles)
+
+        for i, article in enumerate(articles):
+            if crud.is_job_cancel_requested(db, job_id):
+                crud.update_job(db, job_id, status="canceled", message="Job canceled by user.")
+                return
+
+            # Update progress
+            progress = int(((i + 1) / total_articles) * 100)
+            crud.update_job(
+                db,
+                job_id,
+                progress=progress,
+                total_articles=total_articles,
+                processed_articles=i,
+                message=f"Scoring article {i+1} of {total_articles}...",
+            )
+
+            # Calculate score
+            interest_score = llm_interface.generate_interest_score(
+                article_text=article.original_content,
+                user_interest_prompt=interest_prompt,
+            )
+
+            # Update article in DB (a failed scoring keeps the previous score)
+            if interest_score is not None:
+                crud.update_article_interest_score(
+                    db, article_id=article.id, interest_score=interest_score
+                )
+
+        crud.update_job(
+            db,
+            job_id,
+            status="completed",
+            progress=100,
+            processed_articles=total_articles,
+            message=f"Successfully scored {total_articles} articles!",
+        )
+
+    except Exception as e:
+        db.rollback()
+        crud.update_job(
+            db, job_id, status="failed", progress=0, message=f"An error occurred: {e}"
+        )
+    finally:
+        db.close()
+
+
+# Number of articles whose LLM calls are sent concurrently by the repair job
+REPAIR_BATCH_SIZE = 20
+
+
+def _repair_article(
+    article_text: str, needs_summary: bool, needs_score: bool, interest_score: int | None, interest_prompt: str
+):
+    """
+    Runs the missing LLM steps for one article (called from worker threads),
+    given its current score. Returns its summary, categories and score.
+    """
+    summary, categories = None, []
+    if needs_score:
+        interest_score = llm_interface.generate_interest_score(
+            article_text=article_text, user_interest_prompt=interest_prompt
+        )
+    if needs_summary and scoring.summary_allowed(interest_score):
+        summary, categories = llm_interface.generate_summary_and_categories(
+            article_text=article_text
+        )
+    return summary, categories, interest_score
+
+
+def run_enrichment_repair_job(job_id: str, db: Session = None):
+    """
+    Background task that completes articles whose summary or interest score
+    is missing (e.g. because an LLM call failed during scraping). Only the
+    missing steps are run, and the LLM calls of each batch run concurrently.
+    """
+    if db is None:
+        db = SessionLocal()
+
+    if crud.get_job(db, job_id) is None:
+        crud.create_job(db, "repair", job_id=job_id)
+    crud.update_job(
+        db, job_id, status="in_progress", progress=0, message="Looking for incomplete articles..."
+    )
+
+    try:
+        total_articles = crud.count_articles_needing_enrichment(db)
+        interest_prompt = crud.get_interest_prompt(db)
+        repaired_count = 0
+        failed_count = 0
+        last_id = 0
+
+        while True:
+            if crud.is_job_cancel_requested(db, job_id):
+                crud.update_job(db, job_id, status="canceled", message="Job canceled by user.")
+                return
+
+            articles = crud.get_articles_needing_enrichment(
+                db, after_id=last_id, limit=REPAIR_BATCH_SIZE
+            )
+            if not articles:
+                break
+            last_id = articles[-1].id
+
+            # Near duplicates reuse the enrichment of their story's first article
+            to_process = []
+            for article in articles:
+                root = (
+                    crud.get_article(db, article.duplicate_of_id)
+                    if article.duplicate_of_id
+                    else None
+                )
+                if root is not None and root.summary and root.interest_score is not None:
+                    crud.copy_article_enrichment(db, article_id=article.id, from_article=root)
+                    repaired_count += 1
+                else:
+                    # Articles scoring below SUMMARY_MIN_SCORE are not
+                    # summarized, and in lazy mode none are
+                    needs_summary = config.SUMMARY_MODE != "lazy" and article.summary is None and (
+                        article.interest_score is None
+                        or article.interest_score >= config.SUMMARY_MIN_SCORE
+                    )
+                    needs_score = article.interest_score is None
+                    if not needs_summary and not needs_score:
+                        # Complete as it is: not counted as repaired
+                        total_articles -= 1
+                        continue
+                    to_process.append(
+                        (article.id, article.original_content, needs_summary, needs_score, article.interest_score)
+                    )
+
+            # The embedding engine scores without the LLM, before the batch
+            if config.SCORING_ENGINE == "embedding":
+                for i, (article_id, content, needs_summary, needs_score, _) in enumerate(to_process):
+                    if needs_score:
+                        score = scoring.score_article(db, crud.get_article(db, article_id), interest_prompt)
+                        if score is not None:
+                            crud.update_article_interest_score(db, article_id=article_id, interest_score=score)
+                        to_process[i] = (article_id, content, needs_summary, False, score)
+            results = llm_interface.run_concurrently(
+                lambda work: _repair_article(*work[1:], interest_prompt), to_process
+            )
+
+            for (article_id, _, needs_summary, needs_score, _), (summary, categories, score) in zip(to_process, results):
+                if summary:
+                    crud.update_article_summary(db, article_id=article_id, summary=summary)
+                if categories:
+                    crud.link_categories_to_article(db, article_id=article_id, categories=categories)
+                # A failed scoring stays NULL, so the next repair retries it
+                if needs_score and score is not None:
+                    crud.update_article_interest_score(db, article_id=article_id, interest_score=score)
+                if score is None or (needs_summary and not summary and scoring.summary_allowed(score)):
+                    failed_count += 1
+                else:
+                    repaired_count += 1
+
+            handled = repaired_count + failed_count
+            crud.update_job(
+                db,
+                job_id,
+                progress=int((handled / total_articles) * 100) if total_articles > 0 else 100,
+                total_articles=total_articles,
+                processed_articles=repaired_count,
+                failed_articles=failed_count,
+                message=f"Repaired {repaired_count}/{total_articles} articles...",
+            )
+
+        crud.update_job(
+            db,
+            job_id,
+            status="completed",
+            progress=100,
+            total_articles=total_articles,
+            processed_articles=repaired_count,
+            failed_articles=failed_count,
+            message=f"Repaired {repaired_count} articles ({failed_count} still incomplete).",
+        )
+
+    except Exception as e:
+        db.rollback()
+        crud.update_job(
+            db, job_id, status="failed", progress=0, message=f"An error occurred: {e}"
+        )
+    finally:
+        db.close()
+
+
+def run_selector_detection_job(job_id: str, db: Session = None, source_id: int | None = None):
+    """
+    Background task that detects a new article link selector for a source
+    whose selector stopped matching links (see link_selectors.py).
+    """
+    if db is None:
+        db = SessionLocal()
+
+    if crud.get_job(db, job_id) is None:
+        crud.create_job(db, "detect_selector", {"source_id": source_id}, job_id=job_id)
+    crud.update_job(db, job_id, status="in_progress", progress=0, message="Detecting the article link selector...")
+
+    try:
+        source = crud.get_source(db, source_id)
+        if source is None:
+            crud.update_job(db, job_id, status="failed", message="Source not found.")
+            return
+        selector = link_selectors.redetect_source_selector(db, source)
+        if selector:
+            crud.update_job(
+                db, job_id, status="completed", progress=100,
+                message=f"New selector for {source.name}: {selector}",
+            )
+        else:
+            crud.update_job(
+                db, job_id, status="failed", progress=100,
+                message=f"No working selector found for {source.name}.",
+            )
+    except Exception as e:
+        db.rollback()
+        crud.update_job(
+            db, job_id, status="failed", progress=0, message=f"An error occurred: {e}"
+        )
+    finally:
+        db.close()
+
+
+# Job type -> handler. Handlers are called as handler(job_id, db, **payload)
+# and are responsible for updating the job status and closing the session.
+JOB_HANDLERS = {
+    "scrape": run_scraping_job,
+    "score": run_article_scoring_job,
+    "repair": run_enrichment_repair_job,
+    "detect_selector": run_selector_detection_job,
+}
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_job(db: Session, job) -> None:
+    """
+    Runs a job that has already been claimed by the current worker.
+    """
+    handler = JOB_HANDLERS.get(job.type)
+    if handler is None:
+        crud.update_job(
+            db, job.id, status="failed", message=f"Unknown job type: {job.type}"
+        )
+        db.close()
+        return
+
+    print(f"JOB {job.id}: Running '{job.type}' job (attempt {job.attempts}).")
+    job_id, job_type, worker_id = job.id, job.type, job.worker_id
+    stop_renewing = threading.Event()
+    threading.Thread(
+        target=_keep_lease, args=(stop_renewing, db.get_bind(), job_id, worker_id), daemon=True
+    ).start()
+    start = time.perf_counter()
+    status = None
+    try:
+        handler(job_id, db, **(job.payload or {}))
+    except crud.JobLeaseLost as e:
+        print(f"JOB {job_id}: Lease lost, stopping. {e}")
+        db.rollback()
+        status = "lease_lost"
+    finally:
+        stop_renewing.set()
+        if status is None:
+            # The handler closed the session; it opens again for this read
+            finished = crud.get_job(db, job_id)
+            status = finished.status if finished is not None else "deleted"
+        db.close()
+        metrics.job_seconds.observe(time.perf_counter() - start, type=job_type, status=status)
+
+
+def _keep_lease(stop: threading.Event, bind, job_id: str, worker_id: str):
+    """
+    Renews a worker's lease on a job while its handler runs, since a long
+    step (e.g. an LLM call) makes no progress update. Stops when the lease
+    was lost: the handler's next update then fails.
+    """
+    while not stop.wait(config.JOB_LEASE_SECONDS / 3):
+        with Session(bind=bind) as db:
+            try:
+                if not crud.renew_job_lease(db, job_id, worker_id):
+                    return
+            except Exception as e:
+                print(f"JOB {job_id}: Could not renew the lease: {e}")
+
+
+def execute_job(job_id: str, db: Session = None, worker_id: str | None = None) -> bool:
+    """
+    Claims and runs a specific job in the current process. Used by the API in
+    "embedded" execution mode. Returns False if the job could not be claimed
+    (e.g. a worker took it first).
+    """
+    if db is None:
+        db = SessionLocal()
+
+    job = crud.claim_job(db, worker_id or default_worker_id(), job_id=job_id)
+    if job is None:
+        print(f"JOB {job_id}: Already claimed by another worker.")
+        db.close()
+        return False
+
+    run_job(db, job)
+    return True
+
+
+def execute_next_job(worker_id: str | None = None) -> bool:
+    """
+    Claims and runs the oldest claimable job, if any. Returns True if a job
+    was run.
+    """
+    db = SessionLocal()
+    job = crud.claim_job(db, worker_id or default_worker_id())
+    if job is None:
+        db.close()
+        return False
+
+    run_job(db, job)
+    return True
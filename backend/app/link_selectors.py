@@ -0,0 +1,268 @@
+import datetime
+import hashlib
+import math
+import re
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup, Tag
+from sqlalchemy.orm import Session
+
+from . import config, crud, llm_interface, models, scraping
+from .token_budget import dom_skeleton
+from .urls import canonicalize_url, page_domain
+
+# Detection and upkeep of the sources' article link selectors.
+#
+# A detected selector is cached per domain and layout fingerprint (a hash of
+# the page's DOM outline without its content), so other pages with the same
+# layout, or the same page later, reuse it. Selectors configured for other
+# sources of the domain are tried too. A selector is only reused (or cached)
+# if it matches at least MIN_LINKS links on the page.
+#
+# New selectors are inferred locally (infer_selector): the page's links are
+# grouped by the selectors built from their classes and their ancestors',
+# and the groups are ranked by how many article-like links they repeat
+# (same-site URLs with a slug or an ID, anchor texts of headline length).
+# The LLM only breaks ties between groups with different links, or detects
+# the selector when no group qualifies.
+#
+# When the configured selector of a source matches no links anymore although
+# the page loads (the site changed its layout), a "detect_selector" job is
+# enqueued to detect and store a new one, at most once per
+# SELECTOR_REDETECT_INTERVAL_HOURS.
+
+# A candidate needs this many article-like links
+MIN_LINKS = 3
+# Candidates within this fraction of the best score are tied
+TIE_MARGIN = 0.1
+# Candidates (and link texts of each) shown to the LLM to break a tie
+TIE_CANDIDATES = 3
+TIE_EXAMPLES = 3
+
+_CSS_CLASS = re.compile(r"^[A-Za-z_][A-Za-z_-]*$")
+_HEADINGS = {"h1", "h2", "h3", "h4"}
+_NON_ARTICLE_PATH = re.compile(
+    r"/(tags?|topics?|category|categories|authors?|about|contact|login|signin|register|"
+    r"subscribe|search|privacy|terms)(/|$)",
+    re.IGNORECASE,
+)
+
+
+def layout_fingerprint(page: str) -> str:
+    """A hash of the page's layout, stable when only its content changes."""
+    skeleton = dom_skeleton(page, structure_only=True)
+    return hashlib.sha256(skeleton.encode()).hexdigest()[:16]
+
+
+def count_links(page: str, page_url: str, selector: str) -> int:
+    """The number of article links a selector matches in a page (0 if it is invalid)."""
+    try:
+        return len(scraping.extract_article_links(page, page_url, selector))
+    except Exception:
+        return 0
+
+
+def _selector_class(tag: Tag) -> str | None:
+    # Classes with digits are usually unique per item ("post-1234")
+    for name in tag.get("class") or ():
+        if _CSS_CLASS.match(name):
+            return name
+    return None
+
+
+def _candidate_selectors(link: Tag) -> list[str]:
+    """The selectors that could target a link, from its own and its ancestors' classes."""
+    own = _selector_class(link)
+    candidates = [f"a.{own}"] if own else []
+    for depth, ancestor in enumerate(link.parents):
+        if depth >= 4 or ancestor.name in ("body", "html", "[document]"):
+            break
+        if ancestor.name in _HEADINGS:
+            candidates.append(f"{ancestor.name} a")
+        ancestor_class = _selector_class(ancestor)
+        if ancestor_class:
+            candidates.append(f".{ancestor_class} a")
+            if own:
+                candidates.append(f".{ancestor_class} a.{own}")
+            break
+    return candidates
+
+
+def _preference(selector: str) -> tuple[bool, int]:
+    # Classes say what an element is, so they survive small layout changes
+    # better than tags: prefer them, then the simplest selector
+    return "." not in selector, len(selector)
+
+
+def _is_article_url(url: str, page_url: str) -> bool:
+    parsed, page = urlparse(url), urlparse(page_url)
+    if parsed.scheme not in ("http", "https") or page_domain(url) != page_domain(page_url):
+        return False
+    path = parsed.path.rstrip("/")
+    if not path or path == page.path.rstrip("/") or _NON_ARTICLE_PATH.search(path):
+        return False
+    slug = path.rsplit("/", 1)[-1]
+    return "-" in slug or any(c.isdigit() for c in slug) or len(slug) >= 12
+
+
+def infer_selector_candidates(page: str, page_url: str) -> list[tuple[str, float, list[str]]]:
+    """
+    The candidate article link selectors of a page, best first, with their
+    score and the texts of the links they match. Candidates matching the
+    same links are merged into the preferred selector.
+    """
+    soup = BeautifulSoup(page, "lxml")
+    for element in soup.find_all(["nav", "aside", "footer", "script", "style"]):
+        element.decompose()
+    selectors = {}
+    for link in soup.find_all("a", href=True):
+        for selector in _candidate_selectors(link):
+            selectors.setdefault(selector, None)
+
+    by_links = {}
+    for selector in selectors:
+        urls = {}
+        for link in soup.select(selector):
+            href = link.get("href")
+            if href:
+                url = urljoin(page_url, href)
+                urls.setdefault(canonicalize_url(url), (url, link.get_text(" ", strip=True)))
+        article_links = [(url, text) for url, text in urls.values() if _is_article_url(url, page_url)]
+        if len(article_links) < MIN_LINKS:
+            continue
+        # Article-like links make the group; its other links and short
+        # (or very long) anchor texts make it less likely to be the list
+        purity = len(article_links) / len(urls)
+        headlines = sum(3 <= len(text.split()) <= 30 for _, text in article_links) / len(article_links)
+        score = math.log2(1 + len(article_links)) * purity * (0.25 + headlines)
+        key = frozenset(urls)
+        best = by_links.get(key)
+        if best is None or _preference(selector) < _preference(best[0]):
+            by_links[key] = (selector, score, [text for _, text in article_links])
+    return sorted(by_links.values(), key=lambda candidate: -candidate[1])
+
+
+def infer_selector(page: str, page_url: str) -> str:
+    """
+    The article link selector of a page, inferred locally; the LLM only
+    chooses between tied candidates, or finds it when there are none.
+    """
+    candidates = infer_selector_candidates(page, page_url)
+    if not candidates:
+        return llm_interface.find_article_link_selector(page)
+    best_score = candidates[0][1]
+    tied = [candidate for candidate in candidates if candidate[1] >= best_score * (1 - TIE_MARGIN)]
+    if len(tied) > 1:
+        choice = llm_interface.choose_article_link_selector(
+            [(selector, texts[:TIE_EXAMPLES]) for selector, _, texts in tied[:TIE_CANDIDATES]]
+        )
+        if choice:
+            return choice
+    return candidates[0][0]
+
+
+def _domain_selectors(db: Session, domain: str) -> list[str]:
+    selectors = []
+    for source in crud.get_sources_by_domain(db, domain):
+        selector = (source.config or {}).get("article_link_selector")
+        if selector and selector not in selectors:
+            selectors.append(selector)
+    return selectors
+
+
+def detect_selector(db: Session, url: str, page: str) -> tuple[str, bool]:
+    """
+    The article link selector of a page, and whether it was reused (from
+    the cache or another source of the domain) instead of inferred.
+    Returns an empty selector if none was found.
+    """
+    domain = page_domain(url)
+    fingerprint = layout_fingerprint(page)
+    cached = db.get(models.DetectedSelector, (domain, fingerprint))
+    candidates = ([cached.selector] if cached is not None else []) + _domain_selectors(db, domain)
+
+    for selector in candidates:
+        if count_links(page, url, selector) >= MIN_LINKS:
+            _store(db, domain, fingerprint, selector)
+            return selector, True
+
+    selector = infer_selector(page, url)
+    if selector and count_links(page, url, selector) >= MIN_LINKS:
+        _store(db, domain, fingerprint, selector)
+    return selector, False
+
+
+def _store(db: Session, domain: str, fingerprint: str, selector: str):
+    now = datetime.datetime.utcnow()
+    entry = db.get(models.DetectedSelector, (domain, fingerprint))
+    if entry is None:
+        entry = models.DetectedSelector(domain=domain, fingerprint=fingerprint, created_at=now)
+        db.add(entry)
+    entry.selector = selector
+    entry.last_used_at = now
+    db.commit()
+
+
+def get_article_links(db: Session, source: models.Source) -> tuple[list[str], str | None]:
+    """
+    scraping.get_article_links with drift detection. Returns the links, and
+    the ID of the "detect_selector" job enqueued if the selector matched no
+    links on the page (None otherwise).
+    """
+    selector = (source.config or {}).get("article_link_selector")
+    if not selector:
+        return scraping.get_article_links(source), None
+    page = scraping.fetch_source_page(source.url)
+    if page is None:
+        return [], None
+    links = scraping.extract_article_links(page, source.url, selector)
+    if links:
+        return links, None
+    print(f"Selector '{selector}' of source {source.name} matches no links anymore.")
+    return [], request_redetection(db, source)
+
+
+def request_redetection(db: Session, source: models.Source) -> str | None:
+    """
+    Enqueues a "detect_selector" job for a source, unless one was requested
+    within SELECTOR_REDETECT_INTERVAL_HOURS. Returns the job's ID, if any.
+    """
+    source_config = source.config or {}
+    now = datetime.datetime.utcnow()
+    requested_at = source_config.get("selector_redetection_requested_at")
+    if requested_at and now - datetime.datetime.fromisoformat(requested_at) < datetime.timedelta(
+        hours=config.SELECTOR_REDETECT_INTERVAL_HOURS
+    ):
+        return None
+    # The JSON column is only saved when assigned a new value
+    source.config = {**source_config, "selector_redetection_requested_at": now.isoformat()}
+    db.add(source)
+    db.commit()
+    job = crud.create_job(db, "detect_selector", {"source_id": source.id})
+    print(f"Enqueued selector re-detection job {job.id} for source {source.name}.")
+    return job.id
+
+
+def redetect_source_selector(db: Session, source: models.Source) -> str | None:
+    """
+    Detects a new selector for a source whose selector matches no links and
+    stores it in the source's config. Returns the new selector, or None if
+    the current one works again or no working selector was found.
+    """
+    page = scraping.fetch_source_page(source.url)
+    if page is None:
+        return None
+    current = (source.config or {}).get("article_link_selector")
+    if current and count_links(page, source.url, current) > 0:
+        return None
+    selector, _ = detect_selector(db, source.url, page)
+    if not selector or count_links(page, source.url, selector) == 0:
+        return None
+    source.config = {
+        **(source.config or {}),
+        "article_link_selector": selector,
+        "previous_article_link_selector": current,
+    }
+    db.add(source)
+    db.commit()
+    return selector
@@ -1,12 +1,57 @@
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
-from google.genai import types
-from typing import Tuple, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Callable, Iterable, Tuple, List
+
+from . import config, llm_providers, metrics
+from .token_budget import dom_skeleton, estimate_tokens, lead_paragraphs, strip_boilerplate
 
 # The API key is loaded automatically from the GEMINI_API_KEY environment variable.
 # A single client instance can be reused.
 client = None
 
+# Tokens used per task since the process started: {task: {"calls",
+# "prompt_tokens", "output_tokens"}}
+token_usage = {}
+_token_usage_lock = threading.Lock()
+
+# Slots for the LLM calls in flight in this process (see generate)
+_llm_slots = threading.BoundedSemaphore(max(1, config.LLM_MAX_CONCURRENCY))
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+class SummaryAndCategories(BaseModel):
+    """The expected reply of generate_summary_and_categories."""
+
+    summary: str = Field(min_length=1)
+    categories: List[str] = Field(min_length=1)
+
+    @field_validator("categories")
+    @classmethod
+    def strip_categories(cls, categories: List[str]) -> List[str]:
+        return [category.strip() for category in categories if category.strip()]
+
+
+def parse_summary_and_categories(reply: str) -> SummaryAndCategories:
+    """
+    Parses and validates a summary and categories reply: a JSON object, or
+    the older "Summary: ... Categories: ..." text format.
+    Raises ValueError (or a pydantic ValidationError) if it is invalid.
+    """
+    match = _JSON_OBJECT.search(reply)
+    if match:
+        return SummaryAndCategories.model_validate_json(match.group(0))
+    if "Summary:" in reply and "Categories:" in reply:
+        summary = reply.split("Summary:")[1].split("Categories:")[0].strip()
+        categories = reply.split("Categories:")[1].strip().split(",")
+        return SummaryAndCategories(summary=summary, categories=categories)
+    raise ValueError("The reply contains no JSON object")
+
 
 def get_llm_client():
     """
@@ -24,9 +69,110 @@ def get_llm_client():
     return client
 
 
+# The Gemini provider looks the client up on each call
+llm_providers.register_provider("gemini", lambda: llm_providers.GeminiProvider(lambda: get_llm_client()))
+
+
+def model_for_task(task: str) -> str:
+    """The model of an LLM task (see config.LLM_TASK_MODELS)."""
+    return config.LLM_TASK_MODELS.get(task, config.LLM_MODEL)
+
+
+def generate(
+    task: str, prompt: str, temperature: float, response_schema=None, stream: bool = False
+) -> str:
+    """
+    Sends a prompt to the configured provider (see llm_providers.py) and
+    the task's model, records the tokens used, and returns the reply's text.
+    Raises on errors.
+
+    Every LLM call of the process goes through here, so this is where
+    LLM_MAX_CONCURRENCY is enforced: callers running in thread pools (jobs,
+    summary queue, run_concurrently) wait for a free slot.
+    """
+    with _llm_slots:
+        start = time.perf_counter()
+        try:
+            reply = llm_providers.get_provider().generate(
+                task, model_for_task(task), prompt, temperature, response_schema=response_schema, stream=stream
+            )
+        except Exception:
+            metrics.llm_seconds.observe(time.perf_counter() - start, task=task, outcome="error")
+            raise
+        metrics.llm_seconds.observe(time.perf_counter() - start, task=task, outcome="ok")
+    record_token_usage(task, prompt, reply.text, reply.prompt_tokens, reply.output_tokens)
+    return reply.text
+
+
+def record_token_usage(
+    task: str, prompt: str, output: str, prompt_tokens: int | None = None, output_tokens: int | None = None
+):
+    """
+    Adds the tokens of one LLM call to token_usage, as reported by the
+    provider, or estimated if it does not report them.
+    """
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens(prompt)
+    if output_tokens is None:
+        output_tokens = estimate_tokens(output or "")
+    with _token_usage_lock:
+        usage = token_usage.setdefault(task, {"calls": 0, "prompt_tokens": 0, "output_tokens": 0})
+        usage["calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["output_tokens"] += output_tokens
+    metrics.llm_tokens.observe(prompt_tokens, task=task, kind="prompt")
+    metrics.llm_tokens.observe(output_tokens, task=task, kind="output")
+
+
+def get_token_usage() -> dict:
+    """A copy of the tokens used per task."""
+    with _token_usage_lock:
+        return {task: dict(usage) for task, usage in token_usage.items()}
+
+
+def run_concurrently(func: Callable, items: Iterable) -> list:
+    """
+    Calls func on each item with up to LLM_MAX_CONCURRENCY calls in flight,
+    and returns the results in the order of the items. The LLM calls are
+    I/O-bound, so threads are enough to overlap them. The limit is shared
+    with all the other LLM calls of the process (see generate).
+    """
+    items = list(items)
+    if len(items) <= 1 or config.LLM_MAX_CONCURRENCY <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=config.LLM_MAX_CONCURRENCY) as executor:
+        return list(executor.map(func, items))
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Splits a text into chunks of at most max_tokens (estimated), cutting
+    between paragraphs, or inside a paragraph longer than a chunk.
+    """
+    max_chars = max_tokens * 4
+    chunks = []
+    current = ""
+    for paragraph in text.split("\n"):
+        while len(paragraph) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + 1 + len(paragraph) > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{paragraph}" if current else paragraph
+    if current.strip():
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
 def generate_summary_and_categories(article_text: str) -> Tuple[str, List[str]]:
     """
-    Sends article text to the Gemini API to generate a summary and categories.
+    Sends article text to the LLM to generate a summary and categories.
+    Articles longer than SUMMARY_MAP_REDUCE_TOKENS are summarized with
+    map-reduce (see summarize_oversized_article).
 
     Args:
         article_text: The core text content of the news article.
@@ -34,12 +180,71 @@ def generate_summary_and_categories(article_text: str) -> Tuple[str, List[str]]:
     Returns:
         A tuple containing the summary (str) and a list of categories (List[str]).
     """
-    model = "gemma-3-27b-it"  # Using the specified Gemma model
+    article_text = strip_boilerplate(article_text or "")
+    if estimate_tokens(article_text) > config.SUMMARY_MAP_REDUCE_TOKENS:
+        return summarize_oversized_article(article_text)
+    return _generate_summary_and_categories(article_text)
+
+
+def summarize_oversized_article(article_text: str) -> Tuple[str, List[str]]:
+    """
+    Map-reduce summarization of a long article (live blog, transcript,
+    mis-extracted index page): its chunks are summarized concurrently, then
+    the summary and categories are generated from the chunk summaries, so
+    no single LLM call gets a huge input.
+    """
+    chunks = split_into_chunks(article_text, config.SUMMARY_CHUNK_TOKENS)
+    if len(chunks) > config.SUMMARY_MAX_CHUNKS:
+        print(
+            f"Article too long ({len(chunks)} chunks), summarizing the first "
+            f"{config.SUMMARY_MAX_CHUNKS} chunks only"
+        )
+        chunks = chunks[: config.SUMMARY_MAX_CHUNKS]
+    chunk_summaries = [summary for summary in run_concurrently(generate_chunk_summary, chunks) if summary]
+    if not chunk_summaries:
+        return "", []
+    return _generate_summary_and_categories(
+        "\n\n".join(chunk_summaries),
+        description="summaries of the consecutive parts of a long news article",
+    )
+
+
+def generate_chunk_summary(chunk_text: str) -> str:
+    """
+    Sends one part of a long article to the LLM to summarize it (the
+    map step of summarize_oversized_article).
+
+    Returns:
+        The summary (str), or an empty string on error.
+    """
+    prompt = f"""
+    The following text is one part of a long news article.
+    Summarize the facts it reports in one short paragraph.
 
+    **Text:**
+    ---
+    {chunk_text}
+    ---
+
+    **Output Format (Strictly follow this):**
+    Summary: [Your summary here]
+    """
+
+    try:
+        text = generate("chunk_summary", prompt, temperature=0.2)
+        return text.split("Summary:", 1)[-1].strip()
+    except Exception as e:
+        print(f"An error occurred while calling the LLM for chunk summarization: {e}")
+        return ""
+
+
+def _generate_summary_and_categories(
+    article_text: str, description: str = "news article"
+) -> Tuple[str, List[str]]:
     # We will design a robust prompt to get the output in a structured format.
     # This makes parsing the response reliable.
     prompt = f"""
-    Analyze the following news article and provide a concise summary and a list of relevant categories.
+    Analyze the following {description} and provide a concise summary and a list of relevant categories.
 
     **Article Text:**
     ---
@@ -48,65 +253,110 @@ def generate_summary_and_categories(article_text: str) -> Tuple[str, List[str]]:
 
     **Instructions:**
     1.  **Summary**: Write a neutral, one-paragraph summary of the article.
-    2.  **Categories**: Provide a comma-separated list of 3-5 relevant categories
+    2.  **Categories**: Provide a list of 3-5 relevant categories
         (e.g., "Technology", "Artificial Intelligence", "Business").
 
     **Output Format (Strictly follow this):**
-    Summary: [Your summary here]
-    Categories: [Category 1, Category 2, Category 3]
-    """
-
-    contents = [
-        types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=prompt)],
-        ),
-    ]
-
-    # In the project plan, response_mime_type was "text/plain".
-    # For structured output, we might consider "application/json" in the future,
-    # but for now, parsing a structured text response is robust enough.
-    generate_content_config = types.GenerateContentConfig(
-        response_mime_type="text/plain",
-        temperature=0.2,  # Lower temperature for more predictable, factual output
-    )
+    A JSON object and nothing else:
+    {{"summary": "Your summary here", "categories": ["Category 1", "Category 2", "Category 3"]}}
+    """
 
     try:
-        # Gemma models are often used with streaming, so we'll aggregate the response.
-        full_response = ""
-        llm_client = get_llm_client()
-        for chunk in llm_client.models.generate_content_stream(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        ):
-            if chunk.text:
-                full_response += chunk.text
-
-        # Simple and robust parsing of the structured response
-        summary = full_response.split("Summary:")[1].split("Categories:")[0].strip()
-        categories_str = full_response.split("Categories:")[1].strip()
-        categories = [cat.strip() for cat in categories_str.split(",")]
-
-        return summary, categories
-
+        full_response = generate(
+            "summary", prompt, temperature=0.2, response_schema=SummaryAndCategories, stream=True
+        )
     except Exception as e:
-        print(f"An error occurred while calling the Gemini API: {e}")
+        print(f"An error occurred while calling the LLM: {e}")
         # Return empty values or raise a custom exception
         return "", []
 
-def generate_interest_score(article_text: str, user_interest_prompt: str) -> int:
+    try:
+        result = parse_summary_and_categories(full_response)
+    except ValueError as e:
+        result = repair_summary_and_categories(full_response, str(e))
+        if result is None:
+            return "", []
+    return result.summary, result.categories
+
+
+def repair_summary_and_categories(reply: str, error: str) -> SummaryAndCategories | None:
+    """
+    Asks the LLM to fix an invalid summary and categories reply, sending only
+    the reply and the validation error instead of the article again.
+    Returns None if the repaired reply is still invalid.
+    """
+    prompt = f"""
+    The following reply should have been a JSON object with a non-empty "summary" string and a non-empty "categories" list of strings, but it is invalid.
+
+    **Reply:**
+    ---
+    {reply[:8000]}
+    ---
+
+    **Error:**
+    {error[:1000]}
+
+    Return the corrected JSON object, keeping the content of the reply, and nothing else:
+    {{"summary": "...", "categories": ["...", "..."]}}
+    """
+
+    try:
+        text = generate("summary_repair", prompt, temperature=0.0, response_schema=SummaryAndCategories)
+        return parse_summary_and_categories(text)
+    except ValueError as e:
+        print(f"The repaired summary reply is still invalid: {e}")
+        return None
+    except Exception as e:
+        print(f"An error occurred while calling the LLM for reply repair: {e}")
+        return None
+
+
+def generate_story_summary(article_texts: List[str]) -> str:
+    """
+    Sends the texts of several articles covering the same story to the LLM to generate one summary of the whole story.
+
+    Args:
+        article_texts: The text content of each article of the story.
+
+    Returns:
+        The merged summary (str), or an empty string on error.
+    """
+    articles = "\n\n".join(
+        f"**Article {i + 1}:**\n---\n{text}\n---" for i, text in enumerate(article_texts)
+    )
+    prompt = f"""
+    The following news articles, from different sources, cover the same story.
+    Write a neutral, one-paragraph summary of the story that combines the facts reported by all of them.
+    Mention where the sources disagree.
+
+    {articles}
+
+    **Output Format (Strictly follow this):**
+    Summary: [Your summary here]
+    """
+
+    try:
+        text = generate("story_summary", prompt, temperature=0.2)
+        return text.split("Summary:", 1)[-1].strip()
+    except Exception as e:
+        print(f"An error occurred while calling the LLM for story summarization: {e}")
+        return ""
+
+
+def generate_interest_score(article_text: str, user_interest_prompt: str) -> int | None:
     """
-    Sends article text and user interest prompt to the Gemini API to generate an interest score.
+    Sends article text and user interest prompt to the LLM to generate an interest score.
 
     Args:
         article_text: The core text content of the news article.
         user_interest_prompt: A prompt describing the user's interests.
 
     Returns:
-        An integer score between 0 and 100, representing how relevant the article is to the user.
+        An integer score between 0 and 100, representing how relevant the article is to the user,
+        or None if the LLM call failed or its reply is not a number.
     """
-    model = "gemma-3-27b-it"  # Using the specified Gemma model
+    # The lead paragraphs say what the article is about
+    article_text = lead_paragraphs(article_text or "", config.SCORING_TOKEN_BUDGET)
 
     prompt = f"""
     Given the following user interest prompt and article text, rate how relevant the article is to the user's interests on a scale of 0 to 100.
@@ -129,30 +379,13 @@ def generate_interest_score(article_text: str, user_interest_prompt: str) -> int
     [Score]
     """
 
-    contents = [
-        types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=prompt)],
-        ),
-    ]
-
-    generate_content_config = types.GenerateContentConfig(
-        response_mime_type="text/plain",
-        temperature=0.1,  # Low temperature for precise, numerical output
-    )
-
     try:
-        llm_client = get_llm_client()
-        response = llm_client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        )
-        score = int(response.text.strip())
+        text = generate("interest_score", prompt, temperature=0.1)
+        score = int(text.strip())
         return score
     except Exception as e:
-        print(f"An error occurred while calling the Gemini API for interest scoring: {e}")
-        return 0 # Return 0 on error or if score cannot be parsed
+        print(f"An error occurred while calling the LLM for interest scoring: {e}")
+        return None # No score on error or if it cannot be parsed
 
 
 def find_article_link_selector(page_content: str) -> str:
@@ -160,15 +393,14 @@ def find_article_link_selector(page_content: str) -> str:
     Analyzes the HTML content of a source's main page to find the CSS selector
     that targets the primary article links.
     """
-    model = "gemma-3-27b-it"
     prompt = f"""
     Analyze the following HTML content from a news or blog website.
     Your task is to identify the CSS selector that will reliably target the links to the main articles on the page.
     Focus on the primary list of articles, not sidebars, headers, or footers.
 
-    **HTML Content:**
+    **HTML Content** (outline of the page: one element per line, indented by depth, with its id, classes, link and text; runs of similar elements are shortened to a few followed by a "more" comment):
     ---
-    {page_content[:10000]}  # Limit content to avoid exceeding token limits
+    {dom_skeleton(page_content, config.SELECTOR_TOKEN_BUDGET)}
     ---
 
     **Instructions:**
@@ -180,30 +412,45 @@ def find_article_link_selector(page_content: str) -> str:
     [Your CSS selector here]
     """
 
-    contents = [
-        types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=prompt)],
-        ),
-    ]
-
-    generate_content_config = types.GenerateContentConfig(
-        response_mime_type="text/plain",
-        temperature=0.1,  # Very low temperature for precision
-    )
-
     try:
-        llm_client = get_llm_client()
-        response = llm_client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        )
+        text = generate("link_selector", prompt, temperature=0.1)
         # The response should be the selector itself
-        selector = response.text.strip()
+        selector = text.strip()
         return selector
     except Exception as e:
         print(
-            f"An error occurred while calling the Gemini API for selector generation: {e}"
+            f"An error occurred while calling the LLM for selector generation: {e}"
         )
         return ""
+
+
+def choose_article_link_selector(candidates: List[Tuple[str, List[str]]]) -> str:
+    """
+    Asks the LLM which of several candidate CSS selectors targets the main
+    article links of a page, given a few link texts each selector matches.
+    Used to break ties of the heuristic selector inference.
+
+    Returns:
+        The chosen selector, or an empty string on error.
+    """
+    options = "\n".join(
+        f"{i + 1}. `{selector}` matches links such as: " + "; ".join(f'"{text}"' for text in examples)
+        for i, (selector, examples) in enumerate(candidates)
+    )
+    prompt = f"""
+    The following CSS selectors each target a group of links on the front page of a news or blog website.
+    Which one targets the links to the main articles (not navigation, sidebars or footers)?
+
+    {options}
+
+    **Output Format (Strictly follow this):**
+    [The number of the selector]
+    """
+
+    try:
+        text = generate("link_selector", prompt, temperature=0.0)
+        choice = int(text.strip().strip("."))
+        return candidates[choice - 1][0] if 1 <= choice <= len(candidates) else ""
+    except Exception as e:
+        print(f"An error occurred while calling the LLM for selector choice: {e}")
+        return ""
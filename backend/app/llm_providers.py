@@ -0,0 +1,213 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import requests
+from google.genai import types
+from pydantic import BaseModel
+
+from . import config
+
+# LLM backends, selected by config.LLM_PROVIDER.
+#
+# A provider sends one prompt to a model and returns the reply's text, with
+# the tokens used if the backend reports them. Providers are registered by
+# name with a factory, and created once per process:
+# - "gemini": the Google Gemini API (the default)
+# - "openai": a local or remote OpenAI-compatible server (llama.cpp, vLLM,
+#   Ollama...), at OPENAI_BASE_URL
+# - "fake": deterministic replies computed from the prompt, without network
+#   access, for tests and offline load tests of the pipeline
+
+
+@dataclass
+class LLMReply:
+    text: str
+    prompt_tokens: int | None = None
+    output_tokens: int | None = None
+
+
+class LLMProvider:
+    """Base class of the LLM backends."""
+
+    def generate(
+        self,
+        task: str,
+        model: str,
+        prompt: str,
+        temperature: float,
+        response_schema: type[BaseModel] | None = None,
+        stream: bool = False,
+    ) -> LLMReply:
+        """
+        Sends a prompt and returns the reply. response_schema is the pydantic
+        model of a JSON reply, for backends with a JSON mode (used only when
+        LLM_JSON_MODE is set). Raises on errors.
+        """
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    def __init__(self, get_client: Callable):
+        self.get_client = get_client
+
+    def generate(self, task, model, prompt, temperature, response_schema=None, stream=False):
+        contents = [
+            types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=prompt)],
+            ),
+        ]
+        if response_schema is not None and config.LLM_JSON_MODE:
+            generate_content_config = types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=response_schema,
+                temperature=temperature,
+            )
+        else:
+            generate_content_config = types.GenerateContentConfig(
+                response_mime_type="text/plain",
+                temperature=temperature,
+            )
+
+        llm_client = self.get_client()
+        if not stream:
+            response = llm_client.models.generate_content(
+                model=model,
+                contents=contents,
+                config=generate_content_config,
+            )
+            return _gemini_reply(response.text, getattr(response, "usage_metadata", None))
+
+        # Gemma models are often used with streaming, so we'll aggregate the response.
+        text = ""
+        usage_metadata = None
+        for chunk in llm_client.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=generate_content_config,
+        ):
+            if chunk.text:
+                text += chunk.text
+            # The last chunk carries the usage of the whole call
+            usage_metadata = getattr(chunk, "usage_metadata", None) or usage_metadata
+        return _gemini_reply(text, usage_metadata)
+
+
+def _gemini_reply(text: str, usage_metadata) -> LLMReply:
+    prompt_tokens = getattr(usage_metadata, "prompt_token_count", None)
+    output_tokens = getattr(usage_metadata, "candidates_token_count", None)
+    return LLMReply(
+        text=text,
+        prompt_tokens=prompt_tokens if isinstance(prompt_tokens, int) else None,
+        output_tokens=output_tokens if isinstance(output_tokens, int) else None,
+    )
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    The chat completions API of an OpenAI-compatible server. Streaming is
+    not used: the reply is only needed once complete.
+    """
+
+    def __init__(self, base_url: str, api_key: str = "", timeout: float = 120):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.timeout = timeout
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        # One session (and connection pool) per thread
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def generate(self, task, model, prompt, temperature, response_schema=None, stream=False):
+        body = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+        }
+        if response_schema is not None and config.LLM_JSON_MODE:
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": response_schema.__name__, "schema": response_schema.model_json_schema()},
+            }
+        response = self.session.post(self.url, json=body, headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        usage = data.get("usage") or {}
+        return LLMReply(
+            text=data["choices"][0]["message"]["content"] or "",
+            prompt_tokens=usage.get("prompt_tokens"),
+            output_tokens=usage.get("completion_tokens"),
+        )
+
+
+_FAKE_CATEGORIES = ["World", "Politics", "Business", "Technology", "Science", "Health", "Sports", "Culture"]
+_QUOTED_TEXT = re.compile(r"---\n(.*?)\n\s*---", re.DOTALL)
+
+
+class FakeProvider(LLMProvider):
+    """
+    Replies in the format each task expects, computed from a hash of the
+    prompt, so the same prompt always gets the same reply. Waits
+    FAKE_LLM_LATENCY_SECONDS per call to simulate a real backend.
+    """
+
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+
+    def generate(self, task, model, prompt, temperature, response_schema=None, stream=False):
+        if self.latency:
+            time.sleep(self.latency)
+        digest = int.from_bytes(hashlib.sha256(prompt.encode()).digest()[:8], "big")
+        # The last quoted block of the prompt is the text to work on
+        quoted = _QUOTED_TEXT.findall(prompt)
+        text = " ".join((quoted[-1] if quoted else prompt).split())
+        summary = text[:200] or "Empty article."
+
+        if task == "interest_score":
+            reply = str(digest % 101)
+        elif task == "link_selector":
+            reply = "a"
+        elif task in ("summary", "summary_repair"):
+            categories = [_FAKE_CATEGORIES[(digest >> (8 * i)) % len(_FAKE_CATEGORIES)] for i in range(3)]
+            reply = json.dumps({"summary": summary, "categories": list(dict.fromkeys(categories))})
+        else:
+            reply = f"Summary: {summary}"
+        return LLMReply(text=reply)
+
+
+# Provider factories by name, and the providers created so far
+PROVIDERS: dict[str, Callable[[], LLMProvider]] = {
+    "openai": lambda: OpenAICompatibleProvider(
+        config.OPENAI_BASE_URL, config.OPENAI_API_KEY, config.LLM_TIMEOUT_SECONDS
+    ),
+    "fake": lambda: FakeProvider(config.FAKE_LLM_LATENCY_SECONDS),
+}
+_instances: dict[str, LLMProvider] = {}
+_instances_lock = threading.Lock()
+
+
+def register_provider(name: str, factory: Callable[[], LLMProvider]):
+    """Registers (or replaces) the factory of a provider."""
+    PROVIDERS[name] = factory
+    with _instances_lock:
+        _instances.pop(name, None)
+
+
+def get_provider(name: str | None = None) -> LLMProvider:
+    """The provider with the given name, by default config.LLM_PROVIDER."""
+    name = name or config.LLM_PROVIDER
+    with _instances_lock:
+        if name not in _instances:
+            if name not in PROVIDERS:
+                raise ValueError(f"Unknown LLM provider '{name}', expected one of {sorted(PROVIDERS)}")
+            _instances[name] = PROVIDERS[name]()
+        return _instances[name]
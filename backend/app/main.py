@@ -1,19 +1,34 @@
-from fastapi import Depends, FastAPI, HTTPException, BackgroundTasks
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, HTTPException, BackgroundTasks, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Dict
-import time
-import uuid
-import asyncio
-import requests
+from typing import List, Dict, Literal, Union
 
-from . import llm_interface, crud, models, schemas, scraping
-from .database import SessionLocal, engine
-from .shared_state import job_statuses, canceled_jobs
+from . import config, job_events, link_selectors, llm_interface, crud, metrics, models, ranking, related, scheduler, schemas, scoring, scraping, search, stories, summaries
+from .database import AsyncSessionLocal, SessionLocal, engine
+from .jobs import execute_job, run_scraping_job, run_article_scoring_job
 
+search.register_search_index()
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In "embedded" mode the scheduler runs the scrapes itself
+    stop_scheduler = None
+    if config.SCHEDULER_ENABLED:
+        run_job = execute_job if config.JOB_EXECUTION_MODE == "embedded" else None
+        stop_scheduler = scheduler.start_scheduler(run_job)
+    yield
+    if stop_scheduler is not None:
+        stop_scheduler.set()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
@@ -37,116 +52,19 @@ def get_db():
         db.close()
 
 
-def run_scraping_job(job_id: str, db: Session = None, source_id: int | None = None):
-    """
-    The actual scraping logic that runs in the background.
-    """
-    start_time = time.time()
-
-    if db is None:
-        db = SessionLocal()
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
 
-    print(f"JOB {job_id}: Starting.")
-    job_statuses[job_id] = schemas.JobStatus(
-        id=job_id, status="pending", progress=0, message="Initializing..."
-    )
 
-    try:
-        sources = crud.get_sources(db) if source_id is None else [crud.get_source(db, source_id)]
-        if not sources or sources[0] is None:
-            raise HTTPException(status_code=404, detail="Source not found")
-
-        total_sources = len(sources)
-        print(f"JOB {job_id}: Found {total_sources} sources.")
-
-        # --- Pre-computation Step ---
-        all_articles_to_scrape = []
-        for i, source in enumerate(sources):
-            print(f"JOB {job_id}: Pre-scanning source {i+1}/{total_sources}: {source.name}")
-            article_links = scraping.get_article_links(source)
-            for link in article_links:
-                if link not in [l for _, l in all_articles_to_scrape]:
-                    all_articles_to_scrape.append((source, link))
-        
-        total_articles = len(all_articles_to_scrape)
-        print(f"JOB {job_id}: Found a total of {total_articles} new articles to scrape across {total_sources} sources.")
-
-        processed_articles_count = 0
-        skipped_articles_count = 0
-        failed_articles_count = 0
-
-        # --- Progress Update Callback ---
-        def update_progress(processed: int = 0, skipped: int = 0, failed: int = 0):
-            nonlocal processed_articles_count, skipped_articles_count, failed_articles_count
-            
-            processed_articles_count += processed
-            skipped_articles_count += skipped
-            failed_articles_count += failed
-
-            handled_articles = processed_articles_count + skipped_articles_count + failed_articles_count
-            progress = int((handled_articles / total_articles) * 100) if total_articles > 0 else 0
-            
-            elapsed_time = time.time() - start_time
-            eta_seconds = (elapsed_time / handled_articles) * (total_articles - handled_articles) if handled_articles > 0 else -1.0
-
-            job_statuses[job_id].progress = progress
-            job_statuses[job_id].total_articles = total_articles
-            job_statuses[job_id].processed_articles = processed_articles_count
-            job_statuses[job_id].skipped_articles = skipped_articles_count
-            job_statuses[job_id].failed_articles = failed_articles_count
-            job_statuses[job_id].eta_seconds = eta_seconds
-            job_statuses[job_id].message = f"Scraped {processed_articles_count}/{total_articles} articles..."
-
-
-        job_statuses[job_id].status = "in_progress"
-        job_statuses[job_id].total_sources = total_sources
-
-        # --- Main Processing Loop ---
-        for i, source in enumerate(sources):
-            job_statuses[job_id].processed_sources = i
-            job_statuses[job_id].message = f"Processing source {i+1}/{total_sources}: {source.name}"
-
-            if job_id in canceled_jobs:
-                print(f"JOB {job_id}: Cancellation detected. Terminating.")
-                job_statuses[job_id].status = "canceled"
-                job_statuses[job_id].message = "Job canceled by user."
-                canceled_jobs.remove(job_id)
-                return
-
-            links_for_current_source = [link for s, link in all_articles_to_scrape if s.id == source.id]
-
-            canceled = scraping.scrape_source(
-                db=db, 
-                source=source, 
-                job_id=job_id, 
-                article_links=links_for_current_source,
-                update_progress_callback=update_progress
-            )
-
-            
-
-            if canceled:
-                if job_id in canceled_jobs:
-                    print(f"JOB {job_id}: Cancellation confirmed. Terminating.")
-                    job_statuses[job_id].status = "canceled"
-                    job_statuses[job_id].message = "Job canceled by user."
-                    canceled_jobs.remove(job_id)
-                return
-            
-            print(f"JOB {job_id}: Finished scrape for source: {source.name}")
-
-        print(f"JOB {job_id}: All sources processed. Completing job.")
-        job_statuses[job_id].status = "completed"
-        job_statuses[job_id].message = "Scraping complete!"
-
-    except Exception as e:
-        print(f"JOB {job_id}: An error occurred: {e}")
-        job_statuses[job_id] = schemas.JobStatus(
-            id=job_id, status="failed", progress=0, message=f"An error occurred: {e}"
-        )
-    finally:
-        print(f"JOB {job_id}: Closing database session.")
-        db.close()
+def dispatch_job(background_tasks: BackgroundTasks, job_id: str, db: Session):
+    """
+    In "embedded" execution mode, runs a freshly enqueued job in this process
+    after the response is sent. In "worker" mode the job is left for the
+    separate worker processes.
+    """
+    if config.JOB_EXECUTION_MODE == "embedded":
+        background_tasks.add_task(execute_job, job_id, db)
 
 
 @app.post("/articles/", response_model=schemas.Article)
@@ -154,16 +72,23 @@ def create_article(article: schemas.ArticleCreate, db: Session = Depends(get_db)
     return crud.create_article(db=db, article=article)
 
 
-@app.get("/articles/", response_model=List[schemas.Article])
-def read_articles(
+@app.get("/articles/", response_model=Union[List[schemas.Article], List[schemas.StoryGroup]])
+async def read_articles(
+    background_tasks: BackgroundTasks,
     skip: int = 0,
     limit: int = 100,
     category_id: int = None,
     read: bool = None,
     min_score: int = None,
-    db: Session = Depends(get_db),
+    group_by: Literal["story"] | None = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    articles = crud.get_articles(
+    """
+    The articles, most interesting first. With group_by=story, the articles
+    of the page are grouped by story, each group in the place of its best
+    article.
+    """
+    articles = await crud.get_articles_async(
         db,
         skip=skip,
         limit=limit,
@@ -171,21 +96,103 @@ def read_articles(
         read=read,
         min_score=min_score,
     )
-    # Sort articles by interest score (highest first)
-    articles.sort(key=lambda x: (x.interest_score or 0), reverse=True)
+    if config.SUMMARY_MODE == "lazy":
+        # Summarize the articles shown without a summary, and the next page
+        # ahead of time
+        summaries.summary_queue.enqueue(
+            [article.id for article in articles if article.summary is None], summaries.SHOWN
+        )
+        summaries.summary_queue.enqueue(
+            await crud.get_unsummarized_article_ids_async(
+                db,
+                skip=skip + limit,
+                limit=limit,
+                category_id=category_id,
+                read=read,
+                min_score=min_score,
+            ),
+            summaries.PREFETCH,
+        )
+    # Sort articles by interest score (highest first), adjusted by what the
+    # user's feedback taught the ranking model
+    articles = await db.run_sync(ranking.rerank, articles)
+    if group_by == "story":
+        if config.SUMMARY_MODE == "lazy":
+            # Stories are summarized when they are shown, after the response
+            story_ids = sorted({article.story_id for article in articles if article.story_id is not None})
+            if story_ids:
+                background_tasks.add_task(stories.summarize_shown_stories, story_ids)
+        return await db.run_sync(stories.group_by_story, articles)
     return articles
 
 
+@app.get("/articles/search", response_model=List[schemas.ArticleSearchResult])
+async def search_articles(
+    q: str = Query(..., min_length=1),
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Full-text search over article titles, summaries and content, best match first."""
+    hits = await db.run_sync(search.search_articles, q, skip=skip, limit=limit)
+    return [
+        schemas.ArticleSearchResult.model_validate(article).model_copy(
+            update={"rank": rank, "snippet": snippet}
+        )
+        for article, rank, snippet in hits
+    ]
+
+
+@app.get("/articles/{article_id}/related", response_model=List[schemas.RelatedArticle])
+async def read_related_articles(
+    article_id: int,
+    limit: int = Query(related.TOP_K, ge=1, le=related.TOP_K),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """The articles most similar to an article (precomputed when it was stored)."""
+    if await db.get(models.Article, article_id) is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    hits = await db.run_sync(related.get_related_articles, article_id, limit=limit)
+    return [
+        schemas.RelatedArticle.model_validate(article).model_copy(update={"similarity": similarity})
+        for article, similarity in hits
+    ]
+
+
 @app.patch("/articles/{article_id}/read-status", response_model=schemas.Article)
 def mark_article_read_status(
     article_id: int, read_status: schemas.ArticleReadStatus, db: Session = Depends(get_db)
 ):
-    db_article = crud.mark_article_read(db, article_id=article_id, read=read_status.read)
+    db_article = crud.get_article(db, article_id=article_id)
     if db_article is None:
         raise HTTPException(status_code=404, detail="Article not found")
+    newly_read = read_status.read and not db_article.read
+    db_article = crud.mark_article_read(db, article_id=article_id, read=read_status.read)
+    # Reading an article is a weak sign of interest
+    if newly_read:
+        ranking.record_feedback(db, db_article, liked=True, sample_weight=config.RANKING_READ_WEIGHT)
+        if db_article.summary is None and config.SUMMARY_MODE == "lazy":
+            summaries.summary_queue.enqueue([article_id], summaries.OPENED)
     return db_article
 
 
+@app.patch("/articles/{article_id}/feedback", response_model=schemas.Article)
+def set_article_feedback(
+    article_id: int, feedback: schemas.ArticleFeedback, db: Session = Depends(get_db)
+):
+    """Like or dislike an article; the feed ranking learns from it."""
+    db_article = crud.get_article(db, article_id=article_id)
+    if db_article is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    if feedback.liked == db_article.liked:
+        return db_article
+    # Changing or removing the feedback undoes the previous one
+    step = ranking.record_feedback(
+        db, db_article, liked=feedback.liked, undo_step=db_article.feedback_step
+    )
+    return crud.set_article_feedback(db, article_id=article_id, liked=feedback.liked, feedback_step=step)
+
+
 @app.post("/articles/{article_id}/process", status_code=200)
 def process_article(article_id: int, db: Session = Depends(get_db)):
     db_article = crud.get_article(db, article_id=article_id)
@@ -218,8 +225,8 @@ def create_source(source: schemas.SourceCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/sources/", response_model=List[schemas.Source])
-def read_sources(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    sources = crud.get_sources(db, skip=skip, limit=limit)
+async def read_sources(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    sources = await crud.get_sources_async(db, skip=skip, limit=limit)
     return sources
 
 
@@ -255,63 +262,110 @@ def scrape_source(source_id: int, background_tasks: BackgroundTasks, db: Session
     if db_source is None:
         raise HTTPException(status_code=404, detail="Source not found")
 
-    job_id = str(uuid.uuid4())
-    background_tasks.add_task(run_scraping_job, job_id, db, source_id=source_id)
-    return schemas.ScrapeJob(job_id=job_id, message="Scraping job initiated for single source")
+    job = crud.create_job(db, "scrape", {"source_id": source_id})
+    dispatch_job(background_tasks, job.id, db)
+    return schemas.ScrapeJob(job_id=job.id, message="Scraping job initiated for single source")
 
 
 @app.post("/sources/scrape", response_model=schemas.ScrapeJob, status_code=202)
-def scrape_all_sources(background_tasks: BackgroundTasks):
-    job_id = str(uuid.uuid4())
-    background_tasks.add_task(run_scraping_job, job_id)
-    return schemas.ScrapeJob(job_id=job_id, message="Scraping job initiated")
+def scrape_all_sources(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    job = crud.create_job(db, "scrape")
+    dispatch_job(background_tasks, job.id, db)
+    return schemas.ScrapeJob(job_id=job.id, message="Scraping job initiated")
 
 
 @app.get("/sources/scrape/status/{job_id}", response_model=schemas.JobStatus)
-def get_scrape_job_status(job_id: str):
-    status = job_statuses.get(job_id)
+def get_scrape_job_status(job_id: str, db: Session = Depends(get_db)):
+    status = crud.get_job_status(db, job_id)
     if not status:
         raise HTTPException(status_code=404, detail="Job not found")
     return status
 
 
+@app.get("/sources/scrape/events/{job_id}")
+async def stream_scrape_job_status(job_id: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Server-sent events with the progress of a job: a full JobStatus first,
+    then only the changed fields, until an "end" event.
+    """
+    if await run_in_threadpool(crud.get_job_status, db, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    def read_status():
+        status = crud.get_job_status(db, job_id)
+        # End the read transaction so the next poll sees new commits
+        db.rollback()
+        return status
+
+    async def load_status():
+        return await run_in_threadpool(read_status)
+
+    return StreamingResponse(
+        job_events.stream_job_status(job_id, load_status, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/sources/scrape/cancel/{job_id}", status_code=200)
-def cancel_scrape_job(job_id: str):
-    if job_id not in job_statuses or job_statuses[job_id].status not in [
-        "in_progress",
-        "pending",
-    ]:
+def cancel_scrape_job(job_id: str, db: Session = Depends(get_db)):
+    if not crud.request_job_cancel(db, job_id):
         raise HTTPException(
             status_code=404, detail="Job not found or cannot be canceled."
         )
-    canceled_jobs.add(job_id)
     return {"message": "Scraping job cancellation requested."}
 
 
+@app.post("/sources/scrape/resume/{job_id}", response_model=schemas.ScrapeJob, status_code=202)
+def resume_scrape_job(job_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """
+    Resume a failed or canceled job. Articles it already finished are not
+    fetched or sent to the LLM again.
+    """
+    if crud.reset_job_for_resume(db, job_id) is None:
+        raise HTTPException(
+            status_code=404, detail="Job not found or cannot be resumed."
+        )
+    dispatch_job(background_tasks, job_id, db)
+    return schemas.ScrapeJob(job_id=job_id, message="Scraping job resumed")
+
+
 @app.get("/categories/", response_model=List[schemas.Category])
-def read_categories(db: Session = Depends(get_db)):
-    categories = crud.get_categories(db)
+async def read_categories(db: AsyncSession = Depends(get_async_db)):
+    categories = await crud.get_categories_async(db)
     return categories
 
 
 @app.post("/sources/autodetect-selector", response_model=dict)
-def autodetect_selector(source: schemas.SourceBase):
-    # Fetch the content with requests
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
-    }
-    try:
-        response = requests.get(source.url, headers=headers, timeout=10)
-        response.raise_for_status()
-        content = response.text
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch URL: {e}")
+def autodetect_selector(source: schemas.SourceBase, db: Session = Depends(get_db)):
+    """
+    Detects the article link selector of a page. Selectors already known for
+    the domain and page layout are reused without calling the LLM.
+    """
+    content = scraping.fetch_source_page(source.url)
+    if content is None:
+        raise HTTPException(status_code=500, detail="Failed to fetch URL.")
 
-    selector = llm_interface.find_article_link_selector(content)
+    selector, cached = link_selectors.detect_selector(db, source.url, content)
     if not selector:
         raise HTTPException(status_code=500, detail="Failed to detect selector.")
-    return {"selector": selector}
+    return {"selector": selector, "cached": cached}
+
+
+@app.get("/llm/usage", response_model=dict)
+def read_llm_token_usage():
+    """Tokens used by the LLM calls of this process, per task."""
+    return llm_interface.get_token_usage()
+
+
+@app.get("/metrics")
+def read_metrics(db: Session = Depends(get_db)):
+    """The metrics of this process, in the Prometheus text format."""
+    job_counts = crud.count_jobs_by_status(db)
+    for status in ("pending", "in_progress", "completed", "failed", "canceled"):
+        metrics.jobs_queued.set(job_counts.get(status, 0), status=status)
+    metrics.summary_queue_depth.set(summaries.summary_queue.pending())
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.get("/settings/interest_prompt", response_model=dict)
@@ -343,9 +397,9 @@ def calculate_article_score(article_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Article not found")
 
     interest_prompt = crud.get_interest_prompt(db)
-    interest_score = llm_interface.generate_interest_score(
-        article_text=db_article.original_content, user_interest_prompt=interest_prompt
-    )
+    interest_score = scoring.score_article(db, db_article, interest_prompt)
+    if interest_score is None:
+        raise HTTPException(status_code=500, detail="Failed to score article with LLM")
 
     crud.update_article_interest_score(
         db, article_id=article_id, interest_score=interest_score
@@ -367,74 +421,24 @@ def recalculate_all_article_scores(
     Recalculate interest scores for all articles.
     This is a long-running task, so it runs in the background.
     """
-    job_id = str(uuid.uuid4())
-    job_statuses[job_id] = schemas.JobStatus(
-        id=job_id,
-        status="pending",
-        progress=0,
-        message="Initializing score recalculation...",
-    )
-
-    background_tasks.add_task(run_article_scoring_job, job_id, db)
+    job = crud.create_job(db, "score")
+    dispatch_job(background_tasks, job.id, db)
 
-    return schemas.ScrapeJob(job_id=job_id, message="Article scoring job initiated")
+    return schemas.ScrapeJob(job_id=job.id, message="Article scoring job initiated")
 
 
-async def run_article_scoring_job(job_id: str, db: Session):
+@app.post("/articles/repair", response_model=schemas.ScrapeJob, status_code=202)
+def repair_article_enrichment(
+    background_tasks: BackgroundTasks, db: Session = Depends(get_db)
+):
     """
-    Background task that recalculates interest scores for all articles.
+    Re-run the missing LLM steps (summary/categories, interest score) for all
+    articles whose processing failed. Progress is reported like other jobs.
     """
-    job_statuses[job_id] = schemas.JobStatus(
-        id=job_id,
-        status="in_progress",
-        progress=0,
-        message="Starting article scoring...",
-    )
+    job = crud.create_job(db, "repair")
+    dispatch_job(background_tasks, job.id, db)
 
-    try:
-        # Get all articles
-        articles = crud.get_articles(db)
-        total_articles = len(articles)
-        interest_prompt = crud.get_interest_prompt(db)
-
-        for i, article in enumerate(articles):
-            # Update progress
-            progress = int(((i + 1) / total_articles) * 100)
-            job_statuses[job_id] = schemas.JobStatus(
-                id=job_id,
-                status="in_progress",
-                progress=progress,
-                message=f"Scoring article {i+1} of {total_articles}...",
-            )
-
-            # Calculate score
-            interest_score = llm_interface.generate_interest_score(
-                article_text=article.original_content,
-                user_interest_prompt=interest_prompt,
-            )
-
-            # Update article in DB
-            crud.update_article_interest_score(
-                db, article_id=article.id, interest_score=interest_score
-            )
-
-            # Yield control periodically
-            if i % 5 == 0:  # Every 5 articles
-                await asyncio.sleep(0.1)
-
-        job_statuses[job_id] = schemas.JobStatus(
-            id=job_id,
-            status="completed",
-            progress=100,
-            message=f"Successfully scored {total_articles} articles!",
-        )
-
-    except Exception as e:
-        job_statuses[job_id] = schemas.JobStatus(
-            id=job_id, status="failed", progress=0, message=f"An error occurred: {e}"
-        )
-    finally:
-        db.close()
+    return schemas.ScrapeJob(job_id=job.id, message="Article repair job initiated")
 
 
 @app.get("/")
@@ -0,0 +1,179 @@
+import contextlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# In-process metrics, exposed in the Prometheus text format by GET /metrics
+# (and by the workers on WORKER_METRICS_PORT).
+#
+# They tell where the time of a slow job goes: fetching pages (per domain),
+# extracting their content (CPU time), waiting for the LLM (per task, with
+# the tokens of each call), or committing to the database; and how much work
+# is waiting (job and summary queues) or done (jobs and articles).
+#
+# Each process has its own metrics: in worker mode, the jobs' metrics are in
+# the workers, and the API only has the request-side ones.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+JOB_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects the labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda item: tuple(map(str, item[0])))
+            for key, value in items:
+                lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count of the observed values."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextlib.contextmanager
+    def time(self, cpu: bool = False, **labels):
+        """Observes the wall-clock (or this thread's CPU) time of a block."""
+        clock = time.thread_time if cpu else time.perf_counter
+        start = clock()
+        try:
+            yield
+        finally:
+            self.observe(clock() - start, **labels)
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        counts, total = value
+        lines = []
+        for bound, count in zip(self.buckets, counts):
+            bucket = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, bucket)} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render() -> str:
+    """All the metrics of this process, in the Prometheus text format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+fetch_seconds = Histogram(
+    "simplenews_fetch_seconds", "Time to fetch a page, by domain and kind (source or article).", ("domain", "kind")
+)
+extraction_cpu_seconds = Histogram(
+    "simplenews_extraction_cpu_seconds",
+    "CPU time to extract the links of a source page or the content of an article.",
+    ("kind",),
+)
+llm_seconds = Histogram(
+    "simplenews_llm_request_seconds", "Time of an LLM call, by task and outcome.", ("task", "outcome")
+)
+llm_tokens = Histogram(
+    "simplenews_llm_tokens", "Tokens of an LLM call, by task and kind (prompt or output).",
+    ("task", "kind"), buckets=TOKEN_BUCKETS,
+)
+db_commit_seconds = Histogram("simplenews_db_commit_seconds", "Time to flush and commit a database session.")
+job_seconds = Histogram(
+    "simplenews_job_seconds", "Time to run a job, by type and final status.", ("type", "status"), buckets=JOB_BUCKETS
+)
+scraped_articles = Counter(
+    "simplenews_scraped_articles_total", "Article links handled by scrapes, by outcome.", ("outcome",)
+)
+jobs_queued = Gauge("simplenews_jobs", "Jobs in the database, by status.", ("status",))
+summary_queue_depth = Gauge("simplenews_summary_queue_depth", "Articles waiting for their lazy summary.")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int) -> ThreadingHTTPServer:
+    """Serves the metrics of this process on a port, from a daemon thread."""
+    server = ThreadingHTTPServer(("", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
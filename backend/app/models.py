@@ -1,13 +1,18 @@
 from sqlalchemy import (
+    BigInteger,
     Column,
     JSON,
     Integer,
+    LargeBinary,
     String,
     Text,
     DateTime,
     Boolean,
+    Float,
     ForeignKey,
+    Index,
     Table,
+    text,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import declarative_base
@@ -37,6 +42,11 @@ class Source(Base):
     last_scraped_at = Column(DateTime)
     scraper_type = Column(String, nullable=True)
     config = Column(JSON, nullable=True)
+    # Polling schedule learned by the scheduler (see scheduler.py)
+    scrape_interval_minutes = Column(Float, nullable=True)
+    next_scrape_at = Column(DateTime, nullable=True, index=True)
+    # Bloom filter of the links already seen (see seen_links.py)
+    seen_links = Column(LargeBinary, nullable=True)
     articles = relationship("Article", back_populates="source")
 
 
@@ -45,17 +55,63 @@ class Article(Base):
     id = Column(Integer, primary_key=True, index=True)
     source_id = Column(Integer, ForeignKey("sources.id"))
     url = Column(String, unique=True, index=True)
+    # Canonical form of the URL (see urls.canonicalize_url), used for dedup
+    normalized_url = Column(String, unique=True, index=True, nullable=True)
+    # Canonical form of the list link the article was found under, when the
+    # page declared another canonical URL: the link is then known as well
+    link_normalized_url = Column(String, index=True, nullable=True)
     title = Column(String)
     read = Column(Boolean, default=False, nullable=False)
     original_content = Column(Text)
     summary = Column(Text)
     interest_score = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # MinHash signature of original_content (see near_duplicates.py)
+    minhash_signature = Column(LargeBinary, nullable=True)
+    # Hashed TF-IDF vector of the title and content (see embeddings.py)
+    embedding = Column(LargeBinary, nullable=True)
+    # The user's feedback: liked (True), disliked (False) or none
+    liked = Column(Boolean, nullable=True)
+    # Step of the ranking model for that feedback, to undo it (see ranking.py)
+    feedback_step = Column(Float, nullable=True)
+    # First stored article of the same story, if this one is a near duplicate
+    duplicate_of_id = Column(
+        Integer, ForeignKey("articles.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    # Story (cluster of articles about the same event) the article belongs to
+    story_id = Column(Integer, ForeignKey("stories.id"), nullable=True, index=True)
     source = relationship("Source", back_populates="articles")
     categories = relationship(
         "Category", secondary=article_categories, back_populates="articles"
     )
 
+    __table_args__ = (
+        # Partial index over the (few) articles whose LLM enrichment is
+        # incomplete, used by the enrichment repair job.
+        Index(
+            "ix_articles_needs_enrichment",
+            "id",
+            sqlite_where=text("summary IS NULL OR interest_score IS NULL"),
+            postgresql_where=text("summary IS NULL OR interest_score IS NULL"),
+        ),
+    )
+
+
+class Story(Base):
+    """A cluster of articles covering the same event (see stories.py)."""
+
+    __tablename__ = "stories"
+    id = Column(Integer, primary_key=True, index=True)
+    # LLM summary of all the story's articles (only for stories with several)
+    summary = Column(Text, nullable=True)
+    article_count = Column(Integer, nullable=False, default=0)
+    # Number of articles the summary was generated from (at most
+    # stories.MAX_SUMMARY_ARTICLES)
+    summarized_article_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # When the last article joined the story
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
 
 class Category(Base):
     __tablename__ = "categories"
@@ -64,3 +120,106 @@ class Category(Base):
     articles = relationship(
         "Article", secondary=article_categories, back_populates="categories"
     )
+
+
+class ArticleKeyTerm(Base):
+    """An article's entry in the posting list of one of its key terms (see related.py)."""
+
+    __tablename__ = "article_key_terms"
+    bucket = Column(Integer, primary_key=True)
+    article_id = Column(
+        Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+
+class RelatedArticle(Base):
+    """Precomputed similarity between an article and a related one."""
+
+    __tablename__ = "related_articles"
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    related_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    similarity = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_related_articles_article_id_similarity", "article_id", "similarity"),
+    )
+
+
+class RankingWeight(Base):
+    """One weight of the feed re-ranking model (see ranking.py)."""
+
+    __tablename__ = "ranking_weights"
+    feature = Column(String, primary_key=True)
+    weight = Column(Float, nullable=False, default=0.0)
+
+
+class DetectedSelector(Base):
+    """
+    An article link selector detected for a page layout (see
+    link_selectors.py), reused for other pages of the domain with the same
+    layout instead of asking the LLM again.
+    """
+
+    __tablename__ = "detected_selectors"
+    domain = Column(String, primary_key=True)
+    fingerprint = Column(String, primary_key=True)
+    selector = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+
+class ArticleLSHBucket(Base):
+    """One LSH band bucket of an article's MinHash signature."""
+
+    __tablename__ = "article_lsh_buckets"
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+
+
+class Job(Base):
+    """
+    A background job (scraping, scoring...) and its progress. Jobs are
+    enqueued by the API and claimed by a worker through a time-limited lease.
+    """
+
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True, index=True)
+    type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=True)
+    status = Column(String, nullable=False, default="pending", index=True)
+    progress = Column(Integer, nullable=False, default=0)
+    message = Column(String, nullable=False, default="")
+    total_sources = Column(Integer, nullable=False, default=0)
+    processed_sources = Column(Integer, nullable=False, default=0)
+    total_articles = Column(Integer, nullable=False, default=0)
+    processed_articles = Column(Integer, nullable=False, default=0)
+    skipped_articles = Column(Integer, nullable=False, default=0)
+    failed_articles = Column(Integer, nullable=False, default=0)
+    eta_seconds = Column(Float, nullable=False, default=-1.0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class JobItem(Base):
+    """
+    One planned unit of work of a scraping job (an article link) and how far
+    it got, so an interrupted job can resume where it stopped.
+
+    state is one of: planned, stored (article saved), summarized, scored
+    (done), skipped (duplicate) or failed (could not be fetched).
+    """
+
+    __tablename__ = "job_items"
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, ForeignKey("jobs.id"), nullable=False, index=True)
+    source_id = Column(Integer, ForeignKey("sources.id", ondelete="CASCADE"), nullable=False)
+    url = Column(String, nullable=False)
+    state = Column(String, nullable=False, default="planned")
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
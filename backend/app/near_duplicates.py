@@ -0,0 +1,188 @@
+import hashlib
+import re
+import zlib
+
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from . import crud, models
+
+# MinHash / LSH parameters. With 16 bands of 8 rows, two articles become
+# candidates with ~50% probability at a Jaccard similarity of ~0.7 and almost
+# surely above 0.85; candidates are then verified against the full signature.
+NUM_PERMUTATIONS = 128
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.8
+# Texts shorter than this (in words) are too small for a meaningful signature
+MIN_WORDS = 30
+
+# Universal hashing ((a*x + b) mod p) with the Mersenne prime p = 2^61 - 1,
+# truncated to 32 bits. With a, b and x below 2^32, a*x + b fits in uint64.
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# Fixed seed so signatures stay comparable across processes and restarts
+_rng = np.random.default_rng(20250713)
+_PERM_A = (_rng.integers(1, 2**32, NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1))
+_PERM_B = _rng.integers(0, 2**32, NUM_PERMUTATIONS, dtype=np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+
+def _shingles(text: str) -> set[int]:
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return set()
+    return {
+        zlib.crc32(" ".join(words[i : i + SHINGLE_SIZE]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def compute_signature(text: str | None) -> np.ndarray | None:
+    """
+    Computes the MinHash signature (NUM_PERMUTATIONS uint32 values) of the
+    word 5-gram shingles of a text. Returns None if the text is too short.
+    """
+    shingles = _shingles(text or "")
+    if not shingles:
+        return None
+    hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    # One row per permutation, one column per shingle
+    permuted = ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME) & _MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def estimate_similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """
+    Estimates the Jaccard similarity between one signature and each row of a
+    (n, NUM_PERMUTATIONS) matrix of signatures.
+    """
+    return (others == signature).mean(axis=1)
+
+
+def band_buckets(signature: np.ndarray) -> list[tuple[int, int]]:
+    """
+    Splits a signature into LSH bands and hashes each band to a signed 64-bit
+    bucket id. Returns a list of (band, bucket) pairs.
+    """
+    buckets = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "big", signed=True)))
+    return buckets
+
+
+def find_near_duplicate(
+    db: Session, signature: np.ndarray | None, exclude_article_id: int | None = None
+) -> tuple[models.Article | None, float]:
+    """
+    Looks up the most similar already indexed article using the persisted LSH
+    index. Only articles sharing at least one band bucket are compared, so the
+    cost depends on the number of candidates rather than on the corpus size.
+
+    Returns the best match and its estimated similarity, or (None, 0.0) if no
+    article reaches SIMILARITY_THRESHOLD.
+    """
+    if signature is None:
+        return None, 0.0
+
+    bucket_filter = or_(
+        *[
+            and_(
+                models.ArticleLSHBucket.band == band,
+                models.ArticleLSHBucket.bucket == bucket,
+            )
+            for band, bucket in band_buckets(signature)
+        ]
+    )
+    query = db.query(models.ArticleLSHBucket.article_id).filter(bucket_filter)
+    if exclude_article_id is not None:
+        query = query.filter(models.ArticleLSHBucket.article_id != exclude_article_id)
+    candidate_ids = {article_id for (article_id,) in query.distinct()}
+    if not candidate_ids:
+        return None, 0.0
+
+    candidates = (
+        db.query(models.Article.id, models.Article.minhash_signature)
+        .filter(models.Article.id.in_(candidate_ids))
+        .filter(models.Article.minhash_signature.isnot(None))
+        .all()
+    )
+    if not candidates:
+        return None, 0.0
+
+    signatures = np.vstack(
+        [np.frombuffer(blob, dtype=np.uint32) for _, blob in candidates]
+    )
+    similarities = estimate_similarity(signature, signatures)
+    best = int(similarities.argmax())
+    if similarities[best] < SIMILARITY_THRESHOLD:
+        return None, 0.0
+
+    best_article = db.get(models.Article, candidates[best][0])
+    return best_article, float(similarities[best])
+
+
+def index_article(
+    db: Session,
+    article: models.Article,
+    signature: np.ndarray | None,
+    duplicate_of: models.Article | None = None,
+    commit: bool = True,
+):
+    """
+    Stores an article's signature and LSH buckets. If the article is a near
+    duplicate, it joins the cluster of the matched article, whose root is the
+    first article of the story that was stored.
+    """
+    if signature is None:
+        return article
+
+    article.minhash_signature = signature.astype(np.uint32).tobytes()
+    if duplicate_of is not None:
+        article.duplicate_of_id = duplicate_of.duplicate_of_id or duplicate_of.id
+    db.add(article)
+    crud.bulk_insert_ignoring_conflicts(
+        db,
+        models.ArticleLSHBucket.__table__,
+        [
+            {"band": band, "bucket": bucket, "article_id": article.id}
+            for band, bucket in band_buckets(signature)
+        ],
+    )
+    if commit:
+        db.commit()
+        db.refresh(article)
+    return article
+
+
+def index_existing_articles(db: Session, batch_size: int = 500) -> int:
+    """
+    Computes signatures for all articles that are not indexed yet, e.g. the
+    ones stored before near-duplicate detection existed. Returns the number of
+    articles indexed.
+    """
+    indexed = 0
+    last_id = 0
+    while True:
+        articles = (
+            db.query(models.Article)
+            .filter(models.Article.minhash_signature.is_(None))
+            .filter(models.Article.id > last_id)
+            .order_by(models.Article.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not articles:
+            return indexed
+        for article in articles:
+            signature = compute_signature(article.original_content)
+            if signature is not None:
+                index_article(db, article, signature, commit=False)
+                indexed += 1
+            last_id = article.id
+        db.commit()
@@ -0,0 +1,156 @@
+import math
+import threading
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import config, crud, embeddings, models
+
+# Personalized re-ranking of the feed, learned from the user's feedback.
+#
+# An online logistic regression predicts how likely the user is to like an
+# article from its source, its categories and its words (the hashed terms of
+# its embedding). Every like, dislike or article marked as read is one SGD
+# step, which only touches the weights of that article's features; the
+# weights are stored one row per feature in ranking_weights.
+#
+# The feed is ordered by a blend of the interest score and the predicted
+# probability. The probability's share grows with the number of feedback
+# events, so without feedback the order is the interest score's.
+
+BIAS = "bias"
+EVENTS_SETTING = "ranking_feedback_events"
+
+_weights: dict[str, float] | None = None
+_weights_events = -1
+_weights_lock = threading.Lock()
+
+
+def article_features(article: models.Article) -> dict[str, float]:
+    """Sparse feature vector of an article, keyed by feature name."""
+    features = {BIAS: 1.0}
+    if article.source_id is not None:
+        features[f"source:{article.source_id}"] = 1.0
+    for category in article.categories:
+        features[f"category:{category.name.lower()}"] = 1.0
+    if article.embedding is not None:
+        indices, values = embeddings.decode(article.embedding)
+    else:
+        indices, values = embeddings.embed_text(
+            f"{article.title or ''}\n{article.original_content or ''}"
+        )
+    values = values.astype(np.float32)
+    norm = np.linalg.norm(values)
+    if norm:
+        # Unit norm, so that long articles don't outweigh the other features
+        for index, value in zip(indices.tolist(), (values / norm).tolist()):
+            features[f"term:{index}"] = value
+    return features
+
+
+def feedback_events(db: Session) -> int:
+    setting = crud.get_setting(db, EVENTS_SETTING)
+    return int(setting.value) if setting and setting.value else 0
+
+
+def load_weights(db: Session, events: int | None = None) -> dict[str, float]:
+    """Returns the model's weights, reloaded when feedback was recorded since."""
+    global _weights, _weights_events
+    events = feedback_events(db) if events is None else events
+    with _weights_lock:
+        if _weights is None or events != _weights_events:
+            _weights = dict(
+                db.execute(select(models.RankingWeight.feature, models.RankingWeight.weight)).all()
+            )
+            _weights_events = events
+        return _weights
+
+
+def reset_weights():
+    global _weights, _weights_events
+    with _weights_lock:
+        _weights = None
+        _weights_events = -1
+
+
+def record_feedback(
+    db: Session,
+    article: models.Article,
+    liked: bool | None,
+    sample_weight: float = 1.0,
+    undo_step: float | None = None,
+) -> float | None:
+    """
+    Updates the model with one feedback event (one SGD step), and returns
+    the step (learning rate times gradient) to pass as undo_step when the
+    feedback changes: the previous event is then reverted and no longer
+    counts. liked=None only undoes the previous event.
+
+    The weights and the event count are incremented in the database rather
+    than overwritten, so concurrent feedback is never lost.
+    """
+    features = article_features(article)
+    deltas = dict.fromkeys(features, 0.0)
+    events = 0
+    if undo_step is not None:
+        for feature, value in features.items():
+            deltas[feature] += undo_step * value
+        events -= 1
+    step = None
+    if liked is not None:
+        stored = dict(
+            db.execute(
+                select(models.RankingWeight.feature, models.RankingWeight.weight).filter(
+                    models.RankingWeight.feature.in_(list(features))
+                )
+            ).all()
+        )
+        margin = sum(stored.get(feature, 0.0) * value for feature, value in features.items())
+        probability = 1 / (1 + math.exp(-max(min(margin, 30.0), -30.0)))
+        step = config.RANKING_LEARNING_RATE * sample_weight * (probability - (1.0 if liked else 0.0))
+        for feature, value in features.items():
+            deltas[feature] -= (
+                step * value
+                + config.RANKING_LEARNING_RATE * sample_weight * config.RANKING_L2 * stored.get(feature, 0.0)
+            )
+        events += 1
+    crud.add_to_ranking_weights(db, deltas)
+    # Commits the weights too; other processes reload theirs when they see
+    # the new event count
+    crud.increment_setting(db, EVENTS_SETTING, events)
+    reset_weights()
+    return step
+
+
+def predict(articles: list[models.Article], weights: dict[str, float]) -> np.ndarray:
+    """Predicted probability that the user likes each article, in one batch."""
+    if not articles:
+        return np.empty(0)
+    rows, names, values = [], [], []
+    for row, article in enumerate(articles):
+        for feature, value in article_features(article).items():
+            rows.append(row)
+            names.append(feature)
+            values.append(value)
+    feature_weights = np.fromiter(
+        (weights.get(name, 0.0) for name in names), dtype=np.float64, count=len(names)
+    )
+    margins = np.bincount(
+        rows, weights=np.asarray(values) * feature_weights, minlength=len(articles)
+    )
+    return 1 / (1 + np.exp(-np.clip(margins, -30, 30)))
+
+
+def rerank(db: Session, articles: list[models.Article]) -> list[models.Article]:
+    """Orders articles by their interest score blended with the model's prediction."""
+    interest = np.array([(article.interest_score or 0) / 100 for article in articles])
+    events = feedback_events(db)
+    if events:
+        share = events / (events + config.RANKING_PRIOR_EVENTS)
+        keys = (1 - share) * interest + share * predict(articles, load_weights(db, events))
+    else:
+        keys = interest
+    # Stable, so ties keep the database order (as the previous sort did)
+    order = np.argsort(-keys, kind="stable")
+    return [articles[i] for i in order]
@@ -0,0 +1,129 @@
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
+
+from . import crud, embeddings, models
+
+# Precomputed "related articles", over the articles' embeddings.
+#
+# Each article is indexed under its KEY_TERMS most distinctive terms (the
+# highest TF-IDF weights of its embedding) in article_key_terms. When an
+# article is stored, the articles whose key terms it contains the most are
+# the candidates of an approximate nearest-neighbour search: only they are
+# compared with the exact cosine similarity, so the cost does not grow with
+# the number of articles. Its TOP_K most similar articles are stored in
+# related_articles in both directions, and the endpoint only reads them.
+
+KEY_TERMS = 12
+MAX_CANDIDATES = 200
+TOP_K = 10
+MIN_SIMILARITY = 0.1
+
+
+def key_terms(indices: np.ndarray, values: np.ndarray, idf) -> list[int]:
+    """The buckets of the KEY_TERMS heaviest terms of a vector."""
+    weights = values.astype(np.float32) * idf[indices]
+    return indices[np.argsort(-weights, kind="stable")[:KEY_TERMS]].tolist()
+
+
+def index_article(db: Session, article: models.Article, idf=None, commit: bool = True):
+    """
+    Stores an article's key terms and its similarity to its nearest
+    neighbours. The article must have an embedding.
+    """
+    if not article.embedding:
+        return article
+    if idf is None:
+        idf = embeddings.load_idf(db)
+    indices, values = embeddings.decode(article.embedding)
+    terms = key_terms(indices, values, idf)
+
+    candidate_ids = db.scalars(
+        select(models.ArticleKeyTerm.article_id)
+        .filter(models.ArticleKeyTerm.bucket.in_(indices.tolist()))
+        .filter(models.ArticleKeyTerm.article_id != article.id)
+        .group_by(models.ArticleKeyTerm.article_id)
+        .order_by(func.count().desc(), models.ArticleKeyTerm.article_id.desc())
+        .limit(MAX_CANDIDATES)
+    ).all()
+    if candidate_ids:
+        candidates = embeddings.VectorIndex.from_rows(
+            db.execute(
+                select(models.Article.id, models.Article.embedding).filter(
+                    models.Article.id.in_(candidate_ids)
+                )
+            ).all()
+        )
+        (similarities,) = candidates.cosine_similarities(
+            [embeddings.dense_vector(indices, values, idf)], idf
+        )
+        best = np.argsort(-similarities, kind="stable")[:TOP_K]
+        pairs = [
+            (int(candidates.ids[i]), float(similarities[i]))
+            for i in best
+            if similarities[i] >= MIN_SIMILARITY
+        ]
+        crud.bulk_insert_ignoring_conflicts(
+            db,
+            models.RelatedArticle.__table__,
+            [
+                row
+                for related_id, similarity in pairs
+                for row in (
+                    {"article_id": article.id, "related_id": related_id, "similarity": similarity},
+                    {"article_id": related_id, "related_id": article.id, "similarity": similarity},
+                )
+            ],
+        )
+
+    crud.bulk_insert_ignoring_conflicts(
+        db,
+        models.ArticleKeyTerm.__table__,
+        [{"bucket": bucket, "article_id": article.id} for bucket in terms],
+    )
+    if commit:
+        db.commit()
+    return article
+
+
+def index_existing_articles(db: Session, batch_size: int = 500) -> int:
+    """
+    Indexes the embedded articles that are not indexed yet, e.g. the ones
+    stored before related articles existed. Returns the number of articles
+    indexed.
+    """
+    idf = embeddings.load_idf(db)
+    indexed = 0
+    last_id = 0
+    while True:
+        articles = (
+            db.query(models.Article)
+            .filter(models.Article.embedding.isnot(None))
+            .filter(models.Article.id > last_id)
+            .filter(~models.Article.id.in_(select(models.ArticleKeyTerm.article_id)))
+            .order_by(models.Article.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not articles:
+            return indexed
+        for article in articles:
+            index_article(db, article, idf, commit=False)
+            indexed += 1
+            last_id = article.id
+        db.commit()
+
+
+def get_related_articles(
+    db: Session, article_id: int, limit: int = TOP_K
+) -> list[tuple[models.Article, float]]:
+    """The most similar articles to an article, best first, with their similarity."""
+    rows = db.execute(
+        select(models.Article, models.RelatedArticle.similarity)
+        .join(models.RelatedArticle, models.RelatedArticle.related_id == models.Article.id)
+        .filter(models.RelatedArticle.article_id == article_id)
+        .order_by(models.RelatedArticle.similarity.desc())
+        .limit(limit)
+        .options(selectinload(models.Article.categories))
+    ).all()
+    return [(article, similarity) for article, similarity in rows]
@@ -0,0 +1,166 @@
+import datetime
+import random
+import threading
+from typing import Callable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import config, crud, models
+from .database import SessionLocal
+
+# Adaptive scrape scheduling (config.SCHEDULER_ENABLED).
+#
+# Each source is scraped on its own interval, learned from its publishing
+# rate: the number of its articles stored over the last
+# SCHEDULER_HISTORY_DAYS. The interval aims at SCHEDULER_ARTICLES_PER_POLL
+# new articles per scrape, within SCHEDULER_MIN_INTERVAL_MINUTES and
+# SCHEDULER_MAX_INTERVAL_MINUTES. A scrape that finds nothing new multiplies
+# the interval by SCHEDULER_BACKOFF_FACTOR, so sources that rarely change
+# are polled less and less often; one that finds new articles goes back to
+# the learned interval.
+#
+# Polls are spread over time: a source without a schedule gets its first
+# poll at a random point within its interval, and every next poll time is
+# jittered by SCHEDULER_JITTER, so sources scheduled together drift apart.
+#
+# The schedule is kept in the sources table (next_scrape_at), so it survives
+# restarts, and due sources are claimed with a conditional UPDATE: several
+# API processes can run the scheduler without scraping a source twice.
+
+# The articles stored by the first scrape of a source are the backlog of its
+# page, not its publishing rate: the history starts this long after them
+_BACKLOG = datetime.timedelta(hours=1)
+
+
+def publishing_interval(db: Session, source_id: int, now: datetime.datetime | None = None) -> float:
+    """
+    The polling interval, in minutes, that matches a source's publishing
+    rate. SCHEDULER_DEFAULT_INTERVAL_MINUTES without enough history.
+    """
+    now = now or datetime.datetime.utcnow()
+    first_article_at = (
+        db.query(func.min(models.Article.created_at))
+        .filter(models.Article.source_id == source_id)
+        .scalar()
+    )
+    if first_article_at is None:
+        return config.SCHEDULER_DEFAULT_INTERVAL_MINUTES
+    start = max(first_article_at + _BACKLOG, now - datetime.timedelta(days=config.SCHEDULER_HISTORY_DAYS))
+    observed_minutes = (now - start).total_seconds() / 60
+    if observed_minutes < config.SCHEDULER_DEFAULT_INTERVAL_MINUTES:
+        return config.SCHEDULER_DEFAULT_INTERVAL_MINUTES
+
+    published = (
+        db.query(func.count(models.Article.id))
+        .filter(models.Article.source_id == source_id, models.Article.created_at > start)
+        .scalar()
+    )
+    if not published:
+        return config.SCHEDULER_MAX_INTERVAL_MINUTES
+    interval = config.SCHEDULER_ARTICLES_PER_POLL * observed_minutes / published
+    return min(max(interval, config.SCHEDULER_MIN_INTERVAL_MINUTES), config.SCHEDULER_MAX_INTERVAL_MINUTES)
+
+
+def _jittered(now: datetime.datetime, minutes: float) -> datetime.datetime:
+    factor = random.uniform(1 - config.SCHEDULER_JITTER, 1 + config.SCHEDULER_JITTER)
+    return now + datetime.timedelta(minutes=minutes * factor)
+
+
+def record_poll(db: Session, source: models.Source, polled_at: datetime.datetime) -> float:
+    """
+    Schedules the next scrape of a source after a scrape started at
+    polled_at, from the articles it found. Returns the new interval.
+    """
+    now = datetime.datetime.utcnow()
+    new_articles = (
+        db.query(func.count(models.Article.id))
+        .filter(models.Article.source_id == source.id, models.Article.created_at >= polled_at)
+        .scalar()
+    )
+    interval = publishing_interval(db, source.id, now)
+    if not new_articles and source.scrape_interval_minutes is not None:
+        interval = max(interval, source.scrape_interval_minutes * config.SCHEDULER_BACKOFF_FACTOR)
+    interval = min(interval, config.SCHEDULER_MAX_INTERVAL_MINUTES)
+
+    source.scrape_interval_minutes = interval
+    source.next_scrape_at = _jittered(now, interval)
+    db.add(source)
+    db.commit()
+    print(
+        f"SCHEDULER: {source.name} had {new_articles} new articles, "
+        f"next scrape in {interval:.0f} minutes."
+    )
+    return interval
+
+
+def schedule_due_scrapes(db: Session, now: datetime.datetime | None = None) -> list[str]:
+    """
+    Enqueues a scrape job for each source whose next scrape is due, and
+    gives the sources without a schedule their first poll time. Returns the
+    IDs of the jobs enqueued.
+    """
+    now = now or datetime.datetime.utcnow()
+    sources = (
+        db.query(models.Source)
+        .filter((models.Source.next_scrape_at.is_(None)) | (models.Source.next_scrape_at <= now))
+        .order_by(models.Source.next_scrape_at)
+        .all()
+    )
+    job_ids = []
+    for source in sources:
+        source_id, name, due_at = source.id, source.name, source.next_scrape_at
+        interval = source.scrape_interval_minutes or publishing_interval(db, source_id, now)
+        if due_at is None:
+            next_scrape_at = now + datetime.timedelta(minutes=interval * random.random())
+        else:
+            # Until the scrape reschedules the source (record_poll), e.g. if
+            # the job fails
+            next_scrape_at = _jittered(now, interval)
+
+        unchanged = (
+            models.Source.next_scrape_at.is_(None) if due_at is None else models.Source.next_scrape_at == due_at
+        )
+        claimed = (
+            db.query(models.Source)
+            .filter(models.Source.id == source_id, unchanged)
+            .update({models.Source.next_scrape_at: next_scrape_at}, synchronize_session=False)
+        )
+        db.commit()
+        if claimed != 1 or due_at is None:
+            continue
+        job = crud.create_job(db, "scrape", {"source_id": source_id})
+        print(f"SCHEDULER: Enqueued scrape job {job.id} for {name}.")
+        job_ids.append(job.id)
+    return job_ids
+
+
+def run_scheduler(stop: threading.Event, run_job: Callable[[str], object] | None = None):
+    """
+    Enqueues the due scrapes every SCHEDULER_TICK_SECONDS until stop is set.
+    run_job, if given, runs each enqueued job in this thread (the API's
+    "embedded" execution mode); otherwise the workers run them.
+    """
+    print("SCHEDULER: Started.")
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            job_ids = schedule_due_scrapes(db)
+        except Exception as e:
+            db.rollback()
+            print(f"SCHEDULER: An error occurred: {e}")
+            job_ids = []
+        finally:
+            db.close()
+        for job_id in job_ids:
+            if run_job is not None and not stop.is_set():
+                run_job(job_id)
+        stop.wait(config.SCHEDULER_TICK_SECONDS)
+    print("SCHEDULER: Stopped.")
+
+
+def start_scheduler(run_job: Callable[[str], object] | None = None) -> threading.Event:
+    """Runs the scheduler in a daemon thread. Returns the event that stops it."""
+    stop = threading.Event()
+    threading.Thread(target=run_scheduler, args=(stop, run_job), daemon=True).start()
+    return stop
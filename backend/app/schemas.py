@@ -24,6 +24,8 @@ class JobStatus(BaseModel):
     failed_articles: int = 0
     eta_seconds: float = -1.0
 
+    model_config = {"from_attributes": True}
+
 
 class ArticleBase(BaseModel):
     url: str
@@ -38,6 +40,8 @@ class ArticleCreate(ArticleBase):
     source_id: int
     summary: str | None = None
     interest_score: int | None = None
+    # The list link the article was found under, if it differs from url
+    link_url: str | None = None
 
 
 class Category(BaseModel):
@@ -52,16 +56,44 @@ class Article(ArticleBase):
     source_id: int
     created_at: datetime.datetime
     read: bool
+    liked: bool | None = None
     interest_score: int | None = None
+    duplicate_of_id: int | None = None
     categories: list[Category] = []
 
     model_config = {"from_attributes": True}
 
 
+class ArticleSearchResult(Article):
+    # Relevance of the match, higher is better
+    rank: float = 0.0
+    # HTML-escaped excerpt with the matched words in <mark> tags
+    snippet: str = ""
+
+
+class RelatedArticle(Article):
+    # Cosine similarity to the article the related ones were requested for
+    similarity: float = 0.0
+
+
+class StoryGroup(BaseModel):
+    # None for articles that were not assigned to a story
+    story_id: int | None = None
+    # Summary of the whole story, or of its article for single-article stories
+    summary: str | None = None
+    article_count: int = 1
+    articles: list[Article] = []
+
+
 class ArticleReadStatus(BaseModel):
     read: bool
 
 
+class ArticleFeedback(BaseModel):
+    # None clears the feedback
+    liked: bool | None
+
+
 class SourceBase(BaseModel):
     name: str
     url: str
@@ -83,6 +115,8 @@ class SourceUpdate(SourceBase):
 class Source(SourceBase):
     id: int
     last_scraped_at: datetime.datetime | None = None
+    scrape_interval_minutes: float | None = None
+    next_scrape_at: datetime.datetime | None = None
     scraper_type: str | None = None
     config: Dict[str, Any] | None = None
 
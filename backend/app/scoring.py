@@ -0,0 +1,87 @@
+import re
+
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from . import config, embeddings, llm_interface, models
+
+# Interest scoring, with the engine selected by config.SCORING_ENGINE.
+#
+# The embedding engine compares the articles' vectors (see embeddings.py)
+# with the interest prompt. Sentences of the prompt with a negation ("I am
+# not interested in sports") describe what the user does not want: their
+# similarity is subtracted.
+
+_SENTENCE = re.compile(r"[^.!?;\n]+")
+_NEGATIVE = re.compile(r"\b(not|no|never|dislike|hate|avoid|don'?t|doesn'?t)\b", re.IGNORECASE)
+
+
+def split_interest_prompt(interest_prompt: str) -> tuple[str, str]:
+    """Returns the (positive, negative) parts of an interest prompt."""
+    positive, negative = [], []
+    for sentence in _SENTENCE.findall(interest_prompt or ""):
+        (negative if _NEGATIVE.search(sentence) else positive).append(sentence.strip())
+    return " ".join(positive), " ".join(negative)
+
+
+def _similarity_scores(index: embeddings.VectorIndex, interest_prompt: str, idf=None) -> np.ndarray:
+    idf = index.idf() if idf is None else idf
+    positive, negative = split_interest_prompt(interest_prompt)
+    positive_similarity, negative_similarity = index.cosine_similarities(
+        [index.query_vector(positive, idf), index.query_vector(negative, idf)], idf
+    )
+    similarity = positive_similarity - negative_similarity
+    return np.rint(
+        np.clip(similarity / config.EMBEDDING_FULL_SCORE_SIMILARITY, 0, 1) * 100
+    ).astype(int)
+
+
+def score_article(db: Session, article: models.Article, interest_prompt: str) -> int | None:
+    """Computes the interest score of one article (without storing it)."""
+    if config.SCORING_ENGINE != "embedding":
+        return llm_interface.generate_interest_score(
+            article_text=article.original_content, user_interest_prompt=interest_prompt
+        )
+
+    if article.embedding is None:
+        embeddings.embed_article(article)
+        db.commit()
+    # IDF weights come from all stored articles
+    idf = embeddings.load_idf(db)
+    single = embeddings.VectorIndex.from_rows([(article.id, article.embedding)])
+    return int(_similarity_scores(single, interest_prompt, idf)[0])
+
+
+def summary_allowed(interest_score: int | None) -> bool:
+    """
+    Whether an article with this score gets a summary. With SUMMARY_MIN_SCORE,
+    an article whose scoring failed (no score) is not summarized yet: both
+    steps are left to the enrichment repair.
+    """
+    if config.SUMMARY_MIN_SCORE <= 0:
+        return True
+    return interest_score is not None and interest_score >= config.SUMMARY_MIN_SCORE
+
+
+def rescore_all_articles(db: Session, interest_prompt: str, progress_callback=None) -> int:
+    """
+    Recomputes the embedding engine's score of every article in one
+    vectorized pass and stores them with a single bulk update. Articles
+    without an embedding yet are embedded first; progress_callback gets the
+    number of articles embedded so far. Returns the number of articles scored.
+    """
+    embeddings.embed_missing_articles(db, progress_callback=progress_callback)
+    index = embeddings.load_index(db)
+    if not len(index):
+        return 0
+    scores = _similarity_scores(index, interest_prompt)
+    db.execute(
+        update(models.Article),
+        [
+            {"id": article_id, "interest_score": score}
+            for article_id, score in zip(index.ids.tolist(), scores.tolist())
+        ],
+    )
+    db.commit()
+    return len(index)
@@ -4,45 +4,71 @@ from urllib.parse import urljoin
 from collections import OrderedDict
 
 from bs4 import BeautifulSoup
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from trafilatura import extract
 
-from . import crud, models, schemas, llm_interface
-from .shared_state import canceled_jobs, job_statuses
+from . import config, crud, metrics, models, schemas, llm_interface, near_duplicates, embeddings, related, scoring, stories
+from .urls import canonicalize_url, find_canonical_url, page_domain
 
 
 def get_article_links(source: models.Source) -> list[str]:
     """
     Fetches the article links from a source without processing them.
-    Returns a list of article URLs.
+    Returns a list of article URLs, with variants of the same URL (tracking
+    parameters, fragments, AMP pages...) collapsed to their first occurrence.
     """
-    config = source.config or {}
-    article_link_selector = config.get("article_link_selector")
+    source_config = source.config or {}
+    article_link_selector = source_config.get("article_link_selector")
 
     if not article_link_selector:
         print(f"Skipping source {source.name}: 'article_link_selector' not configured.")
         return []
 
+    page = fetch_source_page(source.url)
+    if page is None:
+        return []
+    return extract_article_links(page, source.url, article_link_selector)
+
+
+def fetch_source_page(url: str) -> str | None:
+    """Fetches the HTML of a source's main page, or None if fetching fails."""
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
     }
     try:
-        response = requests.get(source.url, headers=headers, timeout=10)
+        with metrics.fetch_seconds.time(domain=page_domain(url), kind="source"):
+            response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
     except requests.RequestException as e:
-        print(f"Error fetching source URL {source.url}: {e}")
-        return []
+        print(f"Error fetching source URL {url}: {e}")
+        return None
+    return response.text
+
+
+def extract_article_links(page: str, page_url: str, article_link_selector: str) -> list[str]:
+    """The deduplicated article URLs matched by a selector in a source page."""
+    with metrics.extraction_cpu_seconds.time(cpu=True, kind="links"):
+        return _extract_article_links(page, page_url, article_link_selector)
 
-    soup = BeautifulSoup(response.text, "lxml")
+
+def _extract_article_links(page: str, page_url: str, article_link_selector: str) -> list[str]:
+    soup = BeautifulSoup(page, "lxml")
     links = soup.select(article_link_selector)
     
     article_urls = []
+    seen_urls = set()
     for link in links:
         href = link.get("href")
         if not href:
             continue
-        article_urls.append(urljoin(source.url, href))
-    
+        article_url = urljoin(page_url, href)
+        normalized_url = canonicalize_url(article_url)
+        if normalized_url in seen_urls:
+            continue
+        seen_urls.add(normalized_url)
+        article_urls.append(article_url)
+
     return article_urls
 
 
@@ -73,92 +99,233 @@ def scrape_html(html_content: str) -> dict:
 def _scrape_article_content(url: str) -> dict | None:
     """
     Fetches an article's HTML and scrapes its content.
-    Returns a dict with title and content, or None if fetching fails.
+    Returns a dict with title, content and the page's declared canonical URL
+    (None if it has none), or None if fetching fails.
     """
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
     }
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        with metrics.fetch_seconds.time(domain=page_domain(url), kind="article"):
+            response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
-        return scrape_html(response.text)
+        with metrics.extraction_cpu_seconds.time(cpu=True, kind="article"):
+            scraped_data = scrape_html(response.text)
+        scraped_data["canonical_url"] = find_canonical_url(response.text, response.url or url)
+        return scraped_data
     except requests.RequestException as e:
         print(f"Error fetching article content from {url}: {e}")
         return None
 
 
-def _scrape_html_source(db: Session, source: models.Source, job_id: str | None = None, article_links: list[str] = None, update_progress_callback: callable = None) -> bool:
+def _checkpoint(db: Session, job_item: models.JobItem | None, state: str):
+    if job_item is not None:
+        crud.update_job_item(db, job_item, state)
+
+
+def _process_article_link(db: Session, source: models.Source, link: str, job_item: models.JobItem | None = None) -> str:
     """
-    Scraping strategy for a standard HTML source. It finds article links
-    based on a CSS selector and scrapes each one.
-    Returns True if the job was canceled, False otherwise.
+    Runs the scraping pipeline for one article link: fetch and store, then
+    summarize, then score. When a job item is given, each completed step is
+    checkpointed on it and steps it already completed are not redone.
+    Returns "processed", "skipped" or "failed".
     """
-    print(f"Scraping HTML source: {source.name}")
+    state = job_item.state if job_item is not None else "planned"
+    db_article = None
 
-    for link in article_links:
-        if job_id and job_id in canceled_jobs:
-            print(f"JOB {job_id}: Cancellation detected in scraping loop for source {source.name}. Stopping.")
-            return True
-        
-        # 1. Check for duplicates
+    if state == "planned":
+        # 1. Check for duplicates. The pre-scan of a job (see seen_links.py)
+        # skips most known links, but a false positive of its filter or an
+        # article stored since then is only caught here, before the fetch.
         if crud.get_article_by_url(db, url=link):
             print(f"Skipping duplicate article: {link}")
-            if update_progress_callback:
-                update_progress_callback(processed=0, skipped=1, failed=0)
-            continue
+            _checkpoint(db, job_item, "skipped")
+            return "skipped"
 
         # 2. Scrape the full article content
         print(f"Scraping new article: {link}")
         scraped_data = _scrape_article_content(link)
         if not scraped_data:
-            if update_progress_callback:
-                update_progress_callback(processed=0, skipped=0, failed=1)
-            continue
+            _checkpoint(db, job_item, "failed")
+            return "failed"
 
-        # 3. Create the article in the database
+        # 3. The page may declare a canonical URL that we already know
+        # under a different link (e.g. a syndicated or AMP copy)
+        article_url = scraped_data["canonical_url"] or link
+        if article_url != link and crud.get_article_by_url(db, url=article_url):
+            print(f"Skipping duplicate article (canonical URL {article_url}): {link}")
+            _checkpoint(db, job_item, "skipped")
+            return "skipped"
+
+        # 4. Create the article in the database
         article_create = schemas.ArticleCreate(
             title=scraped_data["title"],
-            url=link,
+            url=article_url,
+            link_url=link,
             original_content=scraped_data["text"],
             source_id=source.id,
             summary=None,
         )
-        db_article = crud.create_article(db=db, article=article_create)
+        try:
+            if job_item is not None:
+                db_article = crud.create_article_for_job_item(db, article_create, job_item)
+            else:
+                db_article = crud.create_article(db=db, article=article_create)
+        except IntegrityError:
+            # Stored meanwhile, e.g. by another source listing the same link
+            db.rollback()
+            print(f"Skipping duplicate article (already stored): {link}")
+            _checkpoint(db, job_item, "skipped")
+            return "skipped"
         print(f"Successfully saved article: {scraped_data['title']}")
+        state = "stored"
+    else:
+        db_article = crud.get_article(db, job_item.article_id)
+        if db_article is None:
+            # The article was deleted since it was stored
+            _checkpoint(db, job_item, "failed")
+            return "failed"
+        print(f"Resuming article at step '{state}': {db_article.title}")
 
-        # 4. Process the article with LLM for summary and categories
-        print(f"Processing article with LLM: {scraped_data['title']}")
-        summary, categories = llm_interface.generate_summary_and_categories(
-            article_text=scraped_data["text"]
+    if state == "stored":
+        # 5. The same story may already be stored from another source with
+        # slightly different text; reuse its enrichment instead of the LLM.
+        if db_article.embedding is None:
+            embeddings.embed_article(db_article)
+        if db_article.minhash_signature is None:
+            signature = near_duplicates.compute_signature(db_article.original_content)
+            duplicate, similarity = near_duplicates.find_near_duplicate(
+                db, signature, exclude_article_id=db_article.id
+            )
+            near_duplicates.index_article(db, db_article, signature, duplicate_of=duplicate)
+        # Precompute the related articles, then cluster the article into a story
+        related.index_article(db, db_article)
+        stories.assign_story(db, db_article)
+        duplicate = (
+            crud.get_article(db, db_article.duplicate_of_id)
+            if db_article.duplicate_of_id
+            else None
         )
-
-        if summary:
-            crud.update_article_summary(db, article_id=db_article.id, summary=summary)
-        if categories:
-            crud.link_categories_to_article(
-                db, article_id=db_article.id, categories=categories
+        if duplicate is not None and duplicate.summary:
+            print(
+                f"Article is a near duplicate of article {duplicate.id}, "
+                f"reusing its enrichment: {db_article.title}"
             )
+            crud.copy_article_enrichment(db, article_id=db_article.id, from_article=duplicate)
+            _checkpoint(db, job_item, "scored")
+            return "processed"
+        story_article = stories.enriched_story_article(db, db_article)
+        if story_article is not None:
+            # The story gets one merged summary at the end of the scrape; the
+            # other article's summary is about a different text, so only its
+            # categories and score are reused
+            print(
+                f"Article joined the story of article {story_article.id}, "
+                f"reusing its categories and score: {db_article.title}"
+            )
+            crud.copy_article_enrichment(
+                db, article_id=db_article.id, from_article=story_article, include_summary=False
+            )
+            _checkpoint(db, job_item, "scored")
+            return "processed"
 
-        # 5. Generate interest score
-        interest_prompt = crud.get_interest_prompt(db)
-        interest_score = llm_interface.generate_interest_score(
-            article_text=scraped_data["text"], user_interest_prompt=interest_prompt
-        )
-        crud.update_article_interest_score(
-            db, article_id=db_article.id, interest_score=interest_score
-        )
-        print(
-            f"Successfully generated interest score for article: {scraped_data['title']}"
+        if config.SUMMARY_MODE == "lazy" or config.SUMMARY_MIN_SCORE > 0:
+            # 6. Score first (with the cheap scoring model): only the
+            # articles worth it get the expensive summary, if any now
+            interest_score = _score_article(db, db_article)
+            if config.SUMMARY_MODE == "lazy":
+                print(f"Summary deferred until the article is shown: {db_article.title}")
+            elif interest_score is None:
+                # Not "below the threshold": the repair job retries both steps
+                print(f"Scoring failed, leaving the article to the repair job: {db_article.title}")
+            elif scoring.summary_allowed(interest_score):
+                _summarize_article(db, db_article)
+            else:
+                print(
+                    f"Article scored {interest_score}, below {config.SUMMARY_MIN_SCORE}, "
+                    f"not summarizing it: {db_article.title}"
+                )
+            _checkpoint(db, job_item, "scored")
+            return "processed"
+
+        # 6. Process the article with LLM for summary and categories
+        _summarize_article(db, db_article)
+        _checkpoint(db, job_item, "summarized")
+        state = "summarized"
+
+    if state == "summarized":
+        # 7. Generate interest score
+        _score_article(db, db_article)
+        _checkpoint(db, job_item, "scored")
+        print(f"Successfully processed article with LLM: {db_article.title}")
+
+    return "processed"
+
+
+def _summarize_article(db: Session, db_article: models.Article):
+    print(f"Processing article with LLM: {db_article.title}")
+    summary, categories = llm_interface.generate_summary_and_categories(
+        article_text=db_article.original_content
+    )
+
+    if summary:
+        crud.update_article_summary(db, article_id=db_article.id, summary=summary)
+    if categories:
+        crud.link_categories_to_article(
+            db, article_id=db_article.id, categories=categories
         )
-        print(f"Successfully processed article with LLM: {scraped_data['title']}")
+
+
+def _score_article(db: Session, db_article: models.Article) -> int | None:
+    interest_prompt = crud.get_interest_prompt(db)
+    interest_score = scoring.score_article(db, db_article, interest_prompt)
+    if interest_score is None:
+        # Left NULL, so that the enrichment repair retries it
+        print(f"Could not generate an interest score for article: {db_article.title}")
+        return None
+    crud.update_article_interest_score(
+        db, article_id=db_article.id, interest_score=interest_score
+    )
+    print(
+        f"Successfully generated interest score for article: {db_article.title}"
+    )
+    return interest_score
+
+
+def _scrape_html_source(db: Session, source: models.Source, job_id: str | None = None, article_links: list[str] = None, update_progress_callback: callable = None, job_items: list[models.JobItem] = None) -> bool:
+    """
+    Scraping strategy for a standard HTML source. It finds article links
+    based on a CSS selector and scrapes each one.
+    When job_items are given, they are processed instead of article_links and
+    each one resumes from its last checkpoint.
+    Returns True if the job was canceled, False otherwise.
+    """
+    print(f"Scraping HTML source: {source.name}")
+
+    if job_items is not None:
+        work = [(job_item.url, job_item) for job_item in job_items]
+    else:
+        work = [(link, None) for link in article_links]
+
+    for link, job_item in work:
+        if job_id and crud.is_job_cancel_requested(db, job_id):
+            print(f"JOB {job_id}: Cancellation detected in scraping loop for source {source.name}. Stopping.")
+            return True
+
+        outcome = _process_article_link(db, source, link, job_item)
+        metrics.scraped_articles.inc(outcome=outcome)
 
         if update_progress_callback:
-            update_progress_callback(processed=1, skipped=0, failed=0)
+            update_progress_callback(
+                processed=int(outcome == "processed"),
+                skipped=int(outcome == "skipped"),
+                failed=int(outcome == "failed"),
+            )
 
     return False
 
 
-def scrape_source(db: Session, source: models.Source, job_id: str | None = None, article_links: list[str] = None, update_progress_callback: callable = None) -> bool:
+def scrape_source(db: Session, source: models.Source, job_id: str | None = None, article_links: list[str] = None, update_progress_callback: callable = None, job_items: list[models.JobItem] = None) -> bool:
     """
     Dispatcher function to select and run the correct scraping strategy.
     Returns True if the job was canceled, False otherwise.
@@ -172,11 +339,11 @@ def scrape_source(db: Session, source: models.Source, job_id: str | None = None,
         # If article links are not provided, fetch them now.
         # This allows for both pre-scanning (in a job) and direct scraping.
         links_to_scrape = article_links
-        if links_to_scrape is None:
+        if links_to_scrape is None and job_items is None:
             links_to_scrape = get_article_links(source)
 
         was_canceled = _scrape_html_source(
-            db, source, job_id=job_id, article_links=links_to_scrape, update_progress_callback=update_progress_callback
+            db, source, job_id=job_id, article_links=links_to_scrape, update_progress_callback=update_progress_callback, job_items=job_items
         )
         if was_canceled:
             return True
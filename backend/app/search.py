@@ -0,0 +1,330 @@
+import html
+import re
+
+from sqlalchemy import case, event, or_, text
+from sqlalchemy.orm import Session, selectinload
+
+from . import models
+
+# Full-text index over the articles' title, summary and content.
+#
+# On SQLite it is an external-content FTS5 table (the text is not stored
+# twice) kept in sync by triggers on the articles table. On PostgreSQL it is
+# a stored, generated tsvector column with a GIN index. Either way inserts
+# and updates are indexed incrementally by the database itself, and every
+# match is ranked. Other databases fall back to a LIKE search, without an
+# index.
+
+FTS_TABLE = "articles_fts"
+
+# Relative weight of matches in each column, for ranking
+TITLE_WEIGHT = 10.0
+SUMMARY_WEIGHT = 5.0
+CONTENT_WEIGHT = 1.0
+
+SNIPPET_WORDS = 24
+
+_SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, summary, original_content,
+        content='articles', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, summary, original_content)
+        VALUES (new.id, new.title, new.summary, new.original_content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, original_content)
+        VALUES ('delete', old.id, old.title, old.summary, old.original_content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS articles_fts_update
+    AFTER UPDATE OF title, summary, original_content ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, original_content)
+        VALUES ('delete', old.id, old.title, old.summary, old.original_content);
+        INSERT INTO {FTS_TABLE}(rowid, title, summary, original_content)
+        VALUES (new.id, new.title, new.summary, new.original_content);
+    END
+    """,
+]
+
+_SQLITE_DROP_DDL = [
+    "DROP TRIGGER IF EXISTS articles_fts_insert",
+    "DROP TRIGGER IF EXISTS articles_fts_delete",
+    "DROP TRIGGER IF EXISTS articles_fts_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+_POSTGRESQL_DDL = [
+    """
+    ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(summary, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(original_content, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_articles_search_vector ON articles USING gin (search_vector)",
+]
+
+_POSTGRESQL_DROP_DDL = [
+    "DROP INDEX IF EXISTS ix_articles_search_vector",
+    "ALTER TABLE articles DROP COLUMN IF EXISTS search_vector",
+]
+
+# Highlight markers placed by the database, replaced by <mark> tags once the
+# snippet has been HTML-escaped
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+_WORD = re.compile(r"\w+")
+MIN_PREFIX_LENGTH = 3
+
+
+def create_search_index(connection):
+    """Creates the full-text index (with the articles table, or in a migration)."""
+    dialect = connection.dialect.name
+    statements = {"sqlite": _SQLITE_DDL, "postgresql": _POSTGRESQL_DDL}.get(dialect, [])
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def drop_search_index(connection):
+    dialect = connection.dialect.name
+    statements = {"sqlite": _SQLITE_DROP_DDL, "postgresql": _POSTGRESQL_DROP_DDL}.get(dialect, [])
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_search_index(connection):
+    """
+    Re-indexes all existing articles. Only needed on SQLite, when the index
+    is added to a database that already has articles.
+    """
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+def is_search_index_object(name: str, type_: str) -> bool:
+    """
+    Whether a database object belongs to the full-text index, which is not
+    part of the models (for Alembic's autogenerate and check).
+    """
+    if type_ == "table":
+        # The FTS5 table and its shadow tables
+        return name == FTS_TABLE or name.startswith(f"{FTS_TABLE}_")
+    if type_ == "column":
+        return name == "search_vector"
+    if type_ == "index":
+        return name == "ix_articles_search_vector"
+    return False
+
+
+def _create_with_table(target, connection, **kw):
+    create_search_index(connection)
+
+
+def _drop_with_table(target, connection, **kw):
+    drop_search_index(connection)
+
+
+def register_search_index():
+    """
+    Creates and drops the full-text index along with the articles table, in
+    create_all() and drop_all(). Called at startup, before creating the tables.
+    """
+    table = models.Article.__table__
+    if not event.contains(table, "after_create", _create_with_table):
+        event.listen(table, "after_create", _create_with_table)
+        event.listen(table, "before_drop", _drop_with_table)
+
+
+def _fts5_query(query: str) -> str | None:
+    """
+    Turns free text into an FTS5 query matching all its words, the last one
+    as a prefix (so results show up while typing) if it is long enough. Quoting every word keeps
+    FTS5 operators and punctuation in the input from being interpreted.
+    """
+    words = _WORD.findall(query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    # Very short prefixes would expand to a large part of the vocabulary
+    if len(words[-1]) >= MIN_PREFIX_LENGTH:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _highlight(snippet: str | None) -> str:
+    return (
+        html.escape(snippet or "")
+        .replace(_MARK_START, "<mark>")
+        .replace(_MARK_END, "</mark>")
+    )
+
+
+def _search_sqlite(db: Session, query: str, skip: int, limit: int):
+    match = _fts5_query(query)
+    if match is None:
+        return []
+    rows = db.execute(
+        text(
+            f"""
+            SELECT rowid,
+                   bm25({FTS_TABLE}, :title_weight, :summary_weight, :content_weight) AS rank,
+                   snippet({FTS_TABLE}, -1, :mark_start, :mark_end, '…', :snippet_words)
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH :match
+            ORDER BY rank
+            LIMIT :limit OFFSET :skip
+            """
+        ),
+        {
+            "match": match,
+            "title_weight": TITLE_WEIGHT,
+            "summary_weight": SUMMARY_WEIGHT,
+            "content_weight": CONTENT_WEIGHT,
+            "mark_start": _MARK_START,
+            "mark_end": _MARK_END,
+            "snippet_words": SNIPPET_WORDS,
+            "limit": limit,
+            "skip": skip,
+        },
+    ).all()
+    # bm25() is lower for better matches
+    return [(article_id, -rank, snippet) for article_id, rank, snippet in rows]
+
+
+def _search_postgresql(db: Session, query: str, skip: int, limit: int):
+    # The headline is only computed for the page of results, not for every match
+    rows = db.execute(
+        text(
+            """
+            SELECT page.id, page.rank,
+                   ts_headline('english', coalesce(a.summary, a.original_content, a.title, ''),
+                               page.query, :headline_options)
+            FROM (
+                SELECT articles.id, ts_rank(articles.search_vector, query) AS rank, query
+                FROM articles, websearch_to_tsquery('english', :query) AS query
+                WHERE articles.search_vector @@ query
+                ORDER BY rank DESC, articles.id DESC
+                LIMIT :limit OFFSET :skip
+            ) AS page
+            JOIN articles AS a ON a.id = page.id
+            ORDER BY page.rank DESC
+            """
+        ),
+        {
+            "query": query,
+            "headline_options": (
+                f"StartSel={_MARK_START}, StopSel={_MARK_END}, "
+                f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"
+            ),
+            "limit": limit,
+            "skip": skip,
+        },
+    ).all()
+    return [(article_id, float(rank), snippet) for article_id, rank, snippet in rows]
+
+
+def _like_snippet(texts: list[str | None], words: list[str]) -> str:
+    """
+    SNIPPET_WORDS words of the first text with a match, from the first
+    matching word on, with the matching words marked.
+    """
+    lowered = [word.lower() for word in words]
+
+    def matches(token: str) -> bool:
+        return any(word in token.lower() for word in lowered)
+
+    tokens = []
+    for text_ in texts:
+        tokens = (text_ or "").split()
+        if any(matches(token) for token in tokens):
+            break
+    start = next((i for i, token in enumerate(tokens) if matches(token)), 0)
+    window = [
+        f"{_MARK_START}{token}{_MARK_END}" if matches(token) else token
+        for token in tokens[start:start + SNIPPET_WORDS]
+    ]
+    return (
+        ("…" if start else "")
+        + " ".join(window)
+        + ("…" if start + SNIPPET_WORDS < len(tokens) else "")
+    )
+
+
+def _search_like(db: Session, query: str, skip: int, limit: int):
+    # Without a full-text index, every word must appear in one of the
+    # columns, and the columns it appears in give the rank
+    words = _WORD.findall(query)
+    if not words:
+        return []
+    article = models.Article
+    columns = (
+        (article.title, TITLE_WEIGHT),
+        (article.summary, SUMMARY_WEIGHT),
+        (article.original_content, CONTENT_WEIGHT),
+    )
+    conditions = []
+    rank = 0
+    for word in words:
+        pattern = "%" + word.replace("_", "\\_") + "%"
+        matches = [(column.ilike(pattern, escape="\\"), weight) for column, weight in columns]
+        conditions.append(or_(*(match for match, _ in matches)))
+        rank += sum(case((match, weight), else_=0.0) for match, weight in matches)
+    rows = (
+        db.query(article.id, rank, article.summary, article.original_content, article.title)
+        .filter(*conditions)
+        .order_by(rank.desc(), article.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    return [
+        (article_id, float(article_rank), _like_snippet([summary, content, title], words))
+        for article_id, article_rank, summary, content, title in rows
+    ]
+
+
+def search_articles(
+    db: Session, query: str, skip: int = 0, limit: int = 20
+) -> list[tuple[models.Article, float, str]]:
+    """
+    Full-text search over the articles' title, summary and content.
+
+    Returns (article, rank, snippet) tuples, best match first, among all
+    the matching articles. The rank is higher for better matches; the
+    snippet is an HTML-escaped excerpt of the best matching text with the
+    matched words wrapped in <mark> tags.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        hits = _search_sqlite(db, query, skip, limit)
+    elif dialect == "postgresql":
+        hits = _search_postgresql(db, query, skip, limit)
+    else:
+        hits = _search_like(db, query, skip, limit)
+    if not hits:
+        return []
+
+    articles = {
+        article.id: article
+        for article in db.query(models.Article)
+        .options(selectinload(models.Article.categories))
+        .filter(models.Article.id.in_([article_id for article_id, _, _ in hits]))
+    }
+    return [
+        (articles[article_id], rank, _highlight(snippet))
+        for article_id, rank, snippet in hits
+        if article_id in articles
+    ]
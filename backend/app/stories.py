@@ -0,0 +1,191 @@
+import datetime
+
+from sqlalchemy import case, select
+from sqlalchemy.orm import Session
+
+from . import config, crud, embeddings, llm_interface, models
+from .database import SessionLocal
+
+# Incremental story clustering.
+#
+# When an article is stored it joins the story of the most similar article
+# already known (its near-duplicate root, or its best related article, see
+# related.py) if they are similar enough and that story is recent; otherwise
+# it starts a new story. Stories with several articles get one LLM summary of
+# their first articles, generated after each scrape for the stories whose
+# summarized articles changed (or, with lazy summaries, when shown).
+
+# Articles (and characters of each) sent to the LLM for a story summary
+MAX_SUMMARY_ARTICLES = 8
+MAX_SUMMARY_CHARS_PER_ARTICLE = 4000
+# Articles with fewer distinct terms are too short to be compared reliably
+# and always start their own story
+MIN_TERMS = 20
+
+
+def _matching_story(db: Session, article: models.Article) -> models.Story | None:
+    if article.duplicate_of_id:
+        root = crud.get_article(db, article.duplicate_of_id)
+        if root is not None and root.story_id is not None:
+            return db.get(models.Story, root.story_id)
+    if len(embeddings.decode(article.embedding or b"")[0]) < MIN_TERMS:
+        return None
+    window_start = (article.created_at or datetime.datetime.utcnow()) - datetime.timedelta(
+        hours=config.STORY_WINDOW_HOURS
+    )
+    return db.scalars(
+        select(models.Story)
+        .join(models.Article, models.Article.story_id == models.Story.id)
+        .join(models.RelatedArticle, models.RelatedArticle.related_id == models.Article.id)
+        .filter(models.RelatedArticle.article_id == article.id)
+        .filter(models.RelatedArticle.similarity >= config.STORY_SIMILARITY_THRESHOLD)
+        .filter(models.Story.updated_at >= window_start)
+        .order_by(models.RelatedArticle.similarity.desc())
+        .limit(1)
+    ).first()
+
+
+def assign_story(db: Session, article: models.Article, commit: bool = True) -> models.Story:
+    """
+    Adds an article to the story of its most similar recent article, or to a
+    new story. Needs the article's related articles (related.index_article).
+    """
+    if article.story_id is not None:
+        return db.get(models.Story, article.story_id)
+    joined_at = article.created_at or datetime.datetime.utcnow()
+    story = _matching_story(db, article)
+    if story is None:
+        story = models.Story(article_count=0, created_at=joined_at, updated_at=joined_at)
+        db.add(story)
+        db.flush()
+    story.article_count += 1
+    story.updated_at = max(story.updated_at, joined_at)
+    article.story_id = story.id
+    db.add(article)
+    if commit:
+        db.commit()
+    return story
+
+
+def enriched_story_article(db: Session, article: models.Article) -> models.Article | None:
+    """
+    Another article of the article's story whose LLM enrichment is complete
+    (the first one), if any.
+    """
+    if article.story_id is None:
+        return None
+    return (
+        db.query(models.Article)
+        .filter(models.Article.story_id == article.story_id)
+        .filter(models.Article.id != article.id)
+        .filter(models.Article.summary.isnot(None))
+        .filter(models.Article.interest_score.isnot(None))
+        .order_by(models.Article.id)
+        .first()
+    )
+
+
+def assign_existing_articles(db: Session, batch_size: int = 500) -> int:
+    """
+    Assigns a story to the articles that have none, in the order they were
+    stored, e.g. the ones stored before stories existed. Returns the number
+    of articles assigned.
+    """
+    assigned = 0
+    last_id = 0
+    while True:
+        articles = (
+            db.query(models.Article)
+            .filter(models.Article.story_id.is_(None))
+            .filter(models.Article.id > last_id)
+            .order_by(models.Article.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not articles:
+            return assigned
+        for article in articles:
+            assign_story(db, article, commit=False)
+            last_id = article.id
+        db.commit()
+        assigned += len(articles)
+
+
+def summarize_stories(db: Session, story_ids: list[int] | None = None) -> int:
+    """
+    Generates the summary of each story with several articles (among
+    story_ids, if given) that has none yet or got new articles among its
+    first MAX_SUMMARY_ARTICLES since, with one LLM call per story (sent
+    concurrently). Returns the number of stories summarized.
+    """
+    # Only the first MAX_SUMMARY_ARTICLES articles are sent to the LLM, so
+    # later articles don't change the summary
+    summarized_articles = case(
+        (models.Story.article_count > MAX_SUMMARY_ARTICLES, MAX_SUMMARY_ARTICLES),
+        else_=models.Story.article_count,
+    )
+    query = (
+        db.query(models.Story)
+        .filter(models.Story.article_count > 1)
+        .filter(models.Story.summarized_article_count != summarized_articles)
+    )
+    if story_ids is not None:
+        query = query.filter(models.Story.id.in_(story_ids))
+    work = []
+    for story in query.all():
+        articles = (
+            db.query(models.Article.original_content)
+            .filter(models.Article.story_id == story.id)
+            .filter(models.Article.original_content.isnot(None))
+            .order_by(models.Article.id)
+            .limit(MAX_SUMMARY_ARTICLES)
+            .all()
+        )
+        texts = [text[:MAX_SUMMARY_CHARS_PER_ARTICLE] for (text,) in articles if text]
+        work.append((story, min(story.article_count, MAX_SUMMARY_ARTICLES), texts))
+
+    summaries = llm_interface.run_concurrently(
+        lambda item: llm_interface.generate_story_summary(item[2]), work
+    )
+    summarized = 0
+    for (story, summarized_article_count, _), summary in zip(work, summaries):
+        if summary:
+            story.summary = summary
+            story.summarized_article_count = summarized_article_count
+            summarized += 1
+    db.commit()
+    return summarized
+
+
+def summarize_shown_stories(story_ids: list[int]) -> int:
+    """summarize_stories for the stories of a feed page, in its own session (lazy mode)."""
+    db = SessionLocal()
+    try:
+        return summarize_stories(db, story_ids)
+    finally:
+        db.close()
+
+
+def group_by_story(db: Session, articles: list[models.Article]) -> list[dict]:
+    """
+    Groups a page of articles by story, keeping the order of the first
+    article of each story. Articles without a story form their own group.
+    """
+    story_ids = {article.story_id for article in articles if article.story_id is not None}
+    stories = {
+        story.id: story
+        for story in db.scalars(select(models.Story).filter(models.Story.id.in_(story_ids)))
+    }
+    groups = {}
+    for article in articles:
+        key = article.story_id if article.story_id is not None else ("article", article.id)
+        if key not in groups:
+            story = stories.get(article.story_id)
+            groups[key] = {
+                "story_id": article.story_id,
+                "summary": (story.summary if story is not None else None) or article.summary,
+                "article_count": story.article_count if story is not None else 1,
+                "articles": [],
+            }
+        groups[key]["articles"].append(article)
+    return list(groups.values())
@@ -0,0 +1,153 @@
+import itertools
+import queue
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import config, crud, llm_interface, models
+from .database import SessionLocal
+
+# Lazy summarization (config.SUMMARY_MODE = "lazy").
+#
+# Scraping only stores the articles' content and score; an article is
+# summarized when it first appears in a feed page or is opened. The next
+# feed page, and the best articles of each scrape, are summarized ahead of
+# time, so that summaries are usually ready when the user gets to them.
+# The summaries are generated by a pool of worker threads fed by a priority
+# queue: opened articles first, then the articles being shown, then the
+# prefetched ones. An article whose summary failed is left out of the queue
+# for a while (exponential backoff), instead of being retried on every feed
+# page.
+
+OPENED = 0
+SHOWN = 1
+PREFETCH = 2
+
+
+def summarize_article(db: Session, article_id: int) -> bool:
+    """
+    Generates and stores the summary and categories of an article, unless
+    it already has a summary. Returns True if a summary was generated.
+    """
+    article = crud.get_article(db, article_id)
+    if article is None or article.summary is not None or not article.original_content:
+        return False
+    summary, categories = llm_interface.generate_summary_and_categories(
+        article_text=article.original_content
+    )
+    if summary:
+        crud.update_article_summary(db, article_id=article_id, summary=summary)
+    if categories:
+        crud.link_categories_to_article(db, article_id=article_id, categories=categories)
+    return bool(summary)
+
+
+class SummaryQueue:
+    """
+    Articles waiting for their summary, by priority. With workers > 0, as
+    many threads summarize them as they are queued; otherwise they are only
+    summarized by run_pending.
+    """
+
+    def __init__(self, session_factory=SessionLocal, workers: int = 0):
+        self.session_factory = session_factory
+        self.workers = workers
+        self._queue = queue.PriorityQueue()
+        # Best priority of each queued article, to skip duplicates
+        self._queued: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._order = itertools.count()
+        self._threads: list[threading.Thread] = []
+        # Failed articles: (number of failures, time.monotonic() of the next try)
+        self._failures: dict[int, tuple[int, float]] = {}
+
+    def enqueue(self, article_ids, priority: int = PREFETCH):
+        now = time.monotonic()
+        with self._lock:
+            for article_id in article_ids:
+                if self._queued.get(article_id, priority + 1) <= priority:
+                    continue
+                if self._failures.get(article_id, (0, now))[1] > now:
+                    continue
+                self._queued[article_id] = priority
+                self._queue.put((priority, next(self._order), article_id))
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queued)
+
+    def _take(self, block: bool) -> int | None:
+        while True:
+            try:
+                priority, _, article_id = self._queue.get(block=block)
+            except queue.Empty:
+                return None
+            with self._lock:
+                # Entries superseded by a better priority were already taken
+                if self._queued.get(article_id) == priority:
+                    del self._queued[article_id]
+                    return article_id
+
+    def _summarize(self, db: Session, article_id: int):
+        try:
+            summarized = summarize_article(db, article_id)
+        except Exception as e:
+            db.rollback()
+            print(f"Error summarizing article {article_id}: {e}")
+            summarized = False
+        with self._lock:
+            if summarized:
+                self._failures.pop(article_id, None)
+                return
+            failures = self._failures.get(article_id, (0, 0.0))[0] + 1
+            delay = min(config.SUMMARY_RETRY_SECONDS * 2 ** (failures - 1), config.SUMMARY_RETRY_MAX_SECONDS)
+            self._failures[article_id] = (failures, time.monotonic() + delay)
+
+    def _work(self):
+        while True:
+            article_id = self._take(block=True)
+            db = self.session_factory()
+            try:
+                self._summarize(db, article_id)
+            finally:
+                db.close()
+
+    def run_pending(self, db: Session | None = None) -> int:
+        """Summarizes the queued articles in this thread. Returns how many were taken."""
+        own_session = db is None
+        db = db or self.session_factory()
+        taken = 0
+        try:
+            while (article_id := self._take(block=False)) is not None:
+                self._summarize(db, article_id)
+                taken += 1
+        finally:
+            if own_session:
+                db.close()
+        return taken
+
+
+summary_queue = SummaryQueue(workers=config.LLM_MAX_CONCURRENCY)
+
+
+def prefetch_best_articles(db: Session) -> int:
+    """
+    Queues the SUMMARY_PREFETCH_ARTICLES best unread articles without a
+    summary, e.g. after a scrape. Returns the number queued.
+    """
+    article_ids = db.scalars(
+        select(models.Article.id)
+        .filter(models.Article.summary.is_(None))
+        .filter(models.Article.read.is_(False))
+        .filter(models.Article.interest_score.isnot(None))
+        .order_by(models.Article.interest_score.desc())
+        .limit(config.SUMMARY_PREFETCH_ARTICLES)
+    ).all()
+    summary_queue.enqueue(article_ids, PREFETCH)
+    return len(article_ids)
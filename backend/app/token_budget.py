@@ -0,0 +1,178 @@
+import re
+
+from bs4 import BeautifulSoup, Comment, Tag
+
+# Token budgeting of the texts sent to the LLM.
+#
+# Prompts are trimmed to what each task needs instead of embedding the whole
+# page: scoring only gets the lead paragraphs of an article, and selector
+# detection gets a compact skeleton of the page's DOM (tags, ids, classes and
+# links, with repeated siblings collapsed) instead of its first characters.
+
+# Short lines that are nothing but one of these are page furniture, not
+# article text. Whole lines only: "Share prices fell" is a sentence.
+_BOILERPLATE = re.compile(
+    r"^\W*(advertisement|sponsored( content)?|"
+    r"share( this( article| story| page)?| on (facebook|twitter|x|linkedin|whatsapp|e-?mail))?|"
+    r"follow us( on \w+)?|subscribe( now| to our newsletter)?|sign up( for our newsletter)?|newsletter|"
+    r"((accept|reject|manage) (all )?cookies|we use cookies\b.*)|all rights reserved|"
+    r"(copyright|©) ?(©|\(c\))? ?\d{4}\b.*|read more|related (articles|stories)|click here|"
+    r"log ?in|sign in|skip to (main )?content|print( this (article|page))?|"
+    r"e-?mail( this (article|page))?|\d* ?comments?|(image|photo|credit): .*)\W*$",
+    re.IGNORECASE,
+)
+_BOILERPLATE_MAX_CHARS = 120
+
+# DOM skeleton: elements dropped with their content, attributes kept, text
+# kept per element, and same-looking siblings kept before collapsing them
+_SKELETON_DROP = {
+    "script", "style", "noscript", "svg", "iframe", "template", "form", "button",
+    "input", "select", "textarea", "img", "picture", "source", "video", "audio",
+    "link", "meta", "br", "hr", "wbr",
+}
+_SKELETON_ATTRIBUTES = ("id", "class", "href")
+_SKELETON_TEXT_CHARS = 60
+_SKELETON_REPEATS = 3
+_DIGITS = re.compile(r"\d+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    A cheap estimate of the number of tokens of a text: about 4 characters
+    per token for English text, without calling a tokenizer.
+    """
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts a text to max_tokens (estimated), at a line or word boundary if possible."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    return cut[:boundary] if boundary > max_chars // 2 else cut
+
+
+def strip_boilerplate(text: str) -> str:
+    """
+    Removes the empty, repeated and boilerplate lines ("Advertisement",
+    "Share this", cookie notices...) of an extracted article text.
+    """
+    seen = set()
+    lines = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line or line in seen:
+            continue
+        seen.add(line)
+        if len(line) <= _BOILERPLATE_MAX_CHARS and _BOILERPLATE.fullmatch(line):
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def lead_paragraphs(text: str, max_tokens: int) -> str:
+    """
+    The first paragraphs of an article, without boilerplate, within
+    max_tokens: news articles state what they are about up front.
+    """
+    paragraphs = []
+    used = 0
+    for paragraph in strip_boilerplate(text).split("\n"):
+        tokens = estimate_tokens(paragraph) + 1
+        if used + tokens > max_tokens:
+            if not paragraphs:
+                paragraphs.append(truncate_to_tokens(paragraph, max_tokens))
+            break
+        paragraphs.append(paragraph)
+        used += tokens
+    return "\n".join(paragraphs)
+
+
+def _render_line(tag: Tag, depth: int, structure_only: bool) -> str:
+    attributes = ""
+    for name in ("id", "class") if structure_only else _SKELETON_ATTRIBUTES:
+        value = tag.get(name)
+        if value:
+            value = " ".join(value) if isinstance(value, list) else value
+            if structure_only:
+                # Generated ids and classes ("post-1234") vary with the content
+                value = _DIGITS.sub("0", value)
+            attributes += f' {name}="{value}"'
+    text = ""
+    if not structure_only:
+        text = " ".join(
+            string.strip()
+            for string in tag.find_all(string=True, recursive=False)
+            if string.strip() and not isinstance(string, Comment)
+        )
+    return f"{' ' * depth}<{tag.name}{attributes}>{text[:_SKELETON_TEXT_CHARS]}"
+
+
+def _render_children(tag: Tag, depth: int, structure_only: bool) -> list:
+    """
+    The children of a tag to render, in order: (child, depth) pairs and the
+    comment lines that replace the collapsed runs of same-looking siblings.
+    """
+    items = []
+    previous, run = None, 0
+    # The layout does not depend on the number of entries in a list
+    repeats = 1 if structure_only else _SKELETON_REPEATS
+
+    def collapse():
+        if run > repeats:
+            count = "" if structure_only else f"{run - repeats} "
+            items.append(f"{' ' * (depth + 1)}<!-- {count}more <{previous[0]}> -->")
+
+    for child in tag.children:
+        if not isinstance(child, Tag) or child.name in _SKELETON_DROP:
+            continue
+        # Entries of a list often have numbered classes ("post-1234")
+        signature = (child.name, _DIGITS.sub("0", " ".join(child.get("class") or ())))
+        if signature != previous:
+            collapse()
+            previous, run = signature, 0
+        run += 1
+        if run <= repeats:
+            items.append((child, depth + 1))
+    collapse()
+    return items
+
+
+def _render(tag: Tag, lines: list[str], structure_only: bool):
+    # An explicit stack instead of recursion: pages can nest deeper than
+    # Python's recursion limit
+    stack = [(tag, 0)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            lines.append(item)
+            continue
+        element, depth = item
+        lines.append(_render_line(element, depth, structure_only))
+        stack.extend(reversed(_render_children(element, depth, structure_only)))
+
+
+def dom_skeleton(html: str, max_tokens: int | None = None, structure_only: bool = False) -> str:
+    """
+    A compact outline of a page's body for selector detection: one line per
+    element with its id, classes, link and the start of its own text,
+    indented by depth. Navigation and sidebars are dropped, and runs of more
+    than a few same-looking siblings (the entries of an article list) are
+    collapsed, so the article list fits in the budget.
+    With structure_only, links, texts, the digits of ids and classes and all
+    but the first of same-looking siblings are left out: the outline then
+    only changes with the layout.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    root = soup.body or soup
+    for element in root.find_all(["nav", "aside", "footer"]):
+        if element.name != "footer" or element.find_parent("article") is None:
+            element.decompose()
+    lines = []
+    for child in root.children if root is soup else [root]:
+        if isinstance(child, Tag) and child.name not in _SKELETON_DROP:
+            _render(child, lines, structure_only)
+    skeleton = "\n".join(lines)
+    return skeleton if max_tokens is None else truncate_to_tokens(skeleton, max_tokens)
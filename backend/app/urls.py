@@ -0,0 +1,120 @@
+import re
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Query parameters that only carry tracking/session noise and never change
+# which article a URL points to.
+TRACKING_PARAM_PREFIXES = ("utm_", "mc_", "pk_", "hsa_", "oly_")
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "igshid",
+    "_ga",
+    "_gl",
+    "ref",
+    "ref_src",
+    "ref_url",
+    "referrer",
+    "cmpid",
+    "icid",
+    "ncid",
+    "spm",
+    "smid",
+    "taid",
+    "at_medium",
+    "at_campaign",
+    "amp",
+    "outputtype",
+}
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_AMP_SEGMENTS = {"amp", "amphtml"}
+_MULTIPLE_SLASHES = re.compile(r"/{2,}")
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def page_domain(url: str) -> str:
+    """The host of a URL, lowercase and without a leading "www."."""
+    domain = urlsplit(url).netloc.lower()
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes an article URL so that trivially different variants of the
+    same article map to the same string.
+
+    The following noise is removed:
+    - scheme and host case, a leading "www." or "amp." and default ports
+    - the fragment
+    - tracking parameters (utm_*, fbclid, gclid, ...); the remaining
+      parameters are sorted
+    - AMP path variants ("/amp", "/amp/", "/story.amp")
+    - duplicate and trailing slashes
+
+    Returns the input unchanged if it is not an absolute http(s) URL.
+    """
+    if not url:
+        return url
+
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.lower()
+    for prefix in ("www.", "amp."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if parts.port and parts.port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+
+    path = _MULTIPLE_SLASHES.sub("/", parts.path or "/")
+    segments = [s for s in path.split("/") if s]
+    while segments and segments[-1].lower() in _AMP_SEGMENTS:
+        segments.pop()
+    if segments and segments[-1].lower().endswith(".amp"):
+        segments[-1] = segments[-1][: -len(".amp")]
+    if segments and segments[0].lower() in _AMP_SEGMENTS:
+        segments.pop(0)
+    path = "/" + "/".join(segments)
+
+    query_params = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(key)
+    ]
+    query = urlencode(sorted(query_params))
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def find_canonical_url(html_content: str, page_url: str) -> str | None:
+    """
+    Returns the absolute URL declared by the page's <link rel="canonical">,
+    or None if the page does not declare a usable one.
+    """
+    # Only <link> tags are parsed, which is much cheaper than a full parse.
+    soup = BeautifulSoup(html_content, "lxml", parse_only=SoupStrainer("link"))
+    for link in soup.find_all("link", href=True):
+        rel = link.get("rel") or []
+        if isinstance(rel, str):
+            rel = rel.split()
+        if "canonical" not in [r.lower() for r in rel]:
+            continue
+        canonical = urljoin(page_url, link["href"].strip())
+        parts = urlsplit(canonical)
+        # Some sites point every page's canonical link at their homepage,
+        # which would make all their articles look like duplicates.
+        if parts.scheme in DEFAULT_PORTS and parts.path.strip("/"):
+            return canonical
+    return None
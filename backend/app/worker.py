@@ -0,0 +1,53 @@
+"""
+Standalone job worker.
+
+Claims jobs enqueued by the API (see crud.claim_job) and runs them outside of
+the API process. Several workers can run at the same time. Start it from the
+backend directory with:
+
+    JOB_EXECUTION_MODE=worker python -m app.worker
+
+and run the API with the same JOB_EXECUTION_MODE so that it only enqueues jobs.
+"""
+
+import time
+
+from dotenv import load_dotenv
+
+# The settings in .env are read by app.config at import time
+load_dotenv()
+
+from . import config, jobs, metrics, models, search  # noqa: E402
+from .database import engine  # noqa: E402
+
+
+def run_worker(worker_id: str | None = None, once: bool = False):
+    """
+    Runs jobs until interrupted. With once=True, returns as soon as there is
+    no job left to run.
+    """
+    worker_id = worker_id or jobs.default_worker_id()
+    print(f"WORKER {worker_id}: Waiting for jobs.")
+    while True:
+        ran_job = jobs.execute_next_job(worker_id)
+        if ran_job:
+            continue
+        if once:
+            return
+        time.sleep(config.WORKER_POLL_INTERVAL_SECONDS)
+
+
+def main():
+    search.register_search_index()
+    models.Base.metadata.create_all(bind=engine)
+    if config.WORKER_METRICS_PORT:
+        metrics.serve(config.WORKER_METRICS_PORT)
+        print(f"WORKER: Serving metrics on port {config.WORKER_METRICS_PORT}.")
+    try:
+        run_worker()
+    except KeyboardInterrupt:
+        print("WORKER: Stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark for the embedding scoring engine.
+
+Builds a synthetic corpus in a temporary SQLite database and measures how
+long it takes to embed every article, to load the vector index, and to
+rescore all articles (one vectorized pass plus the bulk update of the
+scores), as done by the score recalculation job.
+
+Run from the backend directory:
+
+    python -m benchmarks.embedding_scoring_benchmark [articles]
+"""
+
+import itertools
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import embeddings, models, scoring
+from app.database import Base, configure_sqlite_engine
+
+# Zipf-like vocabulary of pseudo-words: the first ones are common, the
+# last ones rare
+_letters = random.Random(7)
+VOCABULARY = list(
+    dict.fromkeys(
+        "".join(_letters.choices(string.ascii_lowercase, k=_letters.randint(4, 10)))
+        for _ in range(52000)
+    )
+)[:50000]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (i + 1) for i in range(len(VOCABULARY))))
+WORDS_PER_ARTICLE = 300
+BATCH_SIZE = 5000
+
+
+def _timed(label: str, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{label:>32}: {time.perf_counter() - start:8.2f} s")
+    return result
+
+
+def run(size: int):
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'scoring.db')}")
+        configure_sqlite_engine(engine, profile="performance")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        db.add(models.Source(id=1, name="bench", url="http://bench"))
+        db.commit()
+        for offset in range(0, size, BATCH_SIZE):
+            db.execute(
+                insert(models.Article),
+                [
+                    {
+                        "source_id": 1,
+                        "url": f"http://bench/{i}",
+                        "title": " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=8)),
+                        "original_content": " ".join(
+                            rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=WORDS_PER_ARTICLE)
+                        ),
+                        "read": False,
+                    }
+                    for i in range(offset, min(offset + BATCH_SIZE, size))
+                ],
+            )
+            db.commit()
+
+        prompt = (
+            f"I am interested in {' '.join(rng.sample(VOCABULARY[200:5000], 12))}. "
+            f"I am not interested in {' '.join(rng.sample(VOCABULARY[200:5000], 4))}."
+        )
+        print(f"{size} articles")
+        _timed("embed all articles", lambda: embeddings.embed_missing_articles(db, batch_size=5000))
+        embeddings.reset_index()
+        index = _timed("load index (cold)", lambda: embeddings.load_index(db))
+        _timed("load index (cached)", lambda: embeddings.load_index(db))
+        _timed("similarity pass", lambda: scoring._similarity_scores(index, prompt))
+        _timed("rescore all articles", lambda: scoring.rescore_all_articles(db, prompt))
+        print(
+            f"{'index size':>32}: {(index.indices.nbytes + index.values.nbytes) / 2**20:8.1f} MiB"
+        )
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,95 @@
+"""
+Benchmark for the near-duplicate LSH index.
+
+Builds synthetic corpora of increasing size in an in-memory SQLite database
+and compares the average cost of a near-duplicate lookup through the LSH
+index with a brute-force comparison against every stored signature.
+
+Run from the backend directory:
+
+    python -m benchmarks.near_duplicates_benchmark [sizes...]
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, near_duplicates
+from app.database import Base
+
+VOCABULARY = [f"word{i}" for i in range(5000)]
+WORDS_PER_ARTICLE = 200
+LOOKUPS = 200
+
+
+def _random_text(rng: random.Random) -> str:
+    return " ".join(rng.choices(VOCABULARY, k=WORDS_PER_ARTICLE))
+
+
+def _build_corpus(size: int, rng: random.Random):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(models.Source(id=1, name="bench", url="http://bench"))
+    texts = []
+    for i in range(size):
+        text = _random_text(rng)
+        texts.append(text)
+        article = models.Article(
+            source_id=1, url=f"http://bench/{i}", title=str(i), original_content=text
+        )
+        db.add(article)
+        db.flush()
+        near_duplicates.index_article(
+            db, article, near_duplicates.compute_signature(text), commit=False
+        )
+    db.commit()
+    return db, texts
+
+
+def _brute_force_lookup(db, signature):
+    rows = db.query(models.Article.minhash_signature).all()
+    signatures = np.vstack([np.frombuffer(blob, dtype=np.uint32) for (blob,) in rows])
+    similarities = near_duplicates.estimate_similarity(signature, signatures)
+    return similarities.max()
+
+
+def run(sizes: list[int]):
+    rng = random.Random(42)
+    print(f"{'articles':>10} {'lsh ms/lookup':>15} {'brute ms/lookup':>17} {'hit rate':>9}")
+    for size in sizes:
+        db, texts = _build_corpus(size, rng)
+
+        # Half of the queries are edited copies of stored articles, half are new
+        queries = []
+        for i in range(LOOKUPS):
+            if i % 2 == 0:
+                words = rng.choice(texts).split()
+                words[rng.randrange(len(words))] = "edited"
+                queries.append((" ".join(words), True))
+            else:
+                queries.append((_random_text(rng), False))
+        signatures = [(near_duplicates.compute_signature(q), dup) for q, dup in queries]
+
+        start = time.perf_counter()
+        hits = 0
+        for signature, is_duplicate in signatures:
+            match, _ = near_duplicates.find_near_duplicate(db, signature)
+            hits += (match is not None) == is_duplicate
+        lsh_ms = (time.perf_counter() - start) * 1000 / LOOKUPS
+
+        start = time.perf_counter()
+        for signature, _ in signatures[:20]:
+            _brute_force_lookup(db, signature)
+        brute_ms = (time.perf_counter() - start) * 1000 / 20
+
+        print(f"{size:>10} {lsh_ms:>15.3f} {brute_ms:>17.3f} {hits / LOOKUPS:>9.2%}")
+        db.close()
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or [1000, 4000, 16000])
@@ -0,0 +1,112 @@
+"""
+Benchmark for the precomputed related articles.
+
+Builds a synthetic corpus in a temporary SQLite database, indexes it, then
+measures the cost of indexing one more article (the nearest-neighbour
+search done at ingestion) and of reading an article's related articles (all
+the endpoint does).
+
+Run from the backend directory:
+
+    python -m benchmarks.related_articles_benchmark [articles]
+"""
+
+import itertools
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import embeddings, models, related
+from app.database import Base, configure_sqlite_engine
+
+# Zipf-like vocabulary of pseudo-words: the first ones are common, the
+# last ones rare
+_letters = random.Random(7)
+VOCABULARY = list(
+    dict.fromkeys(
+        "".join(_letters.choices(string.ascii_lowercase, k=_letters.randint(4, 10)))
+        for _ in range(52000)
+    )
+)[:50000]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (i + 1) for i in range(len(VOCABULARY))))
+WORDS_PER_ARTICLE = 300
+BATCH_SIZE = 5000
+SAMPLES = 200
+
+
+def _text(rng: random.Random) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=WORDS_PER_ARTICLE))
+
+
+def _percentiles(latencies: list[float]) -> str:
+    latencies.sort()
+    return (
+        f"p50 {statistics.median(latencies):7.2f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95)]:7.2f} ms"
+    )
+
+
+def run(size: int):
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'related.db')}")
+        configure_sqlite_engine(engine, profile="performance")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        db.add(models.Source(id=1, name="bench", url="http://bench"))
+        db.commit()
+        for offset in range(0, size, BATCH_SIZE):
+            db.execute(
+                insert(models.Article),
+                [
+                    {
+                        "source_id": 1,
+                        "url": f"http://bench/{i}",
+                        "title": "",
+                        "original_content": _text(rng),
+                        "read": False,
+                    }
+                    for i in range(offset, min(offset + BATCH_SIZE, size))
+                ],
+            )
+            db.commit()
+        embeddings.embed_missing_articles(db, batch_size=BATCH_SIZE)
+
+        start = time.perf_counter()
+        related.index_existing_articles(db, batch_size=BATCH_SIZE)
+        print(f"Indexed {size} articles in {time.perf_counter() - start:.1f} s")
+
+        ingest = []
+        for i in range(SAMPLES):
+            article = models.Article(
+                source_id=1, url=f"http://bench/new/{i}", title="", original_content=_text(rng)
+            )
+            db.add(article)
+            db.commit()
+            embeddings.embed_article(article)
+            db.commit()
+            start = time.perf_counter()
+            related.index_article(db, article)
+            ingest.append((time.perf_counter() - start) * 1000)
+        print(f"{'index one article':>20}: {_percentiles(ingest)}")
+
+        reads = []
+        for _ in range(SAMPLES):
+            article_id = rng.randint(1, size)
+            start = time.perf_counter()
+            related.get_related_articles(db, article_id)
+            reads.append((time.perf_counter() - start) * 1000)
+        print(f"{'read related':>20}: {_percentiles(reads)}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
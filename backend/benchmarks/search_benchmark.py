@@ -0,0 +1,109 @@
+"""
+Benchmark for the full-text article search.
+
+Builds a synthetic corpus in a temporary SQLite database (indexed through the
+same triggers as in production) and measures the latency of searches for
+rare, medium and common words, with the page of 20 results, snippets
+included.
+
+Run from the backend directory:
+
+    python -m benchmarks.search_benchmark [articles]
+"""
+
+import itertools
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import models, search
+from app.database import Base, configure_sqlite_engine
+
+# Zipf-like vocabulary of pseudo-words: the first ones are common, the
+# last ones rare
+_letters = random.Random(7)
+VOCABULARY = list(
+    dict.fromkeys(
+        "".join(_letters.choices(string.ascii_lowercase, k=_letters.randint(3, 10)))
+        for _ in range(52000)
+    )
+)[:50000]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (i + 1) for i in range(len(VOCABULARY))))
+WORDS_PER_ARTICLE = 150
+BATCH_SIZE = 5000
+QUERIES = 50
+
+
+def _build_corpus(path: str, size: int, rng: random.Random):
+    engine = create_engine(f"sqlite:///{path}")
+    configure_sqlite_engine(engine, profile="performance")
+    search.register_search_index()
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(models.Source(id=1, name="bench", url="http://bench"))
+    db.commit()
+
+    start = time.perf_counter()
+    for offset in range(0, size, BATCH_SIZE):
+        db.execute(
+            insert(models.Article),
+            [
+                {
+                    "source_id": 1,
+                    "url": f"http://bench/{i}",
+                    "title": " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=8)),
+                    "original_content": " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=WORDS_PER_ARTICLE)),
+                    "read": False,
+                }
+                for i in range(offset, min(offset + BATCH_SIZE, size))
+            ],
+        )
+        db.commit()
+    print(f"Indexed {size} articles in {time.perf_counter() - start:.1f} s")
+    return engine, db
+
+
+def run(size: int):
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as directory:
+        engine, db = _build_corpus(os.path.join(directory, "search.db"), size, rng)
+        print(f"{'query':>22} {'matches':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for label, words in [
+            ("rare word", VOCABULARY[20000:50000]),
+            ("medium word", VOCABULARY[500:2000]),
+            ("common word", VOCABULARY[5:50]),
+            ("two medium words", None),
+            ("prefix (typing)", None),
+        ]:
+            latencies = []
+            matches = []
+            for _ in range(QUERIES):
+                if label == "two medium words":
+                    query = " ".join(rng.sample(VOCABULARY[500:2000], 2))
+                elif label == "prefix (typing)":
+                    query = rng.choice(VOCABULARY[1000:50000])[:-1]
+                else:
+                    query = rng.choice(words)
+                start = time.perf_counter()
+                results = search.search_articles(db, query)
+                latencies.append((time.perf_counter() - start) * 1000)
+                matches.append(len(results))
+            latencies.sort()
+            print(
+                f"{label:>22} {statistics.mean(matches):>8.1f} "
+                f"{statistics.median(latencies):>8.2f} "
+                f"{latencies[int(len(latencies) * 0.95)]:>8.2f}"
+            )
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,126 @@
+"""
+Benchmark for the SQLite connection profiles under mixed read/write load.
+
+A writer thread stores articles one commit at a time, like the scraper does,
+while reader threads keep loading the article feed. The same workload runs
+against a fresh database file with each profile, and the read latency and
+write throughput are compared.
+
+Run from the backend directory:
+
+    python -m benchmarks.sqlite_profile_benchmark [seconds] [readers]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import Base, configure_sqlite_engine
+
+PROFILES = ["default", "performance"]
+INITIAL_ARTICLES = 2000
+CONTENT = "Lorem ipsum dolor sit amet. " * 200
+
+
+def _setup(path: str, profile: str):
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    configure_sqlite_engine(engine, profile=profile)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add(models.Source(id=1, name="bench", url="http://bench"))
+    db.add_all(
+        models.Article(
+            source_id=1, url=f"http://bench/seed/{i}", title=str(i),
+            original_content=CONTENT, interest_score=i % 100,
+        )
+        for i in range(INITIAL_ARTICLES)
+    )
+    db.commit()
+    db.close()
+    return engine, Session
+
+
+def _writer(Session, stop: threading.Event, stats: dict):
+    db = Session()
+    i = 0
+    while not stop.is_set():
+        try:
+            db.add(
+                models.Article(
+                    source_id=1, url=f"http://bench/new/{i}", title=str(i),
+                    original_content=CONTENT,
+                )
+            )
+            db.commit()
+            stats["writes"] += 1
+        except OperationalError:
+            db.rollback()
+            stats["write_errors"] += 1
+        i += 1
+    db.close()
+
+
+def _reader(Session, stop: threading.Event, latencies: list, stats: dict):
+    db = Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            crud.get_articles(db, limit=100, min_score=50)
+            latencies.append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            stats["read_errors"] += 1
+        db.rollback()
+    db.close()
+
+
+def run(seconds: float, readers: int):
+    print(
+        f"{'profile':>12} {'writes/s':>9} {'reads/s':>8} {'read p50 ms':>12} "
+        f"{'read p99 ms':>12} {'read max ms':>12} {'errors':>7}"
+    )
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            engine, Session = _setup(os.path.join(directory, "bench.db"), profile)
+            stop = threading.Event()
+            stats = {"writes": 0, "write_errors": 0, "read_errors": 0}
+            latencies: list[float] = []
+            threads = [threading.Thread(target=_writer, args=(Session, stop, stats))]
+            threads += [
+                threading.Thread(target=_reader, args=(Session, stop, latencies, stats))
+                for _ in range(readers)
+            ]
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            engine.dispose()
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+        print(
+            f"{profile:>12} {stats['writes'] / seconds:>9.0f} "
+            f"{len(latencies) / seconds:>8.0f} "
+            f"{statistics.median(latencies) if latencies else 0.0:>12.2f} "
+            f"{p99:>12.2f} {max(latencies, default=0.0):>12.2f} "
+            f"{stats['write_errors'] + stats['read_errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    run(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 10.0,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+    )
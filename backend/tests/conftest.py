@@ -3,7 +3,10 @@ import os
 import pytest
 import pytest_asyncio
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app import embeddings, search
 from app.models import Base
 from httpx import AsyncClient, ASGITransport
 
@@ -14,11 +17,20 @@ sys.path.insert(0, backend_dir)
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
+search.register_search_index()
+
 test_engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
+# Async access to the same test database. No pooling, since each test runs
+# in its own event loop.
+test_async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    test_async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 @pytest.fixture(scope="function")
 def db():
@@ -26,6 +38,8 @@ def db():
     Create a new database session for a test.
     """
     Base.metadata.create_all(bind=test_engine)
+    # The cached vector index belongs to the previous test's database
+    embeddings.reset_index()
     db = TestingSessionLocal()
     try:
         yield db
@@ -39,7 +53,7 @@ async def client(db):
     """
     Create a new FastAPI test client for each test.
     """
-    from app.main import app, get_db
+    from app.main import app, get_db, get_async_db
 
     def override_get_db():
         try:
@@ -47,7 +61,12 @@ async def client(db):
         finally:
             db.close()
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as c:
         yield c
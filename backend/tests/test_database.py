@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import config, crud, schemas
+from app.database import (
+    async_database_url,
+    configure_sqlite_engine,
+    engine_options,
+    sqlite_pragmas,
+)
+
+
+def test_performance_profile_is_applied_on_connect(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SQLITE_BUSY_TIMEOUT_MS", 1234)
+    engine = configure_sqlite_engine(
+        create_engine(f"sqlite:///{tmp_path / 'perf.db'}"), profile="performance"
+    )
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        # synchronous=NORMAL
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+        assert connection.execute(text("PRAGMA cache_size")).scalar() == -config.SQLITE_CACHE_SIZE_KB
+    engine.dispose()
+
+
+def test_default_profile_keeps_sqlite_defaults(tmp_path):
+    engine = configure_sqlite_engine(
+        create_engine(f"sqlite:///{tmp_path / 'default.db'}"), profile="default"
+    )
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+    engine.dispose()
+
+    with pytest.raises(ValueError):
+        sqlite_pragmas("fastest")
+
+
+@pytest.mark.asyncio
+async def test_profile_applies_to_async_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+    configure_sqlite_engine(engine.sync_engine, profile="performance")
+    async with engine.connect() as connection:
+        result = await connection.execute(text("PRAGMA journal_mode"))
+        assert result.scalar() == "wal"
+    await engine.dispose()
+
+
+def test_engine_options_per_database(monkeypatch):
+    monkeypatch.setattr(config, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(config, "DB_STATEMENT_TIMEOUT_MS", 1500)
+
+    assert engine_options("sqlite:///./app.db") == {"connect_args": {"check_same_thread": False}}
+
+    options = engine_options("postgresql://user:secret@db/news")
+    assert options["pool_size"] == 7
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=1500"}
+
+    async_url = async_database_url("postgresql://user:secret@db/news")
+    assert async_url.drivername == "postgresql+asyncpg"
+    assert async_url.password == "secret"
+    options = engine_options(async_url, is_async=True)
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "1500"}}
+
+    assert async_database_url("sqlite:///./app.db").drivername == "sqlite+aiosqlite"
+
+
+def test_link_categories_ignores_existing_rows(db):
+    source = crud.create_source(db, schemas.SourceCreate(name="Test Source", url="http://test.com"))
+    article = crud.create_article(
+        db,
+        schemas.ArticleCreate(
+            url="http://test.com/a", title="A", original_content="Content", source_id=source.id
+        ),
+    )
+
+    crud.link_categories_to_article(db, article_id=article.id, categories=["Tech"])
+    db_article = crud.link_categories_to_article(
+        db, article_id=article.id, categories=["Tech", "Science", "Tech"]
+    )
+
+    assert sorted(c.name for c in db_article.categories) == ["Science", "Tech"]
+    assert [c.name for c in crud.get_categories(db)] == ["Science", "Tech"]
@@ -0,0 +1,101 @@
+from sqlalchemy.orm import Session
+
+from app import config, crud, embeddings, jobs, schemas, scoring
+from app.models import Article
+
+TEXTS = {
+    "ai": "Researchers released a new machine learning model that improves neural network training for language tasks.",
+    "chips": "The chip maker presented faster processors for machine learning and neural network workloads in data centers.",
+    "football": "The football team won the championship final after the striker scored twice in the second half.",
+    "gossip": "The celebrity couple announced their divorce, and gossip magazines reported on the celebrity wedding rumors.",
+}
+PROMPT = (
+    "I am interested in machine learning, neural networks and processors. "
+    "I am not interested in celebrity gossip or football."
+)
+
+
+def _create_articles(db: Session) -> dict[str, Article]:
+    source = crud.create_source(db=db, source=schemas.SourceCreate(name="Source", url="http://source.com"))
+    return {
+        key: crud.create_article(
+            db=db,
+            article=schemas.ArticleCreate(
+                url=f"http://source.com/{key}", title=key, original_content=text, source_id=source.id
+            ),
+        )
+        for key, text in TEXTS.items()
+    }
+
+
+def test_embedding_round_trip():
+    indices, values = embeddings.embed_text("Neural networks, neural networks and processors")
+    assert list(indices) == sorted(indices)
+    decoded_indices, decoded_values = embeddings.decode(embeddings.encode(indices, values))
+    assert list(decoded_indices) == list(indices)
+    assert list(decoded_values) == list(values)
+    assert len(embeddings.embed_text("the and of 2024")[0]) == 0
+
+
+def test_relevant_articles_score_higher(db: Session, monkeypatch):
+    """
+    Tests that the embedding engine scores articles matching the interest
+    prompt above others, and those the prompt rejects at 0.
+    """
+    monkeypatch.setattr(config, "SCORING_ENGINE", "embedding")
+    articles = _create_articles(db)
+
+    scores = {key: scoring.score_article(db, article, PROMPT) for key, article in articles.items()}
+
+    assert scores["ai"] > 0 and scores["chips"] > 0
+    assert scores["gossip"] == 0
+    assert scores["football"] == 0
+    assert scoring.split_interest_prompt(PROMPT)[1] == "I am not interested in celebrity gossip or football"
+
+
+def test_index_is_extended_incrementally(db: Session):
+    articles = _create_articles(db)
+    embeddings.embed_missing_articles(db)
+    index = embeddings.load_index(db)
+    assert len(index) == len(articles)
+
+    article = crud.create_article(
+        db=db,
+        article=schemas.ArticleCreate(
+            url="http://source.com/new", title="new", original_content=TEXTS["ai"], source_id=1
+        ),
+    )
+    embeddings.embed_article(article)
+    db.commit()
+
+    extended = embeddings.load_index(db)
+    assert list(extended.ids) == list(index.ids) + [article.id]
+    assert list(extended.offsets[: len(index.offsets)]) == list(index.offsets)
+    # The appended rows give the same similarities as a full rebuild
+    embeddings.reset_index()
+    rebuilt = embeddings.load_index(db)
+    query = rebuilt.query_vector("machine learning")
+    assert list(extended.cosine_similarities([query])[0]) == list(rebuilt.cosine_similarities([query])[0])
+
+
+def test_scoring_job_with_embedding_engine(db: Session, monkeypatch, mocker):
+    """
+    Tests that recalculating all scores with the embedding engine embeds the
+    articles and scores them without any LLM call.
+    """
+    monkeypatch.setattr(config, "SCORING_ENGINE", "embedding")
+    mock_score = mocker.patch("app.llm_interface.generate_interest_score")
+    article_ids = {key: article.id for key, article in _create_articles(db).items()}
+    crud.set_setting(db, "interest_prompt", PROMPT)
+
+    job_id = crud.create_job(db, "score").id
+    jobs.run_article_scoring_job(job_id, db=db)
+
+    status = crud.get_job(db, job_id)
+    assert status.status == "completed"
+    assert status.processed_articles == len(article_ids)
+    mock_score.assert_not_called()
+    articles = {key: db.get(Article, article_id) for key, article_id in article_ids.items()}
+    assert all(article.embedding for article in articles.values())
+    scores = {key: article.interest_score for key, article in articles.items()}
+    assert min(scores["ai"], scores["chips"]) > max(scores["football"], scores["gossip"])
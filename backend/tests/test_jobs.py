@@ -0,0 +1,336 @@
+import datetime
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app import config, crud, job_events, jobs, models, schemas, scraping
+
+
+def test_claim_job_is_exclusive(db: Session):
+    """
+    Tests that a job can only be claimed by one worker while its lease is valid,
+    and that it can be reclaimed once the lease expired.
+    """
+    job = crud.create_job(db, "scrape", {"source_id": 1})
+
+    claimed = crud.claim_job(db, "worker-1")
+    assert claimed.id == job.id
+    assert claimed.worker_id == "worker-1"
+    assert claimed.attempts == 1
+
+    assert crud.claim_job(db, "worker-2") is None
+    assert crud.claim_job(db, "worker-2", job_id=job.id) is None
+
+    # Simulate a dead worker whose lease ran out
+    claimed.lease_expires_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+    db.commit()
+
+    reclaimed = crud.claim_job(db, "worker-2")
+    assert reclaimed.id == job.id
+    assert reclaimed.worker_id == "worker-2"
+    assert reclaimed.attempts == 2
+
+
+def test_finished_jobs_are_not_claimed(db: Session):
+    """
+    Tests that completed jobs are never handed out again.
+    """
+    job = crud.create_job(db, "score")
+    crud.update_job(db, job.id, status="completed")
+
+    assert crud.claim_job(db, "worker-1") is None
+
+
+def test_update_job_renews_lease(db: Session):
+    """
+    Tests that progress updates from the owning worker extend its lease.
+    """
+    job = crud.create_job(db, "score")
+    claimed = crud.claim_job(db, "worker-1")
+    claimed.lease_expires_at = datetime.datetime.utcnow()
+    db.commit()
+
+    crud.update_job(db, job.id, progress=50)
+
+    assert crud.get_job(db, job.id).lease_expires_at > datetime.datetime.utcnow() + datetime.timedelta(
+        seconds=config.JOB_LEASE_SECONDS - 5
+    )
+
+
+def test_worker_stops_when_its_lease_was_taken_over(db: Session):
+    """
+    Tests that a worker whose lease expired and was claimed by another
+    worker can no longer update the job, and that its run stops.
+    """
+    job_id = crud.create_job(db, "score").id
+    crud.claim_job(db, "worker-1")
+    crud.update_job(db, job_id, progress=10)
+
+    # The lease runs out while worker-1 is busy, and worker-2 takes the job
+    other_db = Session(bind=db.get_bind())
+    try:
+        db.query(models.Job).update({models.Job.lease_expires_at: datetime.datetime.utcnow()})
+        db.commit()
+        assert crud.claim_job(other_db, "worker-2", job_id=job_id) is not None
+        with pytest.raises(crud.JobLeaseLost):
+            crud.update_job(db, job_id, progress=20, status="completed")
+        crud.update_job(other_db, job_id, progress=30)
+        assert (crud.get_job(other_db, job_id).progress, crud.get_job(other_db, job_id).status) == (30, "pending")
+    finally:
+        other_db.close()
+
+    # A handler stops at its next update
+    def handler(job_id, db):
+        crud.update_job(db, job_id, progress=40)
+        raise AssertionError("the run should have stopped")
+
+    db.expire_all()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setitem(jobs.JOB_HANDLERS, "score", handler)
+        jobs.run_job(db, crud.get_job(db, job_id))
+    assert crud.get_job(db, job_id).progress == 30
+
+
+def test_deleting_a_source_deletes_its_job_items(db: Session):
+    """
+    Tests that deleting a source, or an article, deletes the job items that
+    refer to it when foreign keys are enforced (as on PostgreSQL).
+    """
+    connection = db.get_bind().connect()
+    connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+    connection.commit()
+    db = Session(bind=connection)
+    try:
+        source_id = crud.create_source(db, schemas.SourceCreate(name="Source", url="http://source.com")).id
+        other_id = crud.create_source(db, schemas.SourceCreate(name="Other", url="http://other.com")).id
+        article_id = crud.create_article(
+            db, schemas.ArticleCreate(url="http://other.com/1", title="1", source_id=other_id)
+        ).id
+        job_id = crud.create_job(db, "scrape").id
+        crud.create_job_items(db, job_id, [(source_id, "http://source.com/1"), (other_id, "http://other.com/1")])
+        db.query(models.JobItem).filter(models.JobItem.source_id == other_id).update(
+            {models.JobItem.article_id: article_id}
+        )
+        db.commit()
+
+        crud.delete_source(db, source_id)
+        assert [item.source_id for item in crud.get_job_items(db, job_id)] == [other_id]
+        db.delete(crud.get_article(db, article_id))
+        db.commit()
+        assert crud.get_job_items(db, job_id) == []
+    finally:
+        db.close()
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        connection.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_mode_only_enqueues(client, db, monkeypatch, mocker):
+    """
+    Tests that in "worker" execution mode the API only enqueues the job, and
+    that the job is run when a worker picks it up.
+    """
+    monkeypatch.setattr(config, "JOB_EXECUTION_MODE", "worker")
+    mocker.patch.dict(jobs.JOB_HANDLERS, {"scrape": mocker.Mock()})
+
+    response = await client.post("/sources/scrape")
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    response = await client.get(f"/sources/scrape/status/{job_id}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    jobs.JOB_HANDLERS["scrape"].assert_not_called()
+
+    assert jobs.execute_job(job_id, db, worker_id="worker-1") is True
+    jobs.JOB_HANDLERS["scrape"].assert_called_once_with(job_id, db)
+
+
+@pytest.mark.asyncio
+async def test_cancel_job_endpoint(client, db):
+    """
+    Tests that only pending or running jobs can be canceled.
+    """
+    job_id = crud.create_job(db, "scrape").id
+
+    response = await client.post(f"/sources/scrape/cancel/{job_id}")
+    assert response.status_code == 200
+    assert crud.is_job_cancel_requested(db, job_id)
+
+    crud.update_job(db, job_id, status="canceled")
+    response = await client.post(f"/sources/scrape/cancel/{job_id}")
+    assert response.status_code == 404
+
+    response = await client.post("/sources/scrape/cancel/unknown-job")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_job_events_are_coalesced(db: Session, monkeypatch):
+    """
+    Tests that the progress stream sends the full status first, then only
+    changed fields, skips intermediate updates and ends with the job.
+    """
+    monkeypatch.setattr(config, "JOB_EVENTS_COALESCE_SECONDS", 0.01)
+    job = crud.create_job(db, "scrape")
+    job_id = job.id
+    crud.update_job(db, job_id, status="in_progress", progress=10)
+
+    async def load_status():
+        return crud.get_job_status(db, job_id)
+
+    async def is_disconnected():
+        return False
+
+    events = []
+    async for event in job_events.stream_job_status(job_id, load_status, is_disconnected):
+        events.append(event)
+        if len(events) == 1:
+            # Several updates between two ticks produce a single event
+            for progress in (20, 30, 40):
+                crud.update_job(db, job_id, progress=progress, message=f"{progress}%")
+        elif len(events) == 2:
+            crud.update_job(db, job_id, status="completed", progress=100, message="Done")
+
+    assert len(events) == 4
+    assert events[0].startswith("event: progress\n")
+    assert '"status": "in_progress"' in events[0]
+    assert '"total_articles": 0' in events[0]
+    assert events[1] == 'event: progress\ndata: {"progress": 40, "message": "40%"}\n\n'
+    assert events[2] == 'event: progress\ndata: {"status": "completed", "progress": 100, "message": "Done"}\n\n'
+    assert events[3] == 'event: end\ndata: {"status": "completed"}\n\n'
+
+
+@pytest.mark.asyncio
+async def test_job_events_endpoint(client, db):
+    job_id = crud.create_job(db, "scrape").id
+    crud.update_job(db, job_id, status="completed", progress=100, message="Done")
+
+    response = await client.get(f"/sources/scrape/events/{job_id}")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert '"message": "Done"' in response.text
+    assert response.text.endswith('event: end\ndata: {"status": "completed"}\n\n')
+
+    response = await client.get("/sources/scrape/events/unknown")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_repair_job_only_runs_missing_steps(client, db, mocker):
+    """
+    Tests that the repair job fills in missing summaries and scores without
+    redoing the steps that already succeeded.
+    """
+    mock_summary = mocker.patch(
+        "app.llm_interface.generate_summary_and_categories",
+        return_value=("Repaired summary", ["Repaired"]),
+    )
+    mock_score = mocker.patch("app.llm_interface.generate_interest_score", return_value=77)
+
+    source = crud.create_source(db, schemas.SourceCreate(name="Test Source", url="http://test.com"))
+    complete, no_summary, no_score, no_content = [
+        crud.create_article(
+            db,
+            schemas.ArticleCreate(
+                url=f"http://test.com/{name}",
+                title=name,
+                original_content=None if name == "no-content" else f"Content of {name}",
+                source_id=source.id,
+            ),
+        ).id
+        for name in ["complete", "no-summary", "no-score", "no-content"]
+    ]
+    crud.update_article_summary(db, article_id=complete, summary="Existing")
+    crud.update_article_interest_score(db, article_id=complete, interest_score=10)
+    crud.update_article_interest_score(db, article_id=no_summary, interest_score=20)
+    crud.update_article_summary(db, article_id=no_score, summary="Existing")
+
+    response = await client.post("/articles/repair")
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    mock_summary.assert_called_once_with(article_text="Content of no-summary")
+    mock_score.assert_called_once()
+    assert mock_score.call_args.kwargs["article_text"] == "Content of no-score"
+
+    status = crud.get_job_status(db, job_id)
+    assert status.status == "completed"
+    assert status.total_articles == 2
+    assert status.processed_articles == 2
+
+    assert crud.get_article(db, no_summary).summary == "Repaired summary"
+    assert crud.get_article(db, no_summary).interest_score == 20
+    assert crud.get_article(db, no_score).summary == "Existing"
+    assert crud.get_article(db, no_score).interest_score == 77
+    assert crud.get_article(db, complete).summary == "Existing"
+
+
+@pytest.mark.parametrize("summary_mode, summary_min_score", [("lazy", 0), ("eager", 50)])
+def test_repair_job_skips_articles_needing_no_step(db, mocker, monkeypatch, summary_mode, summary_min_score):
+    """
+    Tests that articles left without a summary on purpose (lazy summaries,
+    or a score below SUMMARY_MIN_SCORE) are neither repaired nor counted.
+    """
+    monkeypatch.setattr(config, "SUMMARY_MODE", summary_mode)
+    monkeypatch.setattr(config, "SUMMARY_MIN_SCORE", summary_min_score)
+    mock_summary = mocker.patch("app.llm_interface.generate_summary_and_categories")
+    mocker.patch("app.llm_interface.generate_interest_score", return_value=30)
+
+    source = crud.create_source(db, schemas.SourceCreate(name="Test Source", url="http://test.com"))
+    scored, unscored = [
+        crud.create_article(
+            db,
+            schemas.ArticleCreate(
+                url=f"http://test.com/{name}", title=name, original_content=f"Content of {name}", source_id=source.id
+            ),
+        ).id
+        for name in ["scored", "unscored"]
+    ]
+    crud.update_article_interest_score(db, article_id=scored, interest_score=10)
+
+    for job_id in ("first-repair", "second-repair"):
+        jobs.run_enrichment_repair_job(job_id, db)
+
+    mock_summary.assert_not_called()
+    first, second = crud.get_job_status(db, "first-repair"), crud.get_job_status(db, "second-repair")
+    assert (first.total_articles, first.processed_articles) == (1, 1)
+    assert (second.total_articles, second.processed_articles) == (0, 0)
+    assert crud.get_article(db, unscored).interest_score == 30
+
+
+def test_repair_job_retries_failed_scoring(db, mocker, monkeypatch, requests_mock):
+    """
+    Tests that when scoring fails during a scrape with SUMMARY_MIN_SCORE, the
+    article keeps no score (it is not "below the threshold") and the repair
+    job later scores and summarizes it.
+    """
+    monkeypatch.setattr(config, "SUMMARY_MIN_SCORE", 50)
+    article_url = "http://test.com/article1"
+    requests_mock.get("http://test.com", text=f'<html><body><a class="link" href="{article_url}">A</a></body></html>')
+    requests_mock.get(article_url, text="<html><head><title>Article 1</title></head><body><p>Content.</p></body></html>")
+    mock_summary = mocker.patch(
+        "app.llm_interface.generate_summary_and_categories", return_value=("Repaired summary", ["Repaired"])
+    )
+    mock_score = mocker.patch("app.llm_interface.generate_interest_score", return_value=None)
+
+    source = crud.create_source(
+        db,
+        schemas.SourceCreate(
+            name="Test Source", url="http://test.com", scraper_type="HTML", config={"article_link_selector": ".link"}
+        ),
+    )
+    scraping.scrape_source(db, source)
+
+    article = crud.get_article_by_url(db, url=article_url)
+    article_id = article.id
+    assert (article.interest_score, article.summary) == (None, None)
+    mock_summary.assert_not_called()
+
+    mock_score.return_value = 80
+    jobs.run_enrichment_repair_job("repair", db)
+
+    status = crud.get_job_status(db, "repair")
+    assert (status.total_articles, status.processed_articles, status.failed_articles) == (1, 1, 0)
+    article = crud.get_article(db, article_id)
+    assert (article.interest_score, article.summary) == (80, "Repaired summary")
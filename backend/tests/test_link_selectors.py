@@ -0,0 +1,134 @@
+from unittest.mock import patch
+
+import requests_mock
+from sqlalchemy.orm import Session
+
+from app import crud, link_selectors, models
+from app.jobs import run_scraping_job, run_selector_detection_job
+from app.models import Job, Source
+
+
+def _front_page(headlines: list[str], item_class: str = "teaser") -> str:
+    items = "".join(
+        f'<div class="{item_class} {item_class}-{i}"><h2><a class="headline" '
+        f'href="/news/2026/{i}/{headline.lower().replace(" ", "-")}">{headline}</a></h2>'
+        f'<a class="section" href="/topics/world">World</a></div>'
+        for i, headline in enumerate(headlines)
+    )
+    popular = "".join(
+        f'<li class="popular"><a href="/news/{i}">{i}</a></li>' for i in range(5)
+    )
+    return f"""
+        <html><body>
+        <nav><a href="/">Home</a><a href="/world">World</a><a href="/sports">Sports</a></nav>
+        <div class="header"><a href="/login">Log in</a><a href="/subscribe">Subscribe now</a></div>
+        <main class="river">{items}</main>
+        <ol class="most-read">{popular}</ol>
+        <footer><a href="/about">About us</a><a href="/privacy">Privacy</a></footer>
+        </body></html>
+    """
+
+
+HEADLINES = ["Storm hits the coast overnight", "Markets rally after rate cut", "New bridge opens to traffic", "Local team wins the cup"]
+
+
+def test_infer_selector_finds_the_article_list():
+    """
+    Tests that the heuristic ranks the repeated headline links above the
+    navigation, section and "most read" links, without the LLM.
+    """
+    with patch("app.llm_interface.find_article_link_selector") as mock_llm, \
+         patch("app.llm_interface.choose_article_link_selector") as mock_choice:
+        assert link_selectors.infer_selector(_front_page(HEADLINES), "https://example.com/") == "a.headline"
+    mock_llm.assert_not_called()
+    mock_choice.assert_not_called()
+
+
+def test_infer_selector_uses_the_llm_for_ties_only():
+    """
+    Tests that the LLM chooses between candidates with similar scores, and
+    finds the selector when no candidate qualifies.
+    """
+    page = """<html><body>
+        <ul class="news">
+            <li><a href="/news/tax-reform-passes">Tax reform passes the senate</a></li>
+            <li><a href="/news/flooding-in-the-north">Flooding in the north of the country</a></li>
+            <li><a href="/news/new-museum-opens">New museum opens its doors</a></li>
+        </ul>
+        <ul class="opinion">
+            <li><a href="/opinion/why-taxes-matter">Why taxes matter more than ever</a></li>
+            <li><a href="/opinion/in-defence-of-museums">In defence of museums and libraries</a></li>
+            <li><a href="/opinion/the-river-and-us">The river and us, a reflection</a></li>
+        </ul>
+    </body></html>"""
+    with patch("app.llm_interface.choose_article_link_selector", return_value=".news a") as mock_choice:
+        assert link_selectors.infer_selector(page, "https://example.com/") == ".news a"
+    assert sorted(selector for selector, _ in mock_choice.call_args.args[0]) == [".news a", ".opinion a"]
+
+    with patch("app.llm_interface.find_article_link_selector", return_value="a.story") as mock_llm:
+        assert link_selectors.infer_selector("<html><body><a href='/a'>A</a></body></html>", "https://example.com/") == "a.story"
+    mock_llm.assert_called_once()
+
+
+def test_detected_selectors_are_cached_per_layout(db: Session):
+    """
+    Tests that a selector detected for a page is reused for pages with the
+    same layout but different content, and that other layouts are inferred.
+    """
+    page = _front_page(HEADLINES)
+    assert link_selectors.detect_selector(db, "https://www.example.com/", page) == ("a.headline", False)
+
+    page = _front_page(["Minister resigns after vote", "Heatwave ahead for the weekend", "Rail strike ends today"])
+    assert link_selectors.detect_selector(db, "https://example.com/world", page) == ("a.headline", True)
+
+    page = _front_page(HEADLINES, "card").replace("headline", "title")
+    assert link_selectors.detect_selector(db, "https://example.com/", page) == ("a.title", False)
+
+
+def test_domain_selectors_need_enough_links(db: Session):
+    """
+    Tests that the selectors of the domain's other sources are found among
+    any number of sources, and only reused if they match MIN_LINKS links.
+    """
+    page = _front_page(HEADLINES)
+    for i in range(100):
+        db.add(Source(name=f"Other {i}", url=f"https://other-{i}.com", config={"article_link_selector": "a"}))
+    db.add(Source(name="Lead", url="https://www.example.com/", config={"article_link_selector": ".teaser-0 a.headline"}))
+    db.commit()
+    assert link_selectors.detect_selector(db, "https://example.com/", page) == ("a.headline", False)
+
+    db.query(models.DetectedSelector).delete()
+    db.add(Source(name="World", url="https://example.com/world", config={"article_link_selector": "main a.headline"}))
+    db.commit()
+    assert link_selectors.detect_selector(db, "https://example.com/", page) == ("main a.headline", True)
+
+
+def test_selector_drift_triggers_redetection(db: Session, requests_mock: requests_mock.Mocker):
+    """
+    Tests that a selector matching no links anymore enqueues one
+    re-detection job, which stores a working selector in the source.
+    """
+    source = Source(
+        name="Redesigned Source",
+        url="http://redesigned.com",
+        scraper_type="HTML",
+        config={"article_link_selector": ".old-link"},
+    )
+    db.add(source)
+    db.commit()
+    source_id = source.id
+    requests_mock.get("http://redesigned.com", text=_front_page(HEADLINES))
+
+    with patch("app.config.JOB_EXECUTION_MODE", "worker"):
+        run_scraping_job("drift-job-1", db)
+        run_scraping_job("drift-job-2", db)
+
+    jobs = db.query(Job).filter(Job.type == "detect_selector").all()
+    assert [job.payload for job in jobs] == [{"source_id": source_id}]
+
+    run_selector_detection_job(jobs[0].id, db, source_id=source_id)
+
+    assert crud.get_job(db, jobs[0].id).status == "completed"
+    source_config = crud.get_source(db, source_id).config
+    assert source_config["article_link_selector"] == "a.headline"
+    assert source_config["previous_article_link_selector"] == ".old-link"
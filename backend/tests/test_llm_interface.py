@@ -1,4 +1,6 @@
 import os
+import threading
+import time
 import pytest
 from unittest.mock import patch
 from backend.app import llm_interface
@@ -116,3 +118,145 @@ def test_generate_summary_and_categories_with_none_in_stream(mock_get_llm_client
     # Assert the results
     assert summary == "This is a test summary."
     assert categories == ["Tech", "AI", "Testing"]
+
+
+def test_split_into_chunks():
+    """
+    Tests that long texts are split between paragraphs into chunks under the
+    token limit, and that a paragraph longer than a chunk is cut.
+    """
+    paragraphs = ["a" * 30, "b" * 30, "c" * 100]
+    chunks = llm_interface.split_into_chunks("\n".join(paragraphs), max_tokens=16)
+
+    assert chunks == ["a" * 30 + "\n" + "b" * 30, "c" * 64, "c" * 36]
+    assert all(llm_interface.estimate_tokens(chunk) <= 16 for chunk in chunks)
+
+
+@patch("backend.app.llm_interface.config.SUMMARY_MAX_CHUNKS", 3)
+@patch("backend.app.llm_interface.config.SUMMARY_CHUNK_TOKENS", 100)
+@patch("backend.app.llm_interface.config.SUMMARY_MAP_REDUCE_TOKENS", 150)
+@patch("backend.app.llm_interface.get_llm_client")
+def test_generate_summary_and_categories_map_reduce(mock_get_llm_client):
+    """
+    Tests that an article over the token threshold is summarized chunk by
+    chunk, and that the summary and categories come from the chunk summaries.
+    """
+    mock_llm_client = mock_get_llm_client.return_value
+    mock_llm_client.models.generate_content.return_value = type(
+        "obj", (object,), {"text": "Summary: A part of the article."}
+    )()
+    mock_llm_client.models.generate_content_stream.return_value = [
+        type("obj", (object,), {"text": "Summary: The whole article.\nCategories: Live, News"})()
+    ]
+    article = "\n".join(f"{i}" + "x" * 299 for i in range(5))
+
+    summary, categories = llm_interface.generate_summary_and_categories(article)
+
+    assert (summary, categories) == ("The whole article.", ["Live", "News"])
+    # One call per chunk, up to SUMMARY_MAX_CHUNKS
+    assert mock_llm_client.models.generate_content.call_count == 3
+    reduce_prompt = mock_llm_client.models.generate_content_stream.call_args.kwargs["contents"][0].parts[0].text
+    assert reduce_prompt.count("A part of the article.") == 3
+    assert "x" * 300 not in reduce_prompt
+
+
+@patch("backend.app.llm_interface.get_llm_client")
+def test_llm_calls_record_token_usage(mock_get_llm_client):
+    """
+    Tests that each LLM call records its tokens, as reported by the API, and
+    that scoring only sends the lead of a long article.
+    """
+    llm_interface.token_usage.clear()
+    usage = type("obj", (object,), {"prompt_token_count": 321, "candidates_token_count": 2})()
+    mock_llm_client = mock_get_llm_client.return_value
+    mock_llm_client.models.generate_content.return_value = type(
+        "obj", (object,), {"text": "70", "usage_metadata": usage}
+    )()
+
+    article = "Lead paragraph about the match.\n" + "\n".join(f"Paragraph {i} " * 50 for i in range(100))
+    assert llm_interface.generate_interest_score(article, "Football") == 70
+    assert llm_interface.generate_interest_score(article, "Football") == 70
+
+    assert llm_interface.get_token_usage() == {
+        "interest_score": {"calls": 2, "prompt_tokens": 642, "output_tokens": 4}
+    }
+    prompt = mock_llm_client.models.generate_content.call_args.kwargs["contents"][0].parts[0].text
+    assert "Lead paragraph about the match." in prompt
+    assert llm_interface.estimate_tokens(prompt) < llm_interface.estimate_tokens(article) / 4
+
+
+@patch("backend.app.llm_interface.get_llm_client")
+def test_generate_summary_and_categories_parses_json(mock_get_llm_client):
+    """
+    Tests that a JSON reply, even wrapped in a code block, is parsed.
+    """
+    mock_llm_client = mock_get_llm_client.return_value
+    mock_llm_client.models.generate_content_stream.return_value = [
+        type("obj", (object,), {"text": '```json\n{"summary": "A test summary.",'})(),
+        type("obj", (object,), {"text": ' "categories": ["Tech", " AI "]}\n```'})(),
+    ]
+
+    assert llm_interface.generate_summary_and_categories("Test article") == ("A test summary.", ["Tech", "AI"])
+    mock_llm_client.models.generate_content.assert_not_called()
+
+
+@patch("backend.app.llm_interface.get_llm_client")
+def test_generate_summary_and_categories_repairs_invalid_reply(mock_get_llm_client):
+    """
+    Tests that an invalid reply is repaired with a small follow-up prompt
+    that does not resend the article, and that an unrepairable reply gives
+    empty values.
+    """
+    mock_llm_client = mock_get_llm_client.return_value
+    mock_llm_client.models.generate_content_stream.return_value = [
+        type("obj", (object,), {"text": '{"summary": "A test summary.", "categories": "Tech, AI"}'})()
+    ]
+    mock_llm_client.models.generate_content.return_value = type(
+        "obj", (object,), {"text": '{"summary": "A test summary.", "categories": ["Tech", "AI"]}'}
+    )()
+    article = "A long article about a new phone. " * 100
+
+    assert llm_interface.generate_summary_and_categories(article) == ("A test summary.", ["Tech", "AI"])
+    repair_prompt = mock_llm_client.models.generate_content.call_args.kwargs["contents"][0].parts[0].text
+    assert '"categories": "Tech, AI"' in repair_prompt
+    assert "new phone" not in repair_prompt
+
+    mock_llm_client.models.generate_content.return_value = type("obj", (object,), {"text": "Sorry"})()
+    assert llm_interface.generate_summary_and_categories(article) == ("", [])
+
+
+def test_llm_concurrency_limit_is_process_wide():
+    """
+    Tests that nested pools of LLM calls (e.g. a chunked summary inside a
+    job's pool) never have more than LLM_MAX_CONCURRENCY calls in flight.
+    """
+    from backend.app import llm_providers
+
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    class CountingProvider(llm_providers.LLMProvider):
+        def generate(self, task, model, prompt, temperature, response_schema=None, stream=False):
+            with lock:
+                in_flight.append(prompt)
+                peak.append(len(in_flight))
+            time.sleep(0.01)
+            with lock:
+                in_flight.remove(prompt)
+            return llm_providers.LLMReply(text=prompt)
+
+    llm_providers.register_provider("counting", CountingProvider)
+
+    def summarize(article):
+        return llm_interface.run_concurrently(
+            lambda chunk: llm_interface.generate("summary", f"{article}-{chunk}", 0), range(4)
+        )
+
+    with patch("backend.app.llm_interface.config.LLM_MAX_CONCURRENCY", 4), \
+         patch("backend.app.llm_interface.config.LLM_PROVIDER", "counting"), \
+         patch("backend.app.llm_interface._llm_slots", threading.BoundedSemaphore(2)):
+        results = llm_interface.run_concurrently(summarize, range(4))
+
+    assert results[1] == ["1-0", "1-1", "1-2", "1-3"]
+    assert max(peak) == 2
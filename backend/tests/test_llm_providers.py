@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+import pytest
+
+from app import llm_interface, llm_providers
+
+
+@patch("app.config.LLM_PROVIDER", "fake")
+def test_fake_provider_is_deterministic():
+    """
+    Tests that the fake provider replies in each task's format without
+    network access, always the same way for the same input.
+    """
+    summary, categories = llm_interface.generate_summary_and_categories("The central bank raised rates.")
+    assert summary == "The central bank raised rates."
+    assert 1 <= len(categories) <= 3
+    assert llm_interface.generate_summary_and_categories("The central bank raised rates.") == (summary, categories)
+
+    score = llm_interface.generate_interest_score("The central bank raised rates.", "Economy")
+    assert 0 <= score <= 100
+    assert llm_interface.generate_interest_score("The central bank raised rates.", "Economy") == score
+
+
+@patch("app.config.LLM_MODEL", "qwen2.5-7b-instruct")
+@patch("app.config.LLM_PROVIDER", "openai")
+def test_openai_compatible_provider(requests_mock):
+    """
+    Tests that the OpenAI-compatible provider calls the chat completions
+    endpoint with the configured model and reports the tokens used.
+    """
+    llm_interface.token_usage.clear()
+    requests_mock.post(
+        "http://localhost:8080/v1/chat/completions",
+        json={
+            "choices": [{"message": {"content": "42"}}],
+            "usage": {"prompt_tokens": 120, "completion_tokens": 1},
+        },
+    )
+
+    assert llm_interface.generate_interest_score("Article", "Interests") == 42
+
+    body = requests_mock.last_request.json()
+    assert body["model"] == "qwen2.5-7b-instruct"
+    assert "Interests" in body["messages"][0]["content"]
+    assert llm_interface.get_token_usage()["interest_score"] == {
+        "calls": 1, "prompt_tokens": 120, "output_tokens": 1
+    }
+
+
+def test_unknown_provider():
+    with pytest.raises(ValueError, match="Unknown LLM provider 'nope'"):
+        llm_providers.get_provider("nope")
+
+
+@patch("app.config.LLM_TASK_MODELS", {"interest_score": "gemma-3-4b-it"})
+@patch("app.config.LLM_PROVIDER", "openai")
+def test_task_models(requests_mock):
+    """
+    Tests that each task uses its own model if one is configured, and the
+    default model otherwise.
+    """
+    requests_mock.post(
+        "http://localhost:8080/v1/chat/completions",
+        json={"choices": [{"message": {"content": "a.headline"}}]},
+    )
+
+    llm_interface.generate_interest_score("Article", "Interests")
+    assert requests_mock.last_request.json()["model"] == "gemma-3-4b-it"
+    assert llm_interface.find_article_link_selector("<html></html>") == "a.headline"
+    assert requests_mock.last_request.json()["model"] == "gemma-3-27b-it"
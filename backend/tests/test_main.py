@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from httpx import AsyncClient, ASGITransport
 
@@ -214,3 +216,38 @@ async def test_filter_articles_by_read_status(client, db):
     assert len(data) == 1
     assert data[0]["title"] == "Unread Article"
     assert data[0]["read"] is False
+
+
+@pytest.mark.asyncio
+async def test_read_articles_by_category_concurrently(client, db):
+    """
+    Test the async article feed: categories are included, the category
+    filter works and concurrent readers get consistent results.
+    """
+    db_source = crud.create_source(
+        db=db, source=schemas.SourceCreate(name="Test Source", url="http://example.com")
+    )
+    for name, categories in [("tech", ["Tech"]), ("science", ["Science", "Tech"]), ("other", [])]:
+        db_article = crud.create_article(
+            db=db,
+            article=schemas.ArticleCreate(
+                url=f"http://example.com/{name}",
+                title=name,
+                original_content="Some content",
+                source_id=db_source.id,
+            ),
+        )
+        if categories:
+            crud.link_categories_to_article(db, article_id=db_article.id, categories=categories)
+    tech = next(c for c in crud.get_categories(db) if c.name == "Tech")
+
+    responses = await asyncio.gather(
+        *[client.get("/articles/", params={"category_id": tech.id}) for _ in range(10)]
+    )
+
+    for response in responses:
+        assert response.status_code == 200
+        data = response.json()
+        assert {article["title"] for article in data} == {"tech", "science"}
+        science = next(article for article in data if article["title"] == "science")
+        assert {c["name"] for c in science["categories"]} == {"Science", "Tech"}
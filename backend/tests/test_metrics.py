@@ -0,0 +1,80 @@
+import re
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+from sqlalchemy.orm import Session
+
+from app import metrics
+from app.jobs import run_scraping_job
+from app.models import Source
+
+
+def _sample(text: str, name: str, **labels) -> float:
+    """The value of a sample in the text format, 0 if it is missing."""
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}(\{{{re.escape(label_text)}\}})? (\S+)$", text, re.MULTILINE)
+    return float(match.group(2)) if match else 0
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Tests the text format of a histogram: cumulative buckets, sum and count."""
+    histogram = metrics.Histogram("test_seconds", "A test histogram.", ("path",), buckets=(0.1, 1))
+    try:
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe(value, path='a "quoted" path')
+        lines = histogram.render()
+    finally:
+        metrics.REGISTRY.remove(histogram)
+
+    assert lines == [
+        "# HELP test_seconds A test histogram.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{path="a \\"quoted\\" path",le="0.1"} 1',
+        'test_seconds_bucket{path="a \\"quoted\\" path",le="1.0"} 3',
+        'test_seconds_bucket{path="a \\"quoted\\" path",le="+Inf"} 4',
+        'test_seconds_sum{path="a \\"quoted\\" path"} 4.25',
+        'test_seconds_count{path="a \\"quoted\\" path"} 4',
+    ]
+    with pytest.raises(ValueError):
+        histogram.observe(1)
+
+
+@pytest.mark.asyncio
+@patch("app.config.JOB_EXECUTION_MODE", "worker")
+@patch("app.config.LLM_PROVIDER", "fake")
+async def test_metrics_endpoint_covers_a_scrape(client, db: Session, requests_mock: requests_mock.Mocker):
+    """
+    Tests that a scrape shows up in the fetch, extraction, LLM, commit, job
+    and article metrics served by GET /metrics.
+    """
+    before = (await client.get("/metrics")).text
+    source = Source(
+        name="Metrics Source",
+        url="http://www.metrics.com",
+        scraper_type="HTML",
+        config={"article_link_selector": ".article-link"},
+    )
+    db.add(source)
+    db.commit()
+    requests_mock.get("http://www.metrics.com", text='<a class="article-link" href="/1">1</a>')
+    requests_mock.get("http://www.metrics.com/1", text="<html><head><title>1</title></head><body>One</body></html>")
+    run_scraping_job("metrics-job", db)
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = response.text
+
+    def increase(name, **labels):
+        return _sample(after, name, **labels) - _sample(before, name, **labels)
+
+    assert increase("simplenews_fetch_seconds_count", domain="metrics.com", kind="source") == 1
+    assert increase("simplenews_fetch_seconds_count", domain="metrics.com", kind="article") == 1
+    assert increase("simplenews_extraction_cpu_seconds_count", kind="article") == 1
+    assert increase("simplenews_llm_request_seconds_count", task="summary", outcome="ok") == 1
+    assert increase("simplenews_llm_tokens_count", task="interest_score", kind="prompt") == 1
+    assert increase("simplenews_db_commit_seconds_count") > 0
+    assert increase("simplenews_scraped_articles_total", outcome="processed") == 1
+    assert _sample(after, "simplenews_jobs", status="completed") == 1
+    assert "simplenews_summary_queue_depth 0.0" in after
@@ -0,0 +1,118 @@
+from unittest.mock import patch
+
+from sqlalchemy.orm import Session
+import requests_mock
+
+from app import crud, near_duplicates, schemas
+from app.models import Article, Source
+from app.scraping import scrape_source
+
+STORY = (
+    "The city council approved a new budget on Tuesday evening after a long debate "
+    "about public transport funding. The plan adds three new bus lines, extends the "
+    "tram network to the northern districts and freezes ticket prices for two years. "
+    "Opposition members criticized the cost of the tram extension, arguing that the "
+    "money should go to road maintenance instead. The mayor said the investment would "
+    "reduce traffic and pollution in the long run and promised a review after one year."
+)
+OTHER_STORY = (
+    "A local football club won the regional championship on Sunday after beating its "
+    "rivals three to one in a tense final. The coach praised the young players who "
+    "scored twice in the second half and thanked the fans who travelled to the away "
+    "game. The club will now play in the national league next season, for the first "
+    "time in its history, and plans to renovate its stadium during the summer break."
+)
+
+
+def _create_article(db: Session, url: str, text: str, source_id: int = 1) -> Article:
+    article_in = schemas.ArticleCreate(
+        url=url, title="Title", original_content=text, source_id=source_id
+    )
+    return crud.create_article(db=db, article=article_in)
+
+
+def test_signature_similarity():
+    """
+    Tests that lightly edited copies of a text get a high estimated similarity
+    and unrelated texts a low one.
+    """
+    signature = near_duplicates.compute_signature(STORY)
+    edited = near_duplicates.compute_signature(STORY.replace("Tuesday", "Wednesday") + " Reporting by Staff.")
+    other = near_duplicates.compute_signature(OTHER_STORY)
+
+    assert signature.shape == (near_duplicates.NUM_PERMUTATIONS,)
+    assert near_duplicates.estimate_similarity(signature, edited[None, :])[0] > 0.8
+    assert near_duplicates.estimate_similarity(signature, other[None, :])[0] < 0.1
+
+
+def test_signature_requires_minimum_length():
+    """
+    Tests that texts too short for shingling get no signature.
+    """
+    assert near_duplicates.compute_signature("Content") is None
+    assert near_duplicates.compute_signature(None) is None
+
+
+def test_find_near_duplicate_clusters_articles(db: Session):
+    """
+    Tests that near duplicates are found through the LSH index and join the
+    cluster of the first article.
+    """
+    first = _create_article(db, "http://a.com/story", STORY)
+    near_duplicates.index_article(db, first, near_duplicates.compute_signature(STORY))
+    other = _create_article(db, "http://a.com/other", OTHER_STORY)
+    near_duplicates.index_article(db, other, near_duplicates.compute_signature(OTHER_STORY))
+
+    copy_text = "Updated: " + STORY
+    copy = _create_article(db, "http://b.com/copy", copy_text)
+    signature = near_duplicates.compute_signature(copy_text)
+    match, similarity = near_duplicates.find_near_duplicate(db, signature)
+    assert match.id == first.id
+    assert similarity >= near_duplicates.SIMILARITY_THRESHOLD
+
+    near_duplicates.index_article(db, copy, signature, duplicate_of=match)
+    assert copy.duplicate_of_id == first.id
+
+
+def test_scraper_reuses_enrichment_of_near_duplicates(
+    db: Session, requests_mock: requests_mock.Mocker
+):
+    """
+    Tests that a near duplicate of an enriched article reuses its summary,
+    categories and score instead of calling the LLM.
+    """
+    source = Source(
+        name="Test Source",
+        url="http://test.com",
+        scraper_type="HTML",
+        config={"article_link_selector": ".article-link"},
+    )
+    db.add(source)
+    db.commit()
+
+    existing = _create_article(db, "http://other.com/story", STORY, source_id=source.id)
+    near_duplicates.index_article(db, existing, near_duplicates.compute_signature(STORY))
+    crud.update_article_summary(db, article_id=existing.id, summary="Budget approved.")
+    crud.update_article_interest_score(db, article_id=existing.id, interest_score=42)
+    crud.link_categories_to_article(db, article_id=existing.id, categories=["Politics"])
+
+    requests_mock.get(
+        "http://test.com",
+        text='<a class="article-link" href="http://test.com/budget">Budget</a>',
+    )
+    requests_mock.get(
+        "http://test.com/budget",
+        text=f"<html><head><title>Budget</title></head><body><p>{STORY} Copyright Test.</p></body></html>",
+    )
+
+    with patch("app.llm_interface.generate_summary_and_categories") as mock_summary, \
+         patch("app.llm_interface.generate_interest_score") as mock_score:
+        scrape_source(db, source)
+
+    mock_summary.assert_not_called()
+    mock_score.assert_not_called()
+    article = db.query(Article).filter(Article.url == "http://test.com/budget").first()
+    assert article.duplicate_of_id == existing.id
+    assert article.summary == "Budget approved."
+    assert article.interest_score == 42
+    assert [c.name for c in article.categories] == ["Politics"]
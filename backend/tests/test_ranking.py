@@ -0,0 +1,103 @@
+import pytest
+
+from app import config, crud, ranking, schemas
+
+ASTRONOMY = "The telescope observed a distant galaxy and astronomers measured the orbit of a new exoplanet."
+COOKING = "The chef shared a recipe for slow roasted vegetables with garlic, olive oil and fresh herbs."
+
+
+def _create_article(db, key: str, text: str, interest_score: int, source_id: int):
+    article = crud.create_article(
+        db=db,
+        article=schemas.ArticleCreate(
+            url=f"http://example.com/{key}", title=key, original_content=text, source_id=source_id
+        ),
+    )
+    crud.update_article_interest_score(db, article_id=article.id, interest_score=interest_score)
+    return article
+
+
+@pytest.mark.asyncio
+async def test_feed_is_reranked_from_feedback(client, db, monkeypatch):
+    """
+    Tests that the feed follows the interest score without feedback, and that
+    likes and dislikes teach the model to rank similar articles first.
+    """
+    monkeypatch.setattr(config, "RANKING_PRIOR_EVENTS", 5)
+    space = crud.create_source(db=db, source=schemas.SourceCreate(name="Space", url="http://space.com"))
+    food = crud.create_source(db=db, source=schemas.SourceCreate(name="Food", url="http://food.com"))
+    liked = [_create_article(db, f"space-{i}", ASTRONOMY, 50, space.id).id for i in range(3)]
+    disliked = [_create_article(db, f"food-{i}", COOKING, 50, food.id).id for i in range(3)]
+    new_space = _create_article(db, "space-new", ASTRONOMY + " Telescope images.", 40, space.id).id
+    new_food = _create_article(db, "food-new", COOKING + " Garlic bread.", 60, food.id).id
+
+    response = await client.get("/articles/")
+    ids = [article["id"] for article in response.json()]
+    assert ids.index(new_food) < ids.index(new_space)
+
+    for article_id in liked:
+        response = await client.patch(f"/articles/{article_id}/feedback", json={"liked": True})
+        assert response.status_code == 200
+        assert response.json()["liked"] is True
+    for article_id in disliked:
+        await client.patch(f"/articles/{article_id}/feedback", json={"liked": False})
+
+    assert ranking.feedback_events(db) == 6
+    response = await client.get("/articles/")
+    ids = [article["id"] for article in response.json()]
+    assert ids.index(new_space) < ids.index(new_food)
+
+
+@pytest.mark.asyncio
+async def test_reading_an_article_is_recorded_once(client, db):
+    source_id = crud.create_source(db=db, source=schemas.SourceCreate(name="Space", url="http://space.com")).id
+    article_id = _create_article(db, "space", ASTRONOMY, 50, source_id).id
+
+    await client.patch(f"/articles/{article_id}/read-status", json={"read": True})
+    await client.patch(f"/articles/{article_id}/read-status", json={"read": True})
+    await client.patch(f"/articles/{article_id}/read-status", json={"read": False})
+
+    assert ranking.feedback_events(db) == 1
+    weights = ranking.load_weights(db)
+    assert weights[f"source:{source_id}"] > 0
+
+    response = await client.patch("/articles/9999/feedback", json={"liked": True})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_changing_feedback_undoes_the_previous_one(client, db):
+    """
+    Tests that turning a like into a dislike replaces the like instead of
+    adding a second event, and that removing the feedback undoes it.
+    """
+    source_id = crud.create_source(db=db, source=schemas.SourceCreate(name="Space", url="http://space.com")).id
+    article_id = _create_article(db, "space", ASTRONOMY, 50, source_id).id
+    source_feature = f"source:{source_id}"
+
+    await client.patch(f"/articles/{article_id}/feedback", json={"liked": True})
+    await client.patch(f"/articles/{article_id}/feedback", json={"liked": True})
+    assert ranking.feedback_events(db) == 1
+    assert ranking.load_weights(db)[source_feature] > 0
+
+    await client.patch(f"/articles/{article_id}/feedback", json={"liked": False})
+    assert ranking.feedback_events(db) == 1
+    assert ranking.load_weights(db)[source_feature] < 0
+
+    await client.patch(f"/articles/{article_id}/feedback", json={"liked": None})
+    assert ranking.feedback_events(db) == 0
+    assert ranking.load_weights(db)[source_feature] == pytest.approx(0, abs=1e-3)
+
+
+def test_weight_updates_are_increments(db):
+    """
+    Tests that weights and the event count are added to in the database, so
+    an update computed from stale weights does not overwrite another one.
+    """
+    crud.add_to_ranking_weights(db, {"bias": 0.5, "source:1": 1.0})
+    crud.add_to_ranking_weights(db, {"bias": 0.25})
+    crud.increment_setting(db, ranking.EVENTS_SETTING)
+    crud.increment_setting(db, ranking.EVENTS_SETTING, 2)
+
+    assert ranking.load_weights(db) == {"bias": 0.75, "source:1": 1.0}
+    assert ranking.feedback_events(db) == 3
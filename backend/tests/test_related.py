@@ -0,0 +1,67 @@
+import pytest
+
+from app import crud, embeddings, related, schemas
+
+TEXTS = [
+    "The central bank raised interest rates again to fight inflation, and markets fell after the decision.",
+    "Markets fell sharply as the central bank announced another interest rate increase against inflation.",
+    "A new species of frog was discovered in the rainforest by a team of biologists studying amphibians.",
+    "Biologists studying amphibians in the rainforest described a frog species that was unknown until now.",
+    "The football team won the championship final after the striker scored twice in the second half.",
+]
+
+
+def _ingest(db, texts):
+    source_id = crud.create_source(db=db, source=schemas.SourceCreate(name="Source", url="http://source.com")).id
+    ids = []
+    for i, text in enumerate(texts):
+        article = crud.create_article(
+            db=db,
+            article=schemas.ArticleCreate(
+                url=f"http://source.com/{i}", title=f"Article {i}", original_content=text, source_id=source_id
+            ),
+        )
+        embeddings.embed_article(article)
+        related.index_article(db, article)
+        ids.append(article.id)
+    return ids
+
+
+@pytest.mark.asyncio
+async def test_related_articles_endpoint(client, db):
+    """
+    Tests that articles about the same topic are related to each other in
+    both directions, whichever was stored first.
+    """
+    rates, rates_again, frog, frog_again, football = _ingest(db, TEXTS)
+
+    response = await client.get(f"/articles/{rates}/related")
+    assert response.status_code == 200
+    results = response.json()
+    assert results[0]["id"] == rates_again
+    assert results[0]["similarity"] > 0.3
+    assert football not in [result["id"] for result in results]
+
+    response = await client.get(f"/articles/{frog_again}/related", params={"limit": 1})
+    assert [result["id"] for result in response.json()] == [frog]
+
+    response = await client.get("/articles/9999/related")
+    assert response.status_code == 404
+
+
+def test_index_existing_articles(db):
+    source_id = crud.create_source(db=db, source=schemas.SourceCreate(name="Source", url="http://source.com")).id
+    for i, text in enumerate(TEXTS[:2]):
+        article = crud.create_article(
+            db=db,
+            article=schemas.ArticleCreate(
+                url=f"http://source.com/{i}", title=f"Article {i}", original_content=text, source_id=source_id
+            ),
+        )
+        embeddings.embed_article(article)
+    db.commit()
+
+    assert related.index_existing_articles(db) == 2
+    assert related.index_existing_articles(db) == 0
+    (first, similarity), = related.get_related_articles(db, 2)
+    assert first.id == 1
@@ -0,0 +1,112 @@
+import datetime
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+from sqlalchemy.orm import Session
+
+from app import crud, scheduler
+from app.jobs import run_scraping_job
+from app.models import Article, Source
+
+
+def _add_source(db: Session, name: str, published_hours_ago: list[float] = ()) -> Source:
+    now = datetime.datetime.utcnow()
+    source = Source(name=name, url=f"http://{name}.com", scraper_type="HTML")
+    db.add(source)
+    db.commit()
+    for i, hours in enumerate(published_hours_ago):
+        db.add(Article(
+            source_id=source.id,
+            url=f"http://{name}.com/{i}",
+            title=f"Article {i}",
+            created_at=now - datetime.timedelta(hours=hours),
+        ))
+    db.commit()
+    return source
+
+
+def test_publishing_interval_follows_the_publishing_rate(db: Session):
+    """
+    Tests that the polling interval matches one new article per poll, not
+    counting the backlog of the first scrape, within the configured bounds.
+    """
+    # A backlog of 10 articles two days ago, then one article every 2 hours
+    busy = _add_source(db, "busy", [48] * 10 + [2 * i for i in range(1, 24)])
+    # An article every 6 minutes, but the interval cannot go below the minimum
+    frequent = _add_source(db, "frequent", [96] + [i / 10 for i in range(1, 95 * 10)])
+    new = _add_source(db, "new", [0.1] * 10)
+    empty = _add_source(db, "empty")
+
+    assert 110 < scheduler.publishing_interval(db, busy.id) < 130
+    assert scheduler.publishing_interval(db, frequent.id) == 15
+    assert scheduler.publishing_interval(db, new.id) == 60
+    assert scheduler.publishing_interval(db, empty.id) == 60
+
+
+@patch("app.config.SCHEDULER_JITTER", 0)
+def test_record_poll_backs_off_sources_without_new_articles(db: Session):
+    """
+    Tests that each scrape without new articles doubles the interval up to
+    the maximum, and that new articles bring it back to the learned one.
+    """
+    source = _add_source(db, "slow", [24 * 7] + [8 * i for i in range(1, 20)])
+    polled_at = datetime.datetime.utcnow()
+
+    intervals = [scheduler.record_poll(db, source, polled_at) for _ in range(4)]
+    assert intervals[0] == pytest.approx(scheduler.publishing_interval(db, source.id))
+    assert intervals[1:] == [intervals[0] * 2, 1440, 1440]
+    assert source.next_scrape_at > polled_at + datetime.timedelta(hours=23)
+
+    db.add(Article(source_id=source.id, url="http://slow.com/new", title="New"))
+    db.commit()
+    assert scheduler.record_poll(db, source, polled_at) < intervals[1]
+
+
+def test_schedule_due_scrapes_spreads_and_claims_sources(db: Session):
+    """
+    Tests that new sources get a first poll time within their interval
+    instead of all being scraped at once, and that a due source gets one
+    scrape job.
+    """
+    sources = [_add_source(db, f"source{i}") for i in range(20)]
+    now = datetime.datetime.utcnow()
+
+    assert scheduler.schedule_due_scrapes(db, now) == []
+    poll_times = set()
+    for source in sources:
+        db.refresh(source)
+        assert now <= source.next_scrape_at <= now + datetime.timedelta(minutes=60)
+        poll_times.add(source.next_scrape_at)
+    assert len(poll_times) == 20
+
+    later = now + datetime.timedelta(minutes=30)
+    due = [source.id for source in sources if source.next_scrape_at <= later]
+    job_ids = scheduler.schedule_due_scrapes(db, later)
+    assert sorted(crud.get_job(db, job_id).payload["source_id"] for job_id in job_ids) == sorted(due)
+    # Claimed sources are not due anymore
+    assert scheduler.schedule_due_scrapes(db, later) == []
+
+
+@patch("app.config.JOB_EXECUTION_MODE", "worker")
+def test_scrape_job_schedules_the_next_scrape(db: Session, requests_mock: requests_mock.Mocker):
+    """Tests that a scrape job schedules the next scrape of its sources."""
+    source = Source(
+        name="Scheduled Source",
+        url="http://scheduled.com",
+        scraper_type="HTML",
+        config={"article_link_selector": ".article-link"},
+    )
+    db.add(source)
+    db.commit()
+    source_id = source.id
+    requests_mock.get("http://scheduled.com", text='<a class="article-link" href="/1">1</a>')
+    requests_mock.get("http://scheduled.com/1", text="<html><head><title>1</title></head><body>One</body></html>")
+
+    with patch("app.llm_interface.generate_summary_and_categories", return_value=("S", ["C"])), \
+         patch("app.llm_interface.generate_interest_score", return_value=50):
+        run_scraping_job("scheduled-job", db, source_id=source_id)
+
+    source = crud.get_source(db, source_id)
+    assert source.scrape_interval_minutes == 60
+    assert source.next_scrape_at > datetime.datetime.utcnow()
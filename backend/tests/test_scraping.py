@@ -305,3 +305,87 @@ def test_scrape_source_with_interest_score(
     article = db.query(Article).filter(Article.url == article_url).first()
     assert article is not None
     assert article.interest_score == 75
+
+
+def test_scraper_ignores_url_variants(
+    db: Session, requests_mock: requests_mock.Mocker
+):
+    """
+    Tests that tracking-parameter variants and pages whose canonical URL is
+    already stored are treated as duplicates.
+    """
+    source_url = "http://test.com"
+    article_url = "http://test.com/article1"
+    tracking_url = "http://test.com/article1?utm_source=feed#top"
+    syndicated_url = "http://test.com/syndicated/42"
+
+    mock_homepage_html = f"""
+    <html>
+        <body>
+            <a class="article-link" href="{article_url}">Article 1</a>
+            <a class="article-link" href="{tracking_url}">Article 1 again</a>
+            <a class="article-link" href="{syndicated_url}">Article 1 syndicated</a>
+        </body>
+    </html>
+    """
+    mock_article_html = "<html><head><title>Article 1 Title</title></head><body><p>Article 1 content.</p></body></html>"
+    mock_syndicated_html = f"""
+    <html><head><title>Article 1 Title</title><link rel="canonical" href="{article_url}"></head>
+    <body><p>Article 1 content.</p></body></html>
+    """
+
+    requests_mock.get(source_url, text=mock_homepage_html)
+    requests_mock.get(article_url, text=mock_article_html)
+    requests_mock.get(syndicated_url, text=mock_syndicated_html)
+
+    source = Source(
+        name="Test Canonical Source",
+        url=source_url,
+        scraper_type="HTML",
+        config={"article_link_selector": ".article-link"},
+    )
+    db.add(source)
+    db.commit()
+
+    scrape_source(db, source)
+
+    articles = db.query(Article).all()
+    assert len(articles) == 1
+    assert articles[0].url == article_url
+    assert articles[0].normalized_url == "http://test.com/article1"
+    assert [r.url for r in requests_mock.request_history].count(article_url) == 1
+
+
+def test_scraper_remembers_links_with_another_canonical_url(
+    db: Session, requests_mock: requests_mock.Mocker
+):
+    """
+    Tests that a list link whose page declares another canonical URL is
+    recognized on the next scrape without being fetched again.
+    """
+    source_url = "http://test.com"
+    link = "http://test.com/amp/article1?utm_source=feed"
+    canonical_url = "http://news.example.com/2026/article1"
+
+    requests_mock.get(source_url, text=f'<html><body><a class="article-link" href="{link}">Article 1</a></body></html>')
+    requests_mock.get(link, text=f"""
+    <html><head><title>Article 1 Title</title><link rel="canonical" href="{canonical_url}"></head>
+    <body><p>Article 1 content.</p></body></html>
+    """)
+
+    source = Source(
+        name="Test Link Source",
+        url=source_url,
+        scraper_type="HTML",
+        config={"article_link_selector": ".article-link"},
+    )
+    db.add(source)
+    db.commit()
+
+    scrape_source(db, source)
+    scrape_source(db, source)
+
+    article = db.query(Article).one()
+    assert (article.url, article.link_normalized_url) == (canonical_url, "http://test.com/article1")
+    assert [r.url for r in requests_mock.request_history].count(link) == 1
+    assert crud.get_existing_article_links(db, [link]) == {link}
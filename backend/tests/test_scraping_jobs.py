@@ -1,6 +1,7 @@
 import time
 from unittest.mock import patch
 
+import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 import requests_mock
@@ -8,7 +9,7 @@ import requests_mock
 from app.main import app, run_scraping_job
 from app.models import Source, Article
 from app.database import SessionLocal
-from app.shared_state import job_statuses, canceled_jobs
+from app import crud
 import app.scraping as scraping
 
 client = TestClient(app)
@@ -45,7 +46,7 @@ def test_scrape_job_progress_and_completion(db: Session, requests_mock: requests
         run_scraping_job(job_id, db)
 
         # 5. Check the final status
-        status = job_statuses.get(job_id)
+        status = crud.get_job_status(db, job_id)
         assert status is not None
         assert status.status == "completed"
         assert status.progress == 100
@@ -82,17 +83,17 @@ def test_scrape_job_cancellation(db: Session, requests_mock: requests_mock.Mocke
     
     original_scrape_html_source = scraping._scrape_html_source
 
-    def cancellable_scrape_html_source(db, source, job_id, article_links, update_progress_callback=None):
+    def cancellable_scrape_html_source(db, source, job_id, article_links, update_progress_callback=None, job_items=None):
         # Process one article, then set the job to canceled
-        canceled_jobs.add(job_id)
-        return original_scrape_html_source(db, source, job_id, article_links, update_progress_callback)
+        crud.request_job_cancel(db, job_id)
+        return original_scrape_html_source(db, source, job_id, article_links, update_progress_callback, job_items)
 
     with patch("app.scraping._scrape_html_source", side_effect=cancellable_scrape_html_source) as mock_scrape:
         # 3. Start the job
         run_scraping_job(job_id, db)
 
         # 4. Check the final status
-        status = job_statuses.get(job_id)
+        status = crud.get_job_status(db, job_id)
         assert status is not None
         assert status.status == "canceled"
 
@@ -146,7 +147,7 @@ def test_scrape_job_with_skipped_and_failed_articles(db: Session, requests_mock:
         run_scraping_job(job_id, db)
 
         # 5. Check the final status
-        status = job_statuses.get(job_id)
+        status = crud.get_job_status(db, job_id)
         assert status is not None
         assert status.status == "completed"
         assert status.total_articles == 3
@@ -154,3 +155,94 @@ def test_scrape_job_with_skipped_and_failed_articles(db: Session, requests_mock:
         assert status.skipped_articles == 1
         assert status.failed_articles == 1
         assert status.progress == 100
+
+
+@pytest.mark.asyncio
+async def test_scrape_job_resumes_from_checkpoints(client, db: Session, requests_mock: requests_mock.Mocker):
+    """
+    Tests that a resumed job skips the pre-scan and only redoes the steps
+    that were not finished before the job failed.
+    """
+    source = Source(
+        name="Test Resume Source",
+        url="http://test-resume.com",
+        scraper_type="HTML",
+        config={"article_link_selector": ".article-link"},
+    )
+    db.add(source)
+    db.commit()
+
+    requests_mock.get("http://test-resume.com", text='''
+        <a class="article-link" href="/article1">Article 1</a>
+        <a class="article-link" href="/article2">Article 2</a>
+    ''')
+    requests_mock.get("http://test-resume.com/article1", text="<html><head><title>Article 1</title></head><body>Content 1</body></html>")
+    requests_mock.get("http://test-resume.com/article2", text="<html><head><title>Article 2</title></head><body>Content 2</body></html>")
+
+    # 1. The process "dies" while scoring the second article
+    job_id = "test-resume-job"
+    with patch("app.llm_interface.generate_summary_and_categories", return_value=("S", ["C"])), \
+         patch("app.llm_interface.generate_interest_score", side_effect=[50, RuntimeError("LLM down")]):
+        run_scraping_job(job_id, db)
+
+    assert crud.get_job_status(db, job_id).status == "failed"
+    assert [item.state for item in crud.get_job_items(db, job_id)] == ["scored", "summarized"]
+
+    # 2. Resume the job
+    with patch("app.llm_interface.generate_summary_and_categories", return_value=("S", ["C"])) as mock_summary, \
+         patch("app.llm_interface.generate_interest_score", return_value=70) as mock_score:
+        response = await client.post(f"/sources/scrape/resume/{job_id}")
+        assert response.status_code == 202
+
+    mock_summary.assert_not_called()
+    mock_score.assert_called_once()
+
+    status = crud.get_job_status(db, job_id)
+    assert status.status == "completed"
+    assert status.processed_articles == 2
+    assert status.progress == 100
+
+    # Neither the index page nor the articles were fetched a second time
+    fetched_urls = [request.url for request in requests_mock.request_history]
+    assert fetched_urls.count("http://test-resume.com/") == 1
+    assert fetched_urls.count("http://test-resume.com/article2") == 1
+
+    articles = db.query(Article).order_by(Article.id).all()
+    assert [a.interest_score for a in articles] == [50, 70]
+
+    # A completed job cannot be resumed
+    response = await client.post(f"/sources/scrape/resume/{job_id}")
+    assert response.status_code == 404
+
+
+@patch("app.config.SUMMARY_MIN_SCORE", 50)
+def test_scrape_job_only_summarizes_articles_above_the_score_threshold(db: Session, requests_mock: requests_mock.Mocker):
+    """
+    Tests that with SUMMARY_MIN_SCORE set, articles are scored first and only
+    the ones reaching the threshold are summarized, also by the repair job.
+    """
+    source = Source(
+        name="Threshold Source",
+        url="http://threshold.com",
+        scraper_type="HTML",
+        config={"article_link_selector": ".article-link"},
+    )
+    db.add(source)
+    db.commit()
+    requests_mock.get("http://threshold.com", text='''
+        <a class="article-link" href="/interesting">Interesting</a>
+        <a class="article-link" href="/boring">Boring</a>
+    ''')
+    requests_mock.get("http://threshold.com/interesting", text="<html><head><title>Interesting</title></head><body>Rockets</body></html>")
+    requests_mock.get("http://threshold.com/boring", text="<html><head><title>Boring</title></head><body>Weather</body></html>")
+
+    with patch("app.llm_interface.generate_summary_and_categories", return_value=("S", ["C"])) as mock_summary, \
+         patch("app.llm_interface.generate_interest_score", side_effect=[80, 20]):
+        run_scraping_job("threshold-job", db)
+
+    mock_summary.assert_called_once_with(article_text="Rockets")
+    articles = {article.title: article for article in db.query(Article).all()}
+    assert (articles["Interesting"].summary, articles["Interesting"].interest_score) == ("S", 80)
+    assert (articles["Boring"].summary, articles["Boring"].interest_score) == (None, 20)
+    # The article below the threshold is not incomplete
+    assert crud.count_articles_needing_enrichment(db) == 0
@@ -0,0 +1,115 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from app import crud, schemas, search
+
+
+def _create_article(db: Session, url: str, title: str, text: str, source_id: int) -> int:
+    article_in = schemas.ArticleCreate(
+        url=url, title=title, original_content=text, source_id=source_id
+    )
+    return crud.create_article(db=db, article=article_in).id
+
+
+@pytest.fixture
+def source_id(db: Session) -> int:
+    return crud.create_source(db, schemas.SourceCreate(name="Test Source", url="http://test.com")).id
+
+
+def test_search_ranks_title_matches_first(db: Session, source_id: int):
+    in_content = _create_article(
+        db, "http://test.com/1", "City news", "The council discussed the tram network at length.", source_id
+    )
+    in_title = _create_article(
+        db, "http://test.com/2", "Tram network extended", "The project was approved.", source_id
+    )
+    _create_article(db, "http://test.com/3", "Football", "The club won the final.", source_id)
+
+    results = search.search_articles(db, "tram networks")
+
+    assert [article.id for article, _, _ in results] == [in_title, in_content]
+    assert results[0][1] > results[1][1]
+    assert "<mark>tram</mark>" in results[1][2].lower()
+
+
+def test_search_index_follows_updates_and_deletes(db: Session, source_id: int):
+    article_id = _create_article(db, "http://test.com/1", "Budget", "Numbers.", source_id)
+    assert search.search_articles(db, "elections") == []
+
+    crud.update_article_summary(db, article_id=article_id, summary="A story about the elections.")
+    assert [article.id for article, _, _ in search.search_articles(db, "elections")] == [article_id]
+    # The last word is matched as a prefix
+    assert [article.id for article, _, _ in search.search_articles(db, "elect")] == [article_id]
+
+    db.delete(crud.get_article(db, article_id))
+    db.commit()
+    assert search.search_articles(db, "elections") == []
+
+
+def test_search_escapes_snippets_and_query_syntax(db: Session, source_id: int):
+    _create_article(
+        db, "http://test.com/1", "Markup", "Use <script>alert(1)</script> to test the parser.", source_id
+    )
+
+    results = search.search_articles(db, '"parser) -(*')
+
+    assert len(results) == 1
+    snippet = results[0][2]
+    assert "<script>" not in snippet
+    assert "&lt;script&gt;" in snippet
+    assert "<mark>parser</mark>" in snippet
+    assert search.search_articles(db, "?!") == []
+
+
+@pytest.mark.asyncio
+async def test_search_endpoint(client, db: Session, source_id: int):
+    article_id = _create_article(
+        db, "http://test.com/1", "Solar power record", "Solar panels produced more power than ever.", source_id
+    )
+    crud.link_categories_to_article(db, article_id=article_id, categories=["Energy"])
+
+    response = await client.get("/articles/search", params={"q": "solar"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["id"] == article_id
+    assert data[0]["categories"][0]["name"] == "Energy"
+    assert data[0]["rank"] > 0
+    assert "<mark>" in data[0]["snippet"]
+
+    response = await client.get("/articles/search", params={"q": ""})
+    assert response.status_code == 422
+
+
+def test_search_ranks_and_pages_through_all_matches(db: Session, source_id: int):
+    """Tests that an old title match outranks many recent content matches."""
+    old = _create_article(db, "http://test.com/old", "Harbour bridge opens", "Traffic news.", source_id)
+    recent = [
+        _create_article(db, f"http://test.com/{i}", f"Story {i}", "It was seen from the harbour.", source_id)
+        for i in range(30)
+    ]
+
+    first_page = search.search_articles(db, "harbour", limit=10)
+    assert first_page[0][0].id == old
+    pages = [search.search_articles(db, "harbour", skip=skip, limit=10) for skip in (10, 20, 30)]
+    found = [article.id for page in [first_page] + pages for article, _, _ in page]
+    assert sorted(found) == sorted([old] + recent)
+
+
+def test_like_search_without_full_text_index(db: Session, source_id: int):
+    """Tests the fallback used on databases without a full-text index."""
+    in_content = _create_article(
+        db, "http://test.com/1", "City news", "The council discussed the tram_network at length.", source_id
+    )
+    in_title = _create_article(db, "http://test.com/2", "Tram network extended", "Approved.", source_id)
+    _create_article(db, "http://test.com/3", "Trams", "The tramXnetwork was approved.", source_id)
+
+    hits = search._search_like(db, "tram_network", 0, 20)
+    assert [article_id for article_id, _, _ in hits] == [in_content]
+    assert "\x02tram_network\x03" in hits[0][2]
+
+    hits = search._search_like(db, "network TRAM", 0, 20)
+    assert hits[0][0] == in_title
+    assert in_content in [article_id for article_id, _, _ in hits]
+    assert hits[0][1] > hits[-1][1]
@@ -0,0 +1,116 @@
+from unittest.mock import patch
+
+import requests_mock
+from sqlalchemy.orm import Session
+
+from app import crud, schemas, seen_links
+from app.jobs import run_scraping_job
+from app.models import Article, Source
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """
+    Tests that the filter finds every added key, rarely finds others, and
+    survives serialization.
+    """
+    seen = seen_links.BloomFilter(bits=64 * 1024, hashes=7)
+    for i in range(2000):
+        seen.add(f"https://example.com/article-{i}")
+
+    restored = seen_links.BloomFilter.from_bytes(seen.to_bytes())
+    assert all(f"https://example.com/article-{i}" in restored for i in range(2000))
+    false_positives = sum(f"https://example.com/other-{i}" in restored for i in range(10000))
+    assert false_positives < 100
+
+
+def _add_source(db: Session, name: str) -> Source:
+    source = Source(
+        name=name,
+        url=f"http://{name}.com",
+        scraper_type="HTML",
+        config={"article_link_selector": ".article-link"},
+    )
+    db.add(source)
+    db.commit()
+    return source
+
+
+def _mock_article(requests_mock: requests_mock.Mocker, url: str):
+    requests_mock.get(url, text=f"<html><head><title>{url}</title></head><body>Content of {url}</body></html>")
+
+
+@patch("app.config.JOB_EXECUTION_MODE", "worker")
+def test_known_links_are_skipped_with_one_lookup(db: Session, requests_mock: requests_mock.Mocker):
+    """
+    Tests that a scrape only looks up the links the source's filter may
+    have seen, in one query, and that new links need no lookup at all.
+    """
+    source = _add_source(db, "bloom")
+    source_id = source.id
+    links = [f"http://bloom.com/article-{i}" for i in range(5)]
+    for link in links + ["http://bloom.com/article-new"]:
+        _mock_article(requests_mock, link)
+    page = "".join(f'<a class="article-link" href="{link}">{link}</a>' for link in links)
+    requests_mock.get("http://bloom.com", text=page)
+
+    with patch("app.llm_interface.generate_summary_and_categories", return_value=("S", ["C"])), \
+         patch("app.llm_interface.generate_interest_score", return_value=50):
+        run_scraping_job("first-scrape", db)
+        assert crud.get_source(db, source_id).seen_links is not None
+
+        requests_mock.get("http://bloom.com", text=page + '<a class="article-link" href="/article-new">New</a>')
+        with patch("app.crud.get_existing_article_links", wraps=crud.get_existing_article_links) as lookup, \
+             patch("app.crud.get_article_by_url", wraps=crud.get_article_by_url) as single_lookup:
+            run_scraping_job("second-scrape", db)
+
+    lookup.assert_called_once_with(db, links)
+    # Only the link left by the pre-scan is checked again before its fetch
+    single_lookup.assert_called_once_with(db, url="http://bloom.com/article-new")
+    status = crud.get_job_status(db, "second-scrape")
+    assert (status.total_articles, status.processed_articles, status.skipped_articles) == (6, 1, 5)
+    assert db.query(Article).count() == 6
+
+
+@patch("app.config.JOB_EXECUTION_MODE", "worker")
+def test_links_stored_by_another_source_are_skipped(db: Session, requests_mock: requests_mock.Mocker):
+    """
+    Tests that a link new to a source but stored by another one is skipped
+    instead of failing the insert.
+    """
+    first_id, second_id = _add_source(db, "first").id, _add_source(db, "second").id
+    requests_mock.get("http://first.com", text='<a class="article-link" href="http://shared.com/story">Story</a>')
+    requests_mock.get("http://second.com", text='<a class="article-link" href="http://shared.com/story">Story</a>')
+    _mock_article(requests_mock, "http://shared.com/story")
+
+    with patch("app.llm_interface.generate_summary_and_categories", return_value=("S", ["C"])), \
+         patch("app.llm_interface.generate_interest_score", return_value=50):
+        run_scraping_job("first-source", db, source_id=first_id)
+        run_scraping_job("second-source", db, source_id=second_id)
+
+    status = crud.get_job_status(db, "second-source")
+    assert status.status == "completed"
+    assert (status.processed_articles, status.skipped_articles, status.failed_articles) == (0, 1, 0)
+    assert db.query(Article).count() == 1
+
+
+@patch("app.config.JOB_EXECUTION_MODE", "worker")
+def test_links_stored_after_the_pre_scan_are_not_fetched(db: Session, requests_mock: requests_mock.Mocker):
+    """
+    Tests that a link the pre-scan let through but which is stored by the
+    time it is processed is skipped before being fetched.
+    """
+    source = _add_source(db, "late")
+    requests_mock.get("http://late.com", text='<a class="article-link" href="http://late.com/story">Story</a>')
+    _mock_article(requests_mock, "http://late.com/story")
+    crud.create_article(
+        db, schemas.ArticleCreate(url="http://late.com/story", title="Story", source_id=source.id)
+    )
+
+    with patch("app.crud.get_existing_article_links", return_value=set()), \
+         patch("app.llm_interface.generate_summary_and_categories", return_value=("S", ["C"])), \
+         patch("app.llm_interface.generate_interest_score", return_value=50):
+        run_scraping_job("late-scrape", db)
+
+    status = crud.get_job_status(db, "late-scrape")
+    assert (status.processed_articles, status.skipped_articles) == (0, 1)
+    assert "http://late.com/story" not in [request.url for request in requests_mock.request_history]
@@ -0,0 +1,162 @@
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+from sqlalchemy.orm import Session
+
+from app import crud, embeddings, related, stories
+from app.jobs import run_scraping_job
+from app.models import Article, Source, Story
+
+ERUPTION = (
+    "The Fagradalsfjall volcano in Iceland erupted on Monday night, sending lava fountains "
+    "into the sky near the town of Grindavik. Authorities evacuated the town and closed the "
+    "Blue Lagoon spa. Geologists said the fissure was three kilometres long and that the "
+    "eruption could last weeks. Flights at Keflavik airport were not affected so far."
+)
+ERUPTION_OTHER_SOURCE = (
+    "Residents of Grindavik were evacuated after a volcanic fissure opened on the Reykjanes "
+    "peninsula in Iceland. Lava fountains from the Fagradalsfjall eruption lit up the night "
+    "sky, and the Blue Lagoon spa closed. Keflavik airport remained open, while geologists "
+    "warned that the eruption could continue for several weeks."
+)
+ELECTION = (
+    "The ruling coalition lost its majority in the regional parliament after Sunday's "
+    "election, in which turnout reached a record high. The opposition leader promised to "
+    "form a new government within a month and to hold a referendum on the budget reform, "
+    "while the outgoing premier conceded defeat in a short speech to supporters."
+)
+
+
+def _page(title: str, text: str) -> str:
+    return f"<html><head><title>{title}</title></head><body><p>{text}</p></body></html>"
+
+
+@pytest.mark.asyncio
+async def test_scrape_clusters_articles_into_stories(client, db: Session, requests_mock: requests_mock.Mocker):
+    """
+    Tests that articles about the same event from different sources form one
+    story, that the second one reuses the first one's enrichment, and that
+    the story gets a single merged summary.
+    """
+    source = Source(
+        name="Test Source",
+        url="http://test.com",
+        scraper_type="HTML",
+        config={"article_link_selector": ".article-link"},
+    )
+    db.add(source)
+    db.commit()
+
+    requests_mock.get("http://test.com", text="""
+        <a class="article-link" href="/eruption">Eruption</a>
+        <a class="article-link" href="/election">Election</a>
+        <a class="article-link" href="/eruption-2">Eruption again</a>
+    """)
+    requests_mock.get("http://test.com/eruption", text=_page("Volcano erupts", ERUPTION))
+    requests_mock.get("http://test.com/election", text=_page("Coalition loses", ELECTION))
+    requests_mock.get("http://test.com/eruption-2", text=_page("Town evacuated", ERUPTION_OTHER_SOURCE))
+
+    with patch("app.llm_interface.generate_summary_and_categories", return_value=("S", ["Nature"])) as mock_summary, \
+         patch("app.llm_interface.generate_interest_score", return_value=60) as mock_score, \
+         patch("app.llm_interface.generate_story_summary", return_value="Volcano erupts in Iceland.") as mock_story:
+        run_scraping_job("story-job", db)
+
+    assert mock_summary.call_count == 2
+    assert mock_score.call_count == 2
+    mock_story.assert_called_once()
+    assert len(mock_story.call_args.args[0]) == 2
+
+    response = await client.get("/articles/", params={"group_by": "story"})
+    assert response.status_code == 200
+    groups = response.json()
+    assert [group["article_count"] for group in groups] == [2, 1]
+    assert groups[0]["summary"] == "Volcano erupts in Iceland."
+    assert sorted(article["url"] for article in groups[0]["articles"]) == [
+        "http://test.com/eruption",
+        "http://test.com/eruption-2",
+    ]
+    assert groups[1]["summary"] == "S"
+    # The second article of the story keeps its own (missing) summary
+    second = db.query(Article).filter(Article.url == "http://test.com/eruption-2").one()
+    assert second.summary is None
+    assert second.interest_score == 60
+    assert [category.name for category in second.categories] == ["Nature"]
+
+    # Summaries are only generated again for stories that grew
+    with patch("app.llm_interface.generate_story_summary") as mock_story:
+        assert stories.summarize_stories(db) == 0
+    mock_story.assert_not_called()
+
+
+def test_stories_respect_the_time_window(db: Session):
+    source_id = crud.create_source(db=db, source=crud.schemas.SourceCreate(name="S", url="http://s.com")).id
+    for i, text in enumerate([ERUPTION, ERUPTION_OTHER_SOURCE]):
+        article = Article(url=f"http://s.com/{i}", title="", original_content=text, source_id=source_id)
+        db.add(article)
+        db.commit()
+        if i == 0:
+            # The first article is old news
+            article.created_at = article.created_at.replace(year=article.created_at.year - 1)
+        embeddings.embed_article(article)
+        related.index_article(db, article)
+        stories.assign_story(db, article)
+
+    assert db.query(Story).count() == 2
+
+
+def _add_story(db: Session, article_count: int) -> int:
+    source_id = crud.create_source(db=db, source=crud.schemas.SourceCreate(name="S", url="http://s.com")).id
+    story = Story(article_count=0, summarized_article_count=0)
+    db.add(story)
+    db.commit()
+    _add_story_articles(db, story, source_id, article_count)
+    return story.id
+
+
+def _add_story_articles(db: Session, story: Story, source_id: int, count: int):
+    for _ in range(count):
+        story.article_count += 1
+        db.add(Article(
+            url=f"http://s.com/{story.id}/{story.article_count}",
+            title="",
+            original_content=f"Text {story.article_count}",
+            source_id=source_id,
+            story_id=story.id,
+        ))
+    db.commit()
+
+
+def test_story_summary_only_changes_with_its_articles(db: Session):
+    """
+    Tests that a story is summarized again when it gets new articles among
+    the ones sent to the LLM, but not for articles beyond them.
+    """
+    story_id = _add_story(db, stories.MAX_SUMMARY_ARTICLES - 1)
+    story = db.get(Story, story_id)
+    source_id = db.query(Article).first().source_id
+
+    with patch("app.llm_interface.generate_story_summary", return_value="Summary") as mock_story:
+        assert stories.summarize_stories(db) == 1
+        _add_story_articles(db, story, source_id, 2)
+        assert stories.summarize_stories(db) == 1
+        _add_story_articles(db, story, source_id, 1)
+        assert stories.summarize_stories(db) == 0
+
+    assert mock_story.call_count == 2
+    assert len(mock_story.call_args.args[0]) == stories.MAX_SUMMARY_ARTICLES
+
+
+@patch("app.config.SUMMARY_MODE", "lazy")
+def test_lazy_mode_summarizes_stories_when_shown(db: Session, requests_mock: requests_mock.Mocker):
+    """Tests that in lazy mode a scrape leaves story summaries to the feed."""
+    story_id = _add_story(db, 2)
+    source = crud.create_source(db=db, source=crud.schemas.SourceCreate(name="Lazy", url="http://lazy.com"))
+    requests_mock.get("http://lazy.com", text="")
+
+    with patch("app.config.JOB_EXECUTION_MODE", "worker"), \
+         patch("app.llm_interface.generate_story_summary", return_value="Summary") as mock_story:
+        run_scraping_job("lazy-story-job", db, source_id=source.id)
+        mock_story.assert_not_called()
+        assert stories.summarize_stories(db, [story_id]) == 1
+    assert db.get(Story, story_id).summary == "Summary"
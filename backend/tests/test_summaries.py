@@ -0,0 +1,101 @@
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+from sqlalchemy.orm import Session
+
+from app import summaries
+from app.jobs import run_scraping_job
+from app.models import Article, Source
+
+
+@pytest.mark.asyncio
+@patch("app.config.SUMMARY_PREFETCH_ARTICLES", 1)
+@patch("app.config.SUMMARY_MODE", "lazy")
+async def test_lazy_summaries(client, db: Session, requests_mock: requests_mock.Mocker):
+    """
+    Tests that in lazy mode scraping only scores the articles, and that they
+    are summarized once queued: the best one after the scrape, the ones shown
+    in the feed with the next page, and opened ones first.
+    """
+    source = Source(
+        name="Lazy Source",
+        url="http://lazy.com",
+        scraper_type="HTML",
+        config={"article_link_selector": ".article-link"},
+    )
+    db.add(source)
+    db.commit()
+    links = "".join(f'<a class="article-link" href="/{i}">{i}</a>' for i in range(1, 4))
+    requests_mock.get("http://lazy.com", text=links)
+    for i in range(1, 4):
+        requests_mock.get(
+            f"http://lazy.com/{i}",
+            text=f"<html><head><title>Article {i}</title></head><body>Content {i}</body></html>",
+        )
+
+    queue = summaries.SummaryQueue(workers=0)
+    with patch("app.summaries.summary_queue", queue), \
+         patch("app.llm_interface.generate_summary_and_categories", return_value=("S", ["C"])) as mock_summary, \
+         patch("app.llm_interface.generate_interest_score", side_effect=[30, 90, 60]):
+        run_scraping_job("lazy-job", db)
+        mock_summary.assert_not_called()
+        ids = {article.title: article.id for article in db.query(Article).all()}
+        # The best article is prefetched after the scrape
+        assert queue.pending() == 1
+
+        # The first page shows article 1, article 2 is on the next page
+        response = await client.get("/articles/", params={"limit": 1})
+        assert [article["summary"] for article in response.json()] == [None]
+        assert queue.pending() == 2
+
+        response = await client.patch(f"/articles/{ids['Article 3']}/read-status", json={"read": True})
+        assert response.status_code == 200
+        assert queue.pending() == 3
+
+        assert queue.run_pending(db) == 3
+
+    assert [call.kwargs["article_text"] for call in mock_summary.call_args_list] == [
+        "Content 3", "Content 1", "Content 2"
+    ]
+    assert all(article.summary == "S" for article in db.query(Article).all())
+
+
+@patch("app.config.SUMMARY_RETRY_SECONDS", 60)
+@patch("app.config.SUMMARY_RETRY_MAX_SECONDS", 100)
+def test_failed_summaries_are_retried_with_backoff(db: Session):
+    """
+    Tests that an article whose summary failed is not queued again until
+    its retry delay, which doubles after each failure up to the maximum.
+    """
+    source = Source(name="Source", url="http://source.com")
+    db.add(source)
+    db.commit()
+    article = Article(source_id=source.id, url="http://source.com/1", title="1", original_content="Content")
+    db.add(article)
+    db.commit()
+    article_id = article.id
+
+    queue = summaries.SummaryQueue(workers=0)
+
+    def enqueue_at(seconds: float) -> int:
+        with patch("app.summaries.time.monotonic", return_value=seconds):
+            queue.enqueue([article_id])
+        return queue.pending()
+
+    def summarize_at(seconds: float, **llm) -> int:
+        with patch("app.summaries.time.monotonic", return_value=seconds), \
+             patch("app.llm_interface.generate_summary_and_categories", **llm):
+            return queue.run_pending(db)
+
+    llm_down = {"side_effect": RuntimeError("LLM down")}
+    assert enqueue_at(0) == 1
+    assert summarize_at(0, **llm_down) == 1
+    assert enqueue_at(59) == 0
+    assert enqueue_at(60) == 1
+    assert summarize_at(60, **llm_down) == 1
+    # The second failure doubles the delay, up to the maximum
+    assert enqueue_at(159) == 0
+    assert enqueue_at(160) == 1
+    assert summarize_at(160, return_value=("S", ["C"])) == 1
+    assert db.get(Article, article_id).summary == "S"
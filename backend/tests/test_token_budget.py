@@ -0,0 +1,65 @@
+from app import token_budget
+
+
+def test_lead_paragraphs_skip_boilerplate_and_fit_the_budget():
+    text = "\n".join([
+        "Advertisement",
+        "The council approved the new tram line on Tuesday.",
+        "Share this article",
+        "Construction starts next spring and will last two years.",
+        "The council approved the new tram line on Tuesday.",
+        "Critics said the budget was too optimistic. " * 20,
+    ])
+
+    lead = token_budget.lead_paragraphs(text, max_tokens=40)
+
+    assert lead == (
+        "The council approved the new tram line on Tuesday.\n"
+        "Construction starts next spring and will last two years."
+    )
+    assert token_budget.estimate_tokens(lead) <= 40
+    # Sentences starting like boilerplate are article text
+    article = "Share prices fell 3% on Tuesday.\nComment pieces were mixed.\nShare on Facebook\n© 2024 Example Media"
+    assert token_budget.strip_boilerplate(article) == "Share prices fell 3% on Tuesday.\nComment pieces were mixed."
+    # A first paragraph over the budget is cut
+    assert token_budget.lead_paragraphs("word " * 100, max_tokens=10) == "word " * 7 + "word"
+
+
+def test_dom_skeleton_keeps_the_article_list():
+    items = "".join(
+        f'<li class="story"><a class="story-link" href="/news/{i}" data-track="x{i}">'
+        f"<img src='/{i}.jpg'>Headline number {i}</a></li>"
+        for i in range(50)
+    )
+    html = f"""
+        <html><head><title>T</title><script>var x = 1;</script></head><body>
+        <nav><a href="/">Home</a><a href="/about">About</a></nav>
+        <main id="content"><ul class="stories">{items}</ul></main>
+        <footer>Copyright</footer>
+        </body></html>
+    """
+
+    skeleton = token_budget.dom_skeleton(html, max_tokens=200)
+
+    assert skeleton.split("\n") == [
+        "<body>",
+        ' <main id="content">',
+        '  <ul class="stories">',
+        '   <li class="story">',
+        '    <a class="story-link" href="/news/0">Headline number 0',
+        '   <li class="story">',
+        '    <a class="story-link" href="/news/1">Headline number 1',
+        '   <li class="story">',
+        '    <a class="story-link" href="/news/2">Headline number 2',
+        "   <!-- 47 more <li> -->",
+    ]
+    assert token_budget.estimate_tokens(skeleton) * 10 < token_budget.estimate_tokens(html)
+
+
+def test_dom_skeleton_of_a_deeply_nested_page():
+    html = "<html><body>" + "<div>" * 5000 + '<a href="/news/1">Deep</a>' + "</div>" * 5000 + "</body></html>"
+
+    lines = token_budget.dom_skeleton(html).split("\n")
+
+    assert len(lines) == 5002
+    assert lines[-1] == " " * 5001 + '<a href="/news/1">Deep'
@@ -0,0 +1,51 @@
+from app.urls import canonicalize_url, find_canonical_url, page_domain
+
+
+def test_canonicalize_url_strips_tracking_noise():
+    """
+    Tests that tracking parameters, fragments and host/port noise are removed
+    and the remaining query parameters are sorted.
+    """
+    url = "https://WWW.Example.com:443/news/story/?utm_source=x&b=2&fbclid=abc&a=1#comments"
+
+    assert canonicalize_url(url) == "https://example.com/news/story?a=1&b=2"
+
+
+def test_canonicalize_url_collapses_amp_variants():
+    """
+    Tests that the usual AMP URL variants map to the regular article URL.
+    """
+    expected = "https://example.com/news/story"
+
+    assert canonicalize_url("https://example.com/news/story/amp/") == expected
+    assert canonicalize_url("https://amp.example.com/news/story") == expected
+    assert canonicalize_url("https://example.com/news/story.amp") == expected
+    assert canonicalize_url("https://example.com/amp/news/story?amp=1") == expected
+
+
+def test_canonicalize_url_leaves_non_http_urls_alone():
+    """
+    Tests that relative and non-http(s) URLs are returned unchanged.
+    """
+    assert canonicalize_url("/relative/path") == "/relative/path"
+    assert canonicalize_url("mailto:someone@example.com") == "mailto:someone@example.com"
+
+
+def test_find_canonical_url():
+    """
+    Tests that the <link rel="canonical"> URL is resolved against the page URL,
+    and that homepage canonicals are ignored.
+    """
+    html = '<html><head><link rel="canonical" href="/news/story"></head></html>'
+    assert find_canonical_url(html, "https://example.com/x?id=1") == "https://example.com/news/story"
+
+    homepage_html = '<html><head><link rel="canonical" href="https://example.com/"></head></html>'
+    assert find_canonical_url(homepage_html, "https://example.com/news/story") is None
+
+    assert find_canonical_url("<html><head></head></html>", "https://example.com/a") is None
+
+
+def test_page_domain():
+    assert page_domain("https://WWW.Example.com/news/1") == "example.com"
+    assert page_domain("http://blog.example.com:8080/") == "blog.example.com:8080"
+    assert page_domain("/relative/path") == ""
@@ -7,6 +7,7 @@ import { createTestArticle, render } from '@/tests/test-utils';
 // Mock the API functions
 jest.mock('@/lib/api', () => ({
   markArticleAsRead: jest.fn(),
+  setArticleFeedback: jest.fn(),
 }));
 
 describe('ArticleCard', () => {
@@ -15,6 +16,28 @@ describe('ArticleCard', () => {
   beforeEach(() => {
     jest.clearAllMocks();
     (api.markArticleAsRead as jest.Mock).mockResolvedValue(mockArticle);
+    (api.setArticleFeedback as jest.Mock).mockResolvedValue(mockArticle);
+  });
+
+  it('sends like and dislike feedback', async () => {
+    render(<ArticleCard article={mockArticle} />);
+
+    fireEvent.click(screen.getByLabelText('Like'));
+    await waitFor(() => {
+      expect(api.setArticleFeedback).toHaveBeenCalledWith(mockArticle.id, true);
+    });
+    expect(screen.getByLabelText('Like')).toHaveAttribute('aria-pressed', 'true');
+
+    // Clicking again clears it
+    fireEvent.click(screen.getByLabelText('Like'));
+    await waitFor(() => {
+      expect(api.setArticleFeedback).toHaveBeenCalledWith(mockArticle.id, null);
+    });
+
+    fireEvent.click(screen.getByLabelText('Dislike'));
+    await waitFor(() => {
+      expect(api.setArticleFeedback).toHaveBeenCalledWith(mockArticle.id, false);
+    });
   });
 
   it('renders article information correctly', () => {
@@ -2,7 +2,7 @@
 
 import { useState } from 'react';
 import { Article } from '@/lib/types';
-import { markArticleAsRead } from '@/lib/api';
+import { markArticleAsRead, setArticleFeedback } from '@/lib/api';
 
 interface ArticleCardProps {
   article: Article;
@@ -21,6 +21,20 @@ export default function ArticleCard({ article, isRead = false, onReadStatusChang
   });
 
   const [isUpdating, setIsUpdating] = useState(false);
+  const [liked, setLiked] = useState<boolean | null>(article.liked ?? null);
+
+  const toggleFeedback = async (value: boolean) => {
+    const previous = liked;
+    // Clicking the active button again clears the feedback
+    const newValue = liked === value ? null : value;
+    setLiked(newValue);
+    try {
+      await setArticleFeedback(article.id, newValue);
+    } catch (error) {
+      console.error('Failed to save feedback:', error);
+      setLiked(previous);
+    }
+  };
 
   const toggleReadStatus = async (e: React.MouseEvent) => {
     e.preventDefault();
@@ -57,6 +71,22 @@ export default function ArticleCard({ article, isRead = false, onReadStatusChang
             Interest Score: {article.interest_score}
           </div>
         )}
+        <button
+          onClick={() => toggleFeedback(true)}
+          aria-label="Like"
+          aria-pressed={liked === true}
+          className={`ml-3 px-2 py-1 rounded-full text-xs ${liked === true ? 'bg-green-100 text-green-700' : 'text-gray-400 hover:text-gray-600'}`}
+        >
+          👍
+        </button>
+        <button
+          onClick={() => toggleFeedback(false)}
+          aria-label="Dislike"
+          aria-pressed={liked === false}
+          className={`ml-1 px-2 py-1 rounded-full text-xs ${liked === false ? 'bg-red-100 text-red-700' : 'text-gray-400 hover:text-gray-600'}`}
+        >
+          👎
+        </button>
         <button
           onClick={toggleReadStatus}
           disabled={isUpdating}
@@ -25,6 +25,7 @@ describe('SourceList', () => {
       message: 'Scraping in progress',
       created_at: new Date().toISOString()
     });
+    mockedApi.subscribeToJobStatus.mockReturnValue(jest.fn());
     global.alert = jest.fn();
     // Mock confirm to return true
     global.confirm = jest.fn(() => true);
@@ -1,7 +1,7 @@
 'use client';
 
 import { useEffect, useState } from 'react';
-import { getSources, deleteSource, scrapeSource, getScrapeJobStatus, ScrapeJob } from '@/lib/api';
+import { getSources, deleteSource, scrapeSource, subscribeToJobStatus, ScrapeJob } from '@/lib/api';
 import { Source } from '@/lib/types';
 import SourceForm from './SourceForm';
 import LoadingIndicator from './LoadingIndicator';
@@ -10,8 +10,8 @@ import ScrapingProgress from './ScrapingProgress';
 
 interface ScrapeProgress {
   sourceId: number;
-  job: ScrapeJob;
-  pollInterval: NodeJS.Timeout;
+  job: ScrapeJob | null;
+  unsubscribe: () => void;
 }
 
 export default function SourceList() {
@@ -21,11 +21,11 @@ export default function SourceList() {
   const [editingSource, setEditingSource] = useState<Source | null>(null);
   const [scrapeProgress, setScrapeProgress] = useState<ScrapeProgress | null>(null);
 
-  // Clean up any polling intervals on unmount
+  // Close the progress stream on unmount
   useEffect(() => {
     return () => {
       if (scrapeProgress) {
-        clearInterval(scrapeProgress.pollInterval);
+        scrapeProgress.unsubscribe();
       }
     };
   }, [scrapeProgress]);
@@ -61,44 +61,38 @@ export default function SourceList() {
 
   async function handleScrape(id: number) {
     try {
-      // Clear any existing polling interval
+      // Close any existing progress stream
       if (scrapeProgress) {
-        clearInterval(scrapeProgress.pollInterval);
+        scrapeProgress.unsubscribe();
       }
       
       const result = await scrapeSource(id);
       
       if (result.job_id) {
-        // Get initial job status
-        const job = await getScrapeJobStatus(result.job_id);
-        
-        // Set up polling for job progress
-        const interval = setInterval(async () => {
-          try {
-            const updatedJob = await getScrapeJobStatus(result.job_id);
-            
+        // Follow the job progress until it finishes
+        const unsubscribe = subscribeToJobStatus(
+          result.job_id,
+          (updatedJob) => {
+            if (updatedJob.status === 'completed' || updatedJob.status === 'failed' || updatedJob.status === 'canceled') {
+              unsubscribe();
+              setScrapeProgress(null);
+              loadSources();
+              return;
+            }
             setScrapeProgress(prev => {
               if (!prev) return null;
               return { ...prev, job: updatedJob };
             });
-            
-            if (updatedJob.status === 'completed' || updatedJob.status === 'failed') {
-              // Stop polling and reload sources
-              if (scrapeProgress) {
-                clearInterval(scrapeProgress.pollInterval);
-              }
-              setScrapeProgress(null);
-              loadSources();
-            }
-          } catch (error) {
-            console.error('Error polling for job status:', error);
+          },
+          (error) => {
+            console.error('Error receiving job status:', error);
           }
-        }, 2000);
+        );
         
         setScrapeProgress({
           sourceId: id,
-          job,
-          pollInterval: interval
+          job: null,
+          unsubscribe
         });
       } else {
         // Legacy support for backends without job tracking
@@ -206,7 +200,7 @@ export default function SourceList() {
               </div>
               
               {/* Scraping progress indicator */}
-              {isScraping && scrapeProgress && (
+              {isScraping && scrapeProgress?.job && (
                 <div className="mt-3 w-full">
                   <ScrapingProgress job={scrapeProgress.job} />
                 </div>
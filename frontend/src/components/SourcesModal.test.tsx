@@ -35,13 +35,17 @@ describe('SourcesModal', () => {
     });
   });
 
-  it('should initiate scraping, poll for status, and show completion', async () => {
+  it('should initiate scraping, follow the status stream, and show completion', async () => {
     jest.useFakeTimers();
 
     mockedApi.scrapeAllSources.mockResolvedValue({ job_id: 'job-123', message: 'Scraping initiated' });
-    mockedApi.getScrapeJobStatus
-      .mockResolvedValueOnce({ id: 'job-123', status: 'in_progress', progress: 50, message: 'In progress...', total_sources: 10, processed_sources: 5, total_articles: 100, processed_articles: 50, eta_seconds: 60 })
-      .mockResolvedValueOnce({ id: 'job-123', status: 'completed', progress: 100, message: 'Complete!', total_sources: 10, processed_sources: 10, total_articles: 100, processed_articles: 100, eta_seconds: 0 });
+    mockedApi.subscribeToJobStatus.mockImplementation((jobId, onUpdate) => {
+      onUpdate({ id: 'job-123', status: 'in_progress', progress: 50, message: 'In progress...', total_sources: 10, processed_sources: 5, total_articles: 100, processed_articles: 50, eta_seconds: 60 });
+      const timeout = setTimeout(() => {
+        onUpdate({ id: 'job-123', status: 'completed', progress: 100, message: 'Complete!', total_sources: 10, processed_sources: 10, total_articles: 100, processed_articles: 100, eta_seconds: 0 });
+      }, 2000);
+      return () => clearTimeout(timeout);
+    });
 
     render(<SourcesModal isOpen={true} onClose={() => {}} />);
 
@@ -49,11 +53,11 @@ describe('SourcesModal', () => {
     fireEvent.click(screen.getByRole('button', { name: /scrape all sources/i }));
     await screen.findByText('Scraping...');
 
-    // 2. The first poll happens immediately. Wait for its result to appear.
+    // 2. The first update arrives immediately. Wait for it to appear.
     const progress = await screen.findByTestId('mock-scraping-progress');
     expect(progress).toHaveTextContent('In progress...');
 
-    // 3. Now, advance timers to trigger the second poll via setTimeout.
+    // 3. Now, advance timers to deliver the next update.
     await act(async () => {
       jest.advanceTimersByTime(2000);
     });
@@ -1,9 +1,9 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import Modal from './Modal';
 import SourceList from './SourceList';
 import SourceForm from './SourceForm';
 import ScrapingProgress from './ScrapingProgress';
-import { scrapeAllSources, getScrapeJobStatus, cancelScrapeJob, ScrapeJob } from '@/lib/api';
+import { scrapeAllSources, subscribeToJobStatus, cancelScrapeJob, ScrapeJob } from '@/lib/api';
 
 interface SourcesModalProps {
   isOpen: boolean;
@@ -16,29 +16,35 @@ export default function SourcesModal({ isOpen, onClose }: SourcesModalProps) {
   const [message, setMessage] = useState<{ text: string, type: 'success' | 'error' | 'info' } | null>(null);
   const [scrapeJob, setScrapeJob] = useState<ScrapeJob | null>(null);
 
-  const pollJobStatus = useCallback(async (jobId: string) => {
-    try {
-      const updatedJob = await getScrapeJobStatus(jobId);
-      setScrapeJob(updatedJob);
+  const unsubscribeRef = useRef<(() => void) | null>(null);
 
-      if (updatedJob.status === 'completed' || updatedJob.status === 'failed' || updatedJob.status === 'canceled') {
-        setIsLoading(false);
-        setMessage({
-          text: updatedJob.message || 'Job finished.',
-          type: updatedJob.status === 'completed' ? 'success' : (updatedJob.status === 'failed' ? 'error' : 'info'),
-        });
-        if (updatedJob.status === 'completed') {
-          setKey(prevKey => prevKey + 1); // Refresh source list
+  // Close the progress stream on unmount
+  useEffect(() => () => unsubscribeRef.current?.(), []);
+
+  const watchJobStatus = useCallback((jobId: string) => {
+    unsubscribeRef.current?.();
+    unsubscribeRef.current = subscribeToJobStatus(
+      jobId,
+      (updatedJob) => {
+        setScrapeJob(updatedJob);
+
+        if (updatedJob.status === 'completed' || updatedJob.status === 'failed' || updatedJob.status === 'canceled') {
+          setIsLoading(false);
+          setMessage({
+            text: updatedJob.message || 'Job finished.',
+            type: updatedJob.status === 'completed' ? 'success' : (updatedJob.status === 'failed' ? 'error' : 'info'),
+          });
+          if (updatedJob.status === 'completed') {
+            setKey(prevKey => prevKey + 1); // Refresh source list
+          }
         }
-      } else {
-        // Keep polling
-        setTimeout(() => pollJobStatus(jobId), 2000);
+      },
+      (error) => {
+        console.error('Error receiving job status:', error);
+        setIsLoading(false);
+        setMessage({ text: 'Error checking job status.', type: 'error' });
       }
-    } catch (error) {
-      console.error('Error polling for job status:', error);
-      setIsLoading(false);
-      setMessage({ text: 'Error checking job status.', type: 'error' });
-    }
+    );
   }, []);
 
   async function handleScrapeAll() {
@@ -49,7 +55,7 @@ export default function SourcesModal({ isOpen, onClose }: SourcesModalProps) {
       const result = await scrapeAllSources();
       
       if (result.job_id) {
-        pollJobStatus(result.job_id);
+        watchJobStatus(result.job_id);
       } else {
         setMessage({ text: result.message || 'Scraping initiated.', type: 'success' });
         setKey(prevKey => prevKey + 1);
@@ -46,6 +46,14 @@ export function markArticleAsRead(id: number, isRead: boolean): Promise<Article>
   });
 }
 
+export function setArticleFeedback(id: number, liked: boolean | null): Promise<Article> {
+  return fetcher<Article>(`/articles/${id}/feedback`, {
+    method: 'PATCH',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ liked }),
+  });
+}
+
 export function getInterestPrompt(): Promise<{ interest_prompt: string }> {
   return fetcher<{ interest_prompt: string }>('/settings/interest_prompt');
 }
@@ -124,6 +132,58 @@ export function getScrapeJobStatus(jobId: string): Promise<ScrapeJob> {
   return fetcher<ScrapeJob>(`/sources/scrape/status/${jobId}`);
 }
 
+const FINISHED_JOB_STATUSES: ScrapeJob['status'][] = ['completed', 'failed', 'canceled'];
+
+/**
+ * Subscribes to the progress of a job. The backend streams server-sent
+ * events: a full job status first, then only the fields that changed.
+ * Falls back to polling where EventSource is not available.
+ * Returns a function that closes the subscription.
+ */
+export function subscribeToJobStatus(
+  jobId: string,
+  onUpdate: (job: ScrapeJob) => void,
+  onError?: (error: unknown) => void
+): () => void {
+  if (typeof EventSource === 'undefined') {
+    let timeout: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+    const poll = async () => {
+      try {
+        const job = await getScrapeJobStatus(jobId);
+        if (closed) return;
+        onUpdate(job);
+        if (!FINISHED_JOB_STATUSES.includes(job.status)) {
+          timeout = setTimeout(poll, 2000);
+        }
+      } catch (error) {
+        if (!closed) onError?.(error);
+      }
+    };
+    poll();
+    return () => {
+      closed = true;
+      clearTimeout(timeout);
+    };
+  }
+
+  let job: ScrapeJob | null = null;
+  const source = new EventSource(`${API_BASE_URL}/sources/scrape/events/${jobId}`);
+  source.addEventListener('progress', (event) => {
+    job = { ...job, ...JSON.parse((event as MessageEvent).data) } as ScrapeJob;
+    onUpdate(job);
+  });
+  source.addEventListener('end', () => source.close());
+  source.onerror = (error) => {
+    // EventSource reconnects on its own; only give up if the job is unknown
+    // or the connection was closed for good.
+    if (source.readyState === EventSource.CLOSED) {
+      onError?.(error);
+    }
+  };
+  return () => source.close();
+}
+
 export function scrapeAllSources(): Promise<{ job_id: string; message: string }> {
   return fetcher<{ job_id: string; message: string }>(`/sources/scrape`, {
     method: 'POST',
@@ -25,6 +25,7 @@ export interface Article {
   created_at: string;
   categories: Category[];
   read?: boolean;
+  liked?: boolean | null;
   interest_score?: number;
 }
 